@@ -0,0 +1,52 @@
+"""
+螢幕擷取後端比較：各後端擷取整個虛擬桌面、單一螢幕與小區域的耗時與影像大小
+Linux 可在 Xvfb 下執行，例如:
+    xvfb-run -s "-screen 0 3840x2160x24" python benchmarks/bench_capture.py
+"""
+import argparse
+import time
+
+from common import percentile
+
+import ocr_capture
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--backend', action='append', choices=sorted(ocr_capture.GRABBERS),
+                        help="指定後端（可重複），預設測試所有可用後端")
+    args = parser.parse_args()
+
+    monitors = ocr_capture.list_monitors()
+    virtual = ocr_capture.virtual_screen()
+    first = monitors[0]
+    regions = {
+        'virtual': virtual,
+        'monitor': first,
+        'region 400x200': (first[0], first[1], first[0] + 400, first[1] + 200),
+    }
+    print(f"螢幕: {monitors}")
+
+    for name in args.backend or sorted(ocr_capture.GRABBERS):
+        try:
+            grabber = ocr_capture.create_grabber(name)
+        except Exception as e:
+            print(f"\n[{name}] 無法使用: {e}")
+            continue
+        print(f"\n[{name}]")
+        for label, bbox in regions.items():
+            times = []
+            image = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                image = grabber.grab(bbox)
+                times.append((time.perf_counter() - start) * 1000)
+            size_mb = image.width * image.height * len(image.getbands()) / (1024 * 1024)
+            print(f"  {label:<16}{image.width}x{image.height:<8}"
+                  f"p50 {percentile(times, 50):8.2f} ms  p95 {percentile(times, 95):8.2f} ms  {size_mb:7.1f} MB")
+        grabber.close()
+
+
+if __name__ == '__main__':
+    main()
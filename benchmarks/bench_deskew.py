@@ -0,0 +1,81 @@
+"""
+傾斜與方向估計的耗時與準確度：以合成文字圖旋轉 0/90/180/270 度並加上不同傾斜角度，
+量測投影剖面估計（不含旋轉）的耗時，以及估計的方向（橫/直）與傾斜角度是否正確
+上下顛倒投影剖面分不出來，由 OSD 判斷，這裡只檢查橫直與傾斜角度
+
+用法:
+    python benchmarks/bench_deskew.py [--repeat 5] [--json FILE]
+"""
+import argparse
+import json
+import time
+
+from PIL import Image
+
+from common import percentile, render_text_image
+
+import ocr_deskew
+
+SIZES = [((400, 40), 16), ((800, 400), 14), ((1920, 1080), 14), ((2480, 3508), 36)]  # 最後一個為 300 DPI 的 A4 頁面
+ROTATIONS = (0, 90, 180, 270)
+SKEWS = (0.0, 1.5, -4.0, 10.0)
+SKEW_TOLERANCE = 0.3  # 度
+
+
+def make_case(image, rotate, skew):
+    """文字行往右上傾斜 skew 度後再逆時針轉 rotate 度（校正需順時針轉 rotate 度）"""
+    if skew:
+        image = image.rotate(skew, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=(235, 235, 235))
+    if rotate:
+        image = image.rotate(rotate, expand=True)
+    return image.convert('L')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', metavar='FILE', help="另存結果為 JSON")
+    args = parser.parse_args()
+
+    report = []
+    print(f"{'截圖':>10} {'案例':>4} {'方向錯':>6} {'角度錯':>6} {'p50 ms':>8} {'最大 ms':>8} {'需 OSD':>7}")
+    for size, font_size in SIZES:
+        source, _ = render_text_image(size, font_size=font_size)
+        times = []
+        wrong_orientation = wrong_skew = ambiguous = 0
+        for rotate in ROTATIONS:
+            for skew in SKEWS:
+                image = make_case(source, rotate, skew)
+                best = float('inf')
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    estimate = ocr_deskew.estimate_orientation(image)
+                    best = min(best, (time.perf_counter() - start) * 1000)
+                times.append(best)
+                if estimate is None or estimate['rotate'] != rotate % 180:
+                    wrong_orientation += 1
+                    continue
+                if abs(estimate['skew'] - skew) > SKEW_TOLERANCE:
+                    wrong_skew += 1
+                ambiguous += estimate['ambiguous']
+        row = {
+            'size': list(size),
+            'cases': len(times),
+            'wrong_orientation': wrong_orientation,
+            'wrong_skew': wrong_skew,
+            'ambiguous': ambiguous,
+            'p50_ms': round(percentile(times, 50), 2),
+            'max_ms': round(max(times), 2),
+        }
+        print(f"{size[0]:>4}x{size[1]:<5} {row['cases']:>4} {wrong_orientation:>6} {wrong_skew:>6} "
+              f"{row['p50_ms']:>8.2f} {row['max_ms']:>8.2f} {ambiguous:>7}")
+        report.append(row)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n結果已保存: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
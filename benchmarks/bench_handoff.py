@@ -0,0 +1,99 @@
+"""
+圖片交給 Tesseract 的成本：暫存檔（pytesseract：寫 PNG → 執行 → 讀回輸出檔 → 刪檔）vs 管線（PNM 經 stdin、結果由 stdout 讀回）
+以實際預處理後的圖片量測每次呼叫在啟動 tesseract 之外多花的編碼與磁碟時間；
+有 Tesseract 時另外量測完整辨識一次的耗時
+
+用法:
+    python benchmarks/bench_handoff.py [--repeat 20] [--tesseract] [--json FILE]
+"""
+import argparse
+import json
+import os
+import time
+
+from common import render_text_image
+
+import ocr_core
+import ocr_engine
+import ocr_preprocess
+
+import pytesseract
+
+SIZES = [(320, 80), (640, 200), (1920, 1080)]
+OUTPUT_BYTES = 2048  # 模擬 tesseract 寫出的文字檔大小
+
+
+def file_handoff(image, payload):
+    """pytesseract 的流程（不含執行 tesseract）：壓縮成暫存檔、讀回輸出檔、刪除"""
+    with pytesseract.pytesseract.save(image) as (temp_name, _):
+        output_path = f"{temp_name}.txt"
+        with open(output_path, 'wb') as f:  # 代替 tesseract 寫出結果
+            f.write(payload)
+        with open(output_path, 'rb') as f:
+            return f.read()
+
+
+def pipe_handoff(image, payload):
+    """管線的流程（不含執行 tesseract）：只需在像素前加上 PNM 檔頭"""
+    ocr_engine.encode_pnm(image)
+    return payload
+
+
+def best_ms(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--tesseract', action='store_true', help="同時量測實際執行 tesseract 的完整耗時")
+    parser.add_argument('--json', metavar='FILE', help="另存結果為 JSON")
+    args = parser.parse_args()
+
+    if args.tesseract and not ocr_core.init_tesseract(verbose=False):
+        parser.error(f"找不到 Tesseract（{ocr_core.tesseract_error_msg}）")
+
+    options = ocr_core.resolve_options({})
+    payload = os.urandom(OUTPUT_BYTES)
+    report = []
+    print(f"{'截圖':>10} {'送入引擎':>12} {'模式':>4} {'暫存檔 ms':>10} {'管線 ms':>9} {'省下 ms':>9}", end='')
+    print(f" {'完整(檔) ms':>12} {'完整(管線) ms':>14}" if args.tesseract else '')
+    for size in SIZES:
+        image, _ = render_text_image(size, font_size=14)
+        processed, _ = ocr_preprocess.preprocess(image, options)
+        row = {
+            'size': list(size),
+            'processed_size': list(processed.size),
+            'mode': processed.mode,
+            'file_ms': round(best_ms(lambda: file_handoff(processed, payload), args.repeat), 3),
+            'pipe_ms': round(best_ms(lambda: pipe_handoff(processed, payload), args.repeat), 3),
+        }
+        row['saved_ms'] = round(row['file_ms'] - row['pipe_ms'], 3)
+        line = (f"{size[0]:>4}x{size[1]:<5} {processed.width:>5}x{processed.height:<6} {processed.mode:>4} "
+                f"{row['file_ms']:>10.2f} {row['pipe_ms']:>9.2f} {row['saved_ms']:>9.2f}")
+
+        if args.tesseract:
+            lang, config = 'eng', options['config']
+            engine = ocr_engine.TesseractCLIEngine(lang, config)
+            row['tesseract_file_ms'] = round(best_ms(
+                lambda: pytesseract.image_to_string(processed, lang=lang, config=config,
+                                                    output_type=pytesseract.Output.BYTES),
+                args.repeat), 1)
+            row['tesseract_pipe_ms'] = round(best_ms(lambda: engine.image_to_text(processed), args.repeat), 1)
+            line += f" {row['tesseract_file_ms']:>12.1f} {row['tesseract_pipe_ms']:>14.1f}"
+        print(line)
+        report.append(row)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n結果已保存: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+截圖選取框繪製效能：以合成的滑鼠拖曳事件重播，量測每個事件的繪製時間
+比較原本「裁切 + 建立 PhotoImage」與新的「遮罩矩形」做法（需要可用的顯示器或 Xvfb）
+
+用法:
+    python benchmarks/bench_overlay.py [--width 11520 --height 2160] [--events 60]
+"""
+import argparse
+import time
+import tkinter as tk
+
+from PIL import ImageTk
+
+from common import percentile, render_text_image
+
+import ocr_overlay
+
+SELECTION_SIZES = [64, 256, 1024, 2048, 4096]
+
+
+def replay(root, canvas, renderer, size, events, width, height):
+    """在指定選取大小附近來回拖曳，回傳每個事件的繪製時間（毫秒）"""
+    x0, y0 = 10, 10
+    times = []
+    for i in range(events):
+        # 在目標大小附近抖動，模擬拖曳中的微小移動
+        jitter = (i % 7) - 3
+        x2 = min(width - 1, x0 + size + jitter)
+        y2 = min(height - 1, y0 + size // 2 + jitter)
+        start = time.perf_counter()
+        renderer.update(x0, y0, x2, y2)
+        canvas.update_idletasks()  # 強制處理重繪
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--width', type=int, default=11520, help="虛擬桌面寬度（預設 3 台 4K 橫排）")
+    parser.add_argument('--height', type=int, default=2160)
+    parser.add_argument('--events', type=int, default=60)
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    root.geometry(f"{min(args.width, 1600)}x{min(args.height, 900)}+0+0")
+    image, _ = render_text_image((args.width, args.height), font_size=14)
+
+    print(f"虛擬桌面 {args.width}x{args.height}，每種大小重播 {args.events} 個移動事件")
+    print(f"{'選取大小':>10}{'crop 平均':>12}{'crop p95':>12}{'mask 平均':>12}{'mask p95':>12}  (ms)")
+    for size in SELECTION_SIZES:
+        results = {}
+        for name in ('crop', 'mask'):
+            canvas = tk.Canvas(root, width=args.width, height=args.height, highlightthickness=0)
+            canvas.pack()
+            tk_image = ImageTk.PhotoImage(image)
+            canvas.create_image(0, 0, anchor='nw', image=tk_image)
+            if name == 'crop':
+                renderer = ocr_overlay.CropSelectionRenderer(canvas, image)
+            else:
+                renderer = ocr_overlay.MaskSelectionRenderer(canvas, args.width, args.height)
+            root.update()
+            results[name] = replay(root, canvas, renderer, size, args.events, args.width, args.height)
+            canvas.destroy()
+            del tk_image
+        crop, mask = results['crop'], results['mask']
+        print(f"{size:>10}{sum(crop) / len(crop):>12.2f}{percentile(crop, 95):>12.2f}"
+              f"{sum(mask) / len(mask):>12.2f}{percentile(mask, 95):>12.2f}")
+
+    root.destroy()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+預處理效能比較：原始 PIL 處理鏈 vs 向量化處理鏈
+逐階段量測耗時與新增記憶體（numpy 以 tracemalloc 追蹤，PIL 以輸出圖片大小估算）
+
+用法:
+    python benchmarks/bench_preprocess.py [--repeat 5] [--binarize fixed|otsu|sauvola] [--scale-mode legacy|adaptive]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from common import render_text_image
+
+import ocr_core
+import ocr_preprocess
+
+SIZES = [(80, 40), (640, 200), (1920, 1080), (3840, 2160)]
+
+
+def buffer_bytes(output):
+    """階段輸出緩衝區大小"""
+    if isinstance(output, np.ndarray):
+        return output.nbytes
+    return output.width * output.height * len(output.getbands())
+
+
+def measure(pipeline, image, options, repeat):
+    """回傳 {階段: {'ms': 最佳耗時, 'mb': 記憶體峰值}}、融合階段內部耗時與最終結果
+
+    記憶體峰值 = 階段輸入 + 階段內新配置的緩衝區（輸入在階段結束前不會釋放）
+    """
+    options = dict(options, preprocess=pipeline)
+    stages = {}
+    substages = {}
+    result = None
+    for _ in range(repeat):
+        previous = [buffer_bytes(image)]
+        tracemalloc.start()
+
+        def on_stage(name, elapsed, output):
+            _, traced_peak = tracemalloc.get_traced_memory()
+            peak = previous[0] + max(traced_peak, buffer_bytes(output))
+            previous[0] = buffer_bytes(output)
+            best = stages.setdefault(name, {'ms': float('inf'), 'mb': 0.0})
+            best['ms'] = min(best['ms'], elapsed * 1000)
+            best['mb'] = max(best['mb'], peak / (1024 * 1024))
+            tracemalloc.reset_peak()
+
+        result, state = ocr_preprocess.preprocess(image, options, on_stage)
+        tracemalloc.stop()
+        for name, elapsed in state.get('substage_times', {}).items():
+            substages[name] = min(substages.get(name, float('inf')), elapsed * 1000)
+    return stages, substages, result
+
+
+def print_table(title, stages, substages):
+    print(f"  [{title}]")
+    for name, value in stages.items():
+        print(f"    {name:<28}{value['ms']:>10.2f} ms{value['mb']:>10.2f} MB")
+    for name, elapsed in substages.items():
+        print(f"      └ {name:<24}{elapsed:>10.2f} ms")
+    total = sum(v['ms'] for v in stages.values())
+    peak = max(v['mb'] for v in stages.values())
+    print(f"    {'合計 / 單階段峰值':<24}{total:>10.2f} ms{peak:>10.2f} MB")
+    return total, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--binarize', default='fixed', choices=ocr_preprocess.BINARIZE_METHODS)
+    parser.add_argument('--scale-mode', default='legacy', choices=ocr_preprocess.SCALE_MODES,
+                        help="縮放規則（預設 legacy，與歷史結果比較時倍率一致）")
+    parser.add_argument('--json', metavar='FILE', help="另存結果為 JSON")
+    args = parser.parse_args()
+
+    options = ocr_core.resolve_options({'binarize': args.binarize, 'scale_mode': args.scale_mode})
+    report = []
+    for size in SIZES:
+        image, _ = render_text_image(size, font_size=14)
+        legacy, _, legacy_out = measure('legacy', image, options, args.repeat)
+        fast, fast_sub, fast_out = measure('fast', image, options, args.repeat)
+        # legacy 輸出 0/255 灰階、fast 輸出 1-bit，統一轉成布林比較
+        agree = float(((np.asarray(legacy_out) > 127) == (np.asarray(fast_out.convert('L')) > 127)).mean())
+
+        print(f"\n=== {size[0]}x{size[1]} → {fast_out.width}x{fast_out.height} (binarize={args.binarize}) ===")
+        legacy_total, legacy_peak = print_table('legacy', legacy, {})
+        fast_total, fast_peak = print_table('fast', fast, fast_sub)
+        print(f"  加速 {legacy_total / fast_total:.2f}x，單階段記憶體峰值 {legacy_peak:.1f} → {fast_peak:.1f} MB，"
+              f"與 legacy 像素一致率 {agree:.2%}")
+
+        report.append({
+            'size': list(size),
+            'binarize': args.binarize,
+            'legacy': legacy,
+            'fast': fast,
+            'fast_substages_ms': fast_sub,
+            'speedup': round(legacy_total / fast_total, 3),
+            'pixel_agreement': round(agree, 4),
+        })
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n結果已保存: {args.json}")
+
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    main()
+    print(f"\n總耗時 {time.perf_counter() - start:.1f} 秒")
@@ -0,0 +1,124 @@
+"""
+捲動長截圖的對齊與切帶：以合成的長文件模擬在固定標題列、狀態列與捲軸之間捲動，
+逐張送入 ScrollCapture，檢查接出來的長圖與原文件逐像素相同（沒有重複也沒有遺漏的列）、
+切點都落在行距上，並量測每張畫面的對齊耗時與 OCR 列數（應與新內容成正比，與文件總長無關）
+
+用法:
+    python benchmarks/bench_scroll.py [--simulate-ms 0] [--json FILE]
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from common import percentile, render_text_image, use_simulated_engine
+
+import ocr_scroll
+
+WIDTH = 800
+VIEWPORT = 400           # 擷取區域高度
+HEADER = 30              # 固定標題列
+FOOTER = 24              # 固定狀態列
+SCROLLBAR = 16
+DOC_HEIGHTS = (3000, 12000, 48000)
+STEPS = (20, 180)        # 每張畫面之間捲動的列數範圍
+
+
+class RecordingCapture(ocr_scroll.ScrollCapture):
+    """記錄切出的每條文字帶（含空白帶），用來比對接出來的長圖"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.strips = []
+
+    def _submit(self, strip, ink):
+        self.strips.append(strip.copy())
+        super()._submit(strip, ink)
+
+
+def make_frame(document, position, total):
+    """文件第 position 列開始的畫面，上下加上固定列、右側加上捲軸"""
+    body = VIEWPORT - HEADER - FOOTER
+    frame = Image.new('RGB', (WIDTH, VIEWPORT), (235, 235, 235))
+    frame.paste(document.crop((0, position, WIDTH - SCROLLBAR, position + body)), (0, HEADER))
+    draw = ImageDraw.Draw(frame)
+    draw.rectangle((0, 0, WIDTH, HEADER - 1), fill=(60, 90, 160))
+    draw.text((8, 8), "Report viewer - page header", fill=(255, 255, 255))
+    draw.rectangle((0, VIEWPORT - FOOTER, WIDTH, VIEWPORT), fill=(210, 210, 210))
+    draw.text((8, VIEWPORT - FOOTER + 6), "Ready   UTF-8   100%", fill=(30, 30, 30))
+    thumb = HEADER + int((body - 40) * position / max(1, total - body))
+    draw.rectangle((WIDTH - SCROLLBAR, thumb, WIDTH, thumb + 40), fill=(120, 120, 120))
+    return frame
+
+
+def run_case(height, seed, engine_ms):
+    document, _ = render_text_image((WIDTH - SCROLLBAR, height), font_size=14, seed=seed)
+    body = VIEWPORT - HEADER - FOOTER
+    rng = random.Random(seed)
+    positions = [0]
+    while positions[-1] < height - body:
+        step = 0 if rng.random() < 0.1 else rng.randint(*STEPS)  # 偶爾停住（同一畫面）
+        positions.append(min(height - body, positions[-1] + step))
+
+    capture = RecordingCapture((0, 0, WIDTH, VIEWPORT), {'scale': 1.0})
+    frames = [make_frame(document, position, height) for position in positions]
+    times = []
+    for frame in frames:
+        start = time.perf_counter()
+        capture.step(frame)
+        times.append((time.perf_counter() - start) * 1000)
+    capture.finish()
+
+    # 預期的長圖：第一張的標題列 + 整份文件（捲軸那一段不比對）
+    left, right = ocr_scroll.content_columns(WIDTH)
+    first = np.asarray(frames[0].convert('L'))[:HEADER, left:right]
+    expected = np.concatenate((first, np.asarray(document.convert('L'))[:, left:right]))
+    stitched = np.concatenate(capture.strips)
+    cuts = np.cumsum([len(strip) for strip in capture.strips])[:-1]
+    ink = capture._ink(stitched)
+    stats = capture.stats()
+    return {
+        'height': height,
+        'frames': len(frames),
+        'exact': stitched.shape == expected.shape and bool(np.array_equal(stitched, expected)),
+        'strips': len(capture.strips),
+        'bad_cuts': int(np.count_nonzero(ink[cuts] > 0)) if len(cuts) else 0,
+        'rows': stats['rows'],
+        'ocr_rows': stats['ocr_rows'],
+        'unaligned': stats['unaligned'],
+        'align_ms': stats['align_ms'],
+        'step_p50_ms': round(percentile(times, 50), 2),
+        'step_max_ms': round(max(times), 2),
+        'engine_ms': engine_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--simulate-ms', type=float, default=0.0, help="模擬引擎每百萬像素的辨識耗時")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='FILE', help="另存結果為 JSON")
+    args = parser.parse_args()
+    use_simulated_engine(args.simulate_ms)
+
+    report = []
+    print(f"{'文件高':>6} {'畫面':>5} {'逐像素相同':>10} {'文字帶':>6} {'切到字':>6} {'新內容列':>8} "
+          f"{'OCR 列':>7} {'對齊 ms':>8} {'p50 ms':>7} {'最大 ms':>7}")
+    for height in DOC_HEIGHTS:
+        row = run_case(height, args.seed, args.simulate_ms)
+        print(f"{height:>6} {row['frames']:>5} {str(row['exact']):>10} {row['strips']:>6} {row['bad_cuts']:>6} "
+              f"{row['rows']:>8} {row['ocr_rows']:>7} {row['align_ms']:>8.2f} "
+              f"{row['step_p50_ms']:>7.2f} {row['step_max_ms']:>7.2f}")
+        report.append(row)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n結果已保存: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+OCR 伺服器負載測試：以不同並行數持續送出請求，回報吞吐量、延遲百分位數與被拒絕（503）的比例
+
+用法:
+    python ocr_tool.py --serve                                   # 另一個終端機先啟動伺服器
+    python benchmarks/bench_server.py --url 127.0.0.1:8765 --concurrency 1,4,16,64
+    python benchmarks/bench_server.py --socket /tmp/cl_scan.sock
+    python benchmarks/bench_server.py --spawn --simulate-ms 40   # 在本行程啟動伺服器（模擬引擎）
+"""
+import argparse
+import asyncio
+import http.client
+import io
+import json
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import percentile, render_text_image, use_simulated_engine
+
+import ocr_server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """經由 Unix socket 的 HTTP 連線"""
+
+    def __init__(self, path, timeout=60):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def make_images(count, size, font_size):
+    """產生 count 張不同內容的 PNG（bytes）"""
+    images = []
+    for seed in range(count):
+        image, _ = render_text_image(size, font_size=font_size, seed=seed)
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        images.append(buffer.getvalue())
+    return images
+
+
+def spawn_server(workers, max_queue):
+    """在背景執行緒啟動伺服器，回傳 (host, port)"""
+    ready = threading.Event()
+    address = {}
+
+    def run():
+        async def main():
+            server = ocr_server.OCRServer(workers=workers, max_queue=max_queue)
+            address['value'] = (await server.start('127.0.0.1', 0))[0]
+            ready.set()
+            await asyncio.Event().wait()
+        asyncio.run(main())
+
+    threading.Thread(target=run, name="bench-server", daemon=True).start()
+    ready.wait()
+    return address['value'][:2]
+
+
+def run_level(connect, images, concurrency, total, query):
+    """以 concurrency 條連線（各自 keep-alive）送出 total 個請求"""
+    latencies = []
+    counts = {'ok': 0, 'rejected': 0, 'errors': 0}
+    batch_sizes = []
+    lock = threading.Lock()
+    next_index = iter(range(total))
+
+    def client():
+        conn = connect()
+        try:
+            for i in next_index:
+                body = images[i % len(images)]
+                start = time.perf_counter()
+                conn.request('POST', f'/ocr?{query}' if query else '/ocr', body=body,
+                             headers={'Content-Type': 'application/octet-stream'})
+                response = conn.getresponse()
+                payload = response.read()
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    if response.status == 200:
+                        counts['ok'] += 1
+                        latencies.append(elapsed)
+                        batch_sizes.append(json.loads(payload).get('batch_size') or 1)
+                    elif response.status == 503:
+                        counts['rejected'] += 1
+                    else:
+                        counts['errors'] += 1
+        finally:
+            conn.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(client) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'concurrency': concurrency,
+        'requests': total,
+        'ok': counts['ok'],
+        'rejected': counts['rejected'],
+        'errors': counts['errors'],
+        'throughput_rps': round(counts['ok'] / elapsed, 2) if elapsed > 0 else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 1),
+        'p95_ms': round(percentile(latencies, 95), 1),
+        'p99_ms': round(percentile(latencies, 99), 1),
+        'mean_batch': round(sum(batch_sizes) / len(batch_sizes), 2) if batch_sizes else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default=f"{ocr_server.DEFAULT_HOST}:{ocr_server.DEFAULT_PORT}", help="HOST:PORT")
+    parser.add_argument('--socket', default=None, help="改用 Unix socket 連線")
+    parser.add_argument('--concurrency', default='1,4,16', help="逗號分隔的並行連線數")
+    parser.add_argument('--requests', type=int, default=200, help="每個並行數送出的請求數")
+    parser.add_argument('--unique', type=int, default=32, help="不同圖片數（越少，重複圖片合併的效果越明顯）")
+    parser.add_argument('--size', default='640x160')
+    parser.add_argument('--font-size', type=int, default=16)
+    parser.add_argument('--query', default='', help="附加的查詢字串，例如 output=data&lang=eng")
+    parser.add_argument('--spawn', action='store_true', help="在本行程啟動伺服器")
+    parser.add_argument('--workers', type=int, default=None, help="--spawn 時的工作執行緒數")
+    parser.add_argument('--max-queue', type=int, default=ocr_server.DEFAULT_MAX_QUEUE)
+    parser.add_argument('--simulate-ms', type=float, default=None, help="--spawn 時以模擬引擎取代 Tesseract")
+    parser.add_argument('--json', action='store_true', help="以 JSON 輸出結果")
+    args = parser.parse_args()
+
+    size = tuple(int(v) for v in args.size.split('x'))
+    images = make_images(args.unique, size, args.font_size)
+
+    if args.spawn:
+        import ocr_core
+        if args.simulate_ms is not None:
+            use_simulated_engine(args.simulate_ms)
+        elif not ocr_core.init_tesseract(verbose=False):
+            parser.error(f"找不到 Tesseract（{ocr_core.tesseract_error_msg}），可改用 --simulate-ms")
+        host, port = spawn_server(args.workers, args.max_queue)
+        connect = lambda: http.client.HTTPConnection(host, port, timeout=120)
+    elif args.socket:
+        connect = lambda: UnixHTTPConnection(args.socket, timeout=120)
+    else:
+        host, _, port = args.url.rpartition(':')
+        connect = lambda: http.client.HTTPConnection(host, int(port), timeout=120)
+
+    results = [run_level(connect, images, int(level), args.requests, args.query)
+               for level in args.concurrency.split(',')]
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'並行':>6} {'成功':>6} {'503':>5} {'錯誤':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'平均批次':>8}")
+    for row in results:
+        print(f"{row['concurrency']:>6} {row['ok']:>6} {row['rejected']:>5} {row['errors']:>5} "
+              f"{row['throughput_rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f} {row['mean_batch']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+"""
+OCR 基準測試：以合成文字圖片（已知標準答案）執行完整流程
+各組合（字級 × 對比 × 雜訊 × 圖片大小）回報各階段延遲百分位數、吞吐量、記憶體峰值與字元錯誤率（CER），
+結果存成 JSON，可與先前的結果比較並標記退步
+
+用法:
+    python benchmarks/bench_suite.py --out results.json
+    python benchmarks/bench_suite.py --out new.json --baseline old.json   # 執行並與舊結果比較
+    python benchmarks/bench_suite.py --compare old.json new.json           # 只比較兩份結果
+    python benchmarks/bench_suite.py --simulate-ms 40 --quick              # 沒有 Tesseract 時只量測流程
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import re
+import sys
+import time
+import tracemalloc
+
+from common import percentile, render_text_image, use_simulated_engine
+
+import ocr_core
+
+try:
+    from rapidfuzz.distance import Levenshtein  # 選用：C 實作的編輯距離
+except ImportError:
+    Levenshtein = None
+
+SUITE_VERSION = 1
+
+CONTRASTS = {
+    'high': ((20, 20, 20), (245, 245, 245)),
+    'low': ((110, 110, 110), (160, 160, 160)),
+    'dark': ((220, 220, 220), (30, 30, 30)),     # 深色主題（淺字深底）
+}
+FONT_SIZES = (10, 14, 20, 32)
+NOISE_LEVELS = (0, 12)
+IMAGE_SIZES = ((480, 120), (1280, 720))
+QUICK = {'font_sizes': (14,), 'contrasts': ('high', 'dark'), 'noise': (0,), 'sizes': ((480, 120),)}
+
+# 退步判定門檻
+LATENCY_TOLERANCE = 0.10   # p50 延遲增加超過 10%
+MEMORY_TOLERANCE = 0.10    # 記憶體峰值增加超過 10%
+CER_TOLERANCE = 0.01       # CER 絕對值增加超過 0.01
+
+
+# ================= 語料 =================
+def build_cases(font_sizes, contrasts, noise_levels, sizes):
+    """所有參數組合；case id 固定，兩次執行可逐項對照"""
+    cases = []
+    for size, font_size, contrast, noise in itertools.product(sizes, font_sizes, contrasts, noise_levels):
+        cases.append({
+            'id': f"{size[0]}x{size[1]}-f{font_size}-{contrast}-n{noise}",
+            'size': list(size),
+            'font_size': font_size,
+            'contrast': contrast,
+            'noise': noise,
+        })
+    return cases
+
+
+def render_case(case, font_path=None):
+    fg, bg = CONTRASTS[case['contrast']]
+    seed = sum(ord(c) for c in case['id'])
+    return render_text_image(tuple(case['size']), font_size=case['font_size'], seed=seed,
+                             fg=fg, bg=bg, noise=case['noise'], font_path=font_path)
+
+
+# ================= 正確率 =================
+def normalize(text):
+    """每行收斂空白、去掉空行後再比較"""
+    lines = (re.sub(r'\s+', ' ', line).strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def edit_distance(a, b):
+    if Levenshtein is not None:
+        return Levenshtein.distance(a, b)
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def char_error_rate(predicted, truth):
+    truth = normalize(truth)
+    predicted = normalize(predicted)
+    if not truth:
+        return 0.0 if not predicted else 1.0
+    return edit_distance(predicted, truth) / len(truth)
+
+
+# ================= 量測 =================
+def summarize(values):
+    return {
+        'p50': round(percentile(values, 50), 2),
+        'p95': round(percentile(values, 95), 2),
+        'p99': round(percentile(values, 99), 2),
+        'mean': round(sum(values) / len(values), 2) if values else 0.0,
+    }
+
+
+def buffer_bytes(output):
+    if hasattr(output, 'getbands'):
+        return output.width * output.height * len(output.getbands())
+    return 0
+
+
+def run_case(case, options, repeat, warmup, font_path=None):
+    image, truth = render_case(case, font_path)
+
+    for _ in range(warmup):
+        ocr_core.ocr_image(image, options)
+
+    # 記憶體另跑一次：tracemalloc 會拖慢計時
+    tracemalloc.start()
+    peak = [0]
+
+    def on_memory(name, elapsed, output):
+        _, traced = tracemalloc.get_traced_memory()
+        peak[0] = max(peak[0], traced + buffer_bytes(output))
+        tracemalloc.reset_peak()
+
+    result = ocr_core.ocr_image(image, options, on_stage=on_memory)
+    tracemalloc.stop()
+
+    stages = {}
+    totals = []
+    for _ in range(repeat):
+        def on_stage(name, elapsed, output):
+            stages.setdefault(name, []).append(elapsed * 1000)
+
+        start = time.perf_counter()
+        result = ocr_core.ocr_image(image, options, on_stage=on_stage)
+        totals.append((time.perf_counter() - start) * 1000)
+
+    return totals, {
+        'id': case['id'],
+        'params': case,
+        'total_ms': summarize(totals),
+        'stages_ms': {name: summarize(values) for name, values in stages.items()},
+        'peak_mb': round(peak[0] / (1024 * 1024), 2),
+        'cer': round(char_error_rate(result.text, truth), 4),
+        'scale': result.info.get('scale'),
+        'megapixels': round(image.width * image.height / 1e6, 3),
+    }
+
+
+def run_suite(cases, options, repeat, warmup, font_path=None, progress=True):
+    results = []
+    all_totals = []
+    start = time.perf_counter()
+    for i, case in enumerate(cases, 1):
+        totals, result = run_case(case, options, repeat, warmup, font_path)
+        all_totals.extend(totals)
+        results.append(result)
+        if progress:
+            print(f"\r[{i}/{len(cases)}] {case['id']:<32}", end='', file=sys.stderr, flush=True)
+    if progress:
+        print(file=sys.stderr)
+    elapsed = time.perf_counter() - start
+
+    timed_s = sum(all_totals) / 1000
+    summary = {
+        'cases': len(results),
+        'total_ms': summarize(all_totals),
+        'images_per_s': round(len(results) * repeat / timed_s, 2) if timed_s else 0.0,
+        'megapixels_per_s': round(sum(r['megapixels'] for r in results) * repeat / timed_s, 2) if timed_s else 0.0,
+        'peak_mb': max((r['peak_mb'] for r in results), default=0.0),
+        'mean_cer': round(sum(r['cer'] for r in results) / len(results), 4) if results else 0.0,
+        'cer_by': {},
+        'wall_s': round(elapsed, 1),
+    }
+    for factor in ('font_size', 'contrast', 'noise'):
+        groups = {}
+        for r in results:
+            groups.setdefault(str(r['params'][factor]), []).append(r['cer'])
+        summary['cer_by'][factor] = {k: round(sum(v) / len(v), 4) for k, v in groups.items()}
+    return results, summary
+
+
+def environment(options, simulated):
+    version = None
+    if not simulated:
+        try:
+            import pytesseract
+            version = str(pytesseract.get_tesseract_version())
+        except Exception:
+            pass
+    return {
+        'suite_version': SUITE_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'tesseract': version,
+        'simulated': simulated,
+        'options': options,
+    }
+
+
+# ================= 比較 =================
+def compare(baseline, current):
+    """逐項比較，回傳退步清單 [(case id, 指標, 舊值, 新值), ...]"""
+    regressions = []
+    old_cases = {c['id']: c for c in baseline['cases']}
+    for case in current['cases']:
+        old = old_cases.get(case['id'])
+        if old is None:
+            continue
+        old_ms, new_ms = old['total_ms']['p50'], case['total_ms']['p50']
+        if old_ms and new_ms > old_ms * (1 + LATENCY_TOLERANCE):
+            regressions.append((case['id'], 'p50_ms', old_ms, new_ms))
+        if old['peak_mb'] and case['peak_mb'] > old['peak_mb'] * (1 + MEMORY_TOLERANCE):
+            regressions.append((case['id'], 'peak_mb', old['peak_mb'], case['peak_mb']))
+        if case['cer'] > old['cer'] + CER_TOLERANCE:
+            regressions.append((case['id'], 'cer', old['cer'], case['cer']))
+    return regressions
+
+
+def print_comparison(baseline, current):
+    old, new = baseline['summary'], current['summary']
+    print("\n===== 與基準比較 =====")
+    for label, key in (("總延遲 p50 (ms)", 'p50'), ("總延遲 p95 (ms)", 'p95')):
+        print(f"  {label:<18}{old['total_ms'][key]:>10.1f} → {new['total_ms'][key]:>10.1f}")
+    print(f"  {'吞吐量 (張/秒)':<18}{old['images_per_s']:>10.2f} → {new['images_per_s']:>10.2f}")
+    print(f"  {'記憶體峰值 (MB)':<18}{old['peak_mb']:>10.2f} → {new['peak_mb']:>10.2f}")
+    print(f"  {'平均 CER':<18}{old['mean_cer']:>10.4f} → {new['mean_cer']:>10.4f}")
+    regressions = compare(baseline, current)
+    if regressions:
+        print(f"\n⚠️ {len(regressions)} 項退步：")
+        for case_id, metric, before, after in regressions:
+            print(f"  {case_id:<32}{metric:<8}{before} → {after}")
+    else:
+        print("\n✓ 沒有超出門檻的退步")
+    return regressions
+
+
+def print_report(report):
+    print(f"{'case':<32}{'p50 ms':>9}{'p95 ms':>9}{'峰值 MB':>9}{'倍率':>7}{'CER':>8}")
+    for r in report['cases']:
+        print(f"{r['id']:<32}{r['total_ms']['p50']:>9.1f}{r['total_ms']['p95']:>9.1f}"
+              f"{r['peak_mb']:>9.2f}{r['scale'] or 0:>7.2f}{r['cer']:>8.4f}")
+    s = report['summary']
+    print(f"\n{s['cases']} 組，總延遲 p50 {s['total_ms']['p50']} ms / p95 {s['total_ms']['p95']} ms / "
+          f"p99 {s['total_ms']['p99']} ms，{s['images_per_s']} 張/秒 ({s['megapixels_per_s']} MP/秒)")
+    print(f"記憶體峰值 {s['peak_mb']} MB，平均 CER {s['mean_cer']}")
+    for factor, groups in s['cer_by'].items():
+        print(f"  CER 依 {factor}: " + ', '.join(f"{k}={v}" for k, v in groups.items()))
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', metavar='FILE', help="結果另存為 JSON")
+    parser.add_argument('--baseline', metavar='FILE', help="執行後與此結果比較，有退步時結束代碼為 1")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="只比較兩份已存的結果")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--quick', action='store_true', help="只跑少數組合（快速檢查）")
+    parser.add_argument('--font', metavar='TTF', help="使用指定的 TrueType 字型（預設為 Pillow 內建字型）")
+    parser.add_argument('--preprocess', default=None, choices=('fast', 'legacy'))
+    parser.add_argument('--binarize', default=None, choices=('fixed', 'otsu', 'sauvola'))
+    parser.add_argument('--scale-mode', default=None, choices=('adaptive', 'legacy'))
+    parser.add_argument('--layout', default=None, choices=('single', 'tiled', 'auto'))
+    parser.add_argument('--simulate-ms', type=float, default=None, help="模擬引擎：每百萬像素的辨識毫秒數")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = print_comparison(load(args.compare[0]), load(args.compare[1]))
+        sys.exit(1 if regressions else 0)
+
+    if args.simulate_ms is not None:
+        use_simulated_engine(args.simulate_ms)
+    elif not ocr_core.init_tesseract(verbose=False):
+        parser.error(f"找不到 Tesseract（{ocr_core.tesseract_error_msg}），可改用 --simulate-ms")
+
+    options = ocr_core.resolve_options({
+        'preprocess': args.preprocess, 'binarize': args.binarize,
+        'scale_mode': args.scale_mode, 'layout': args.layout,
+    })
+    grid = QUICK if args.quick else {
+        'font_sizes': FONT_SIZES, 'contrasts': tuple(CONTRASTS), 'noise': NOISE_LEVELS, 'sizes': IMAGE_SIZES,
+    }
+    cases = build_cases(grid['font_sizes'], grid['contrasts'], grid['noise'], grid['sizes'])
+    results, summary = run_suite(cases, options, args.repeat, args.warmup, args.font)
+    report = {'meta': environment(options, args.simulate_ms is not None), 'summary': summary, 'cases': results}
+
+    print_report(report)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n結果已存至 {args.out}")
+    if args.baseline:
+        regressions = print_comparison(load(args.baseline), report)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+分塊平行辨識的擴展性測試：大張合成截圖在不同平行數下的總耗時
+同時比較整張辨識（single）與分塊（tiled）的文字相似度
+
+用法:
+    python benchmarks/bench_tiling.py [--sizes 1920x1080,3840x2160] [--workers 1,2,4,8]
+    python benchmarks/bench_tiling.py --simulate-ms 40   # 沒有 Tesseract 時以固定延遲模擬引擎
+"""
+import argparse
+import difflib
+import json
+import os
+import time
+
+from common import render_text_image, use_simulated_engine
+
+import ocr_core
+
+
+def parse_sizes(text):
+    return [tuple(int(v) for v in item.split('x')) for item in text.split(',')]
+
+
+def default_workers():
+    counts = [1]
+    while counts[-1] * 2 <= (os.cpu_count() or 1):
+        counts.append(counts[-1] * 2)
+    return counts
+
+
+def best_run(image, options, repeat):
+    """回傳 (最佳耗時 ms, 結果)"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = ocr_core.ocr_image(image, options)
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best, result
+
+
+def similarity(a, b):
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=parse_sizes, default=parse_sizes('1920x1080,3840x2160'))
+    parser.add_argument('--workers', default=None, help="逗號分隔的平行數（預設 1,2,4… 到 CPU 核心數）")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--font-size', type=int, default=16)
+    parser.add_argument('--simulate-ms', type=float, default=None, help="模擬引擎：每百萬像素的辨識毫秒數")
+    parser.add_argument('--json', action='store_true', help="以 JSON 輸出結果")
+    args = parser.parse_args()
+
+    workers_list = [int(v) for v in args.workers.split(',')] if args.workers else default_workers()
+    if args.simulate_ms is not None:
+        use_simulated_engine(args.simulate_ms)
+    elif not ocr_core.init_tesseract(verbose=False):
+        parser.error(f"找不到 Tesseract（{ocr_core.tesseract_error_msg}），可改用 --simulate-ms")
+
+    results = []
+    for size in args.sizes:
+        image, truth = render_text_image(size, font_size=args.font_size)
+        single_ms, single = best_run(image, {'layout': 'single'}, args.repeat)
+        entry = {
+            'size': f"{size[0]}x{size[1]}",
+            'single_ms': round(single_ms, 1),
+            'single_similarity': round(similarity(single.text, truth), 4),
+            'tiled': [],
+        }
+        for workers in workers_list:
+            tiled_ms, tiled = best_run(image, {'layout': 'tiled', 'tile_workers': workers}, args.repeat)
+            entry['tiled'].append({
+                'workers': workers,
+                'tiles': tiled.info.get('tiles'),
+                'ms': round(tiled_ms, 1),
+                'speedup': round(single_ms / tiled_ms, 2) if tiled_ms else None,
+                'similarity': round(similarity(tiled.text, truth), 4),
+            })
+        results.append(entry)
+
+    if args.json:
+        print(json.dumps({'cpu_count': os.cpu_count(), 'simulated': args.simulate_ms is not None,
+                          'results': results}, ensure_ascii=False, indent=2))
+        return
+
+    print(f"CPU 核心數: {os.cpu_count()}" + ("（模擬引擎）" if args.simulate_ms is not None else ""))
+    for entry in results:
+        print(f"\n=== {entry['size']} ===")
+        print(f"  single           {entry['single_ms']:>9.1f} ms   相似度 {entry['single_similarity']:.3f}")
+        for row in entry['tiled']:
+            print(f"  tiled x{row['workers']:<3} ({row['tiles']:>2} 塊) {row['ms']:>9.1f} ms   "
+                  f"{row['speedup']:>5.2f}x   相似度 {row['similarity']:.3f}")
+
+
+if __name__ == '__main__':
+    main()
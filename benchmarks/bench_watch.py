@@ -0,0 +1,121 @@
+"""
+區域監看的變動偵測：12~16 px 的介面文字只改一個字元（計數器、數值）時，
+檢查變動範圍有涵蓋該行、其他行不受影響，並量測每張畫面的比對耗時、畫面靜止時的 CPU 佔用與 OCR 呼叫次數
+
+用法:
+    python benchmarks/bench_watch.py [--repeat 20] [--json FILE]
+"""
+import argparse
+import json
+import sys
+import time
+
+from PIL import Image, ImageDraw
+
+from common import load_font, percentile, use_simulated_engine
+
+import ocr_layout
+import ocr_preprocess
+import ocr_watch
+
+FONT_SIZES = (12, 14, 16)
+# (變動前, 變動後)：只差一個字元
+CASES = (("count 123", "count 124"), ("value 7", "value 1"), ("errors: 0", "errors: 8"), ("v1.2.3", "v1.2.8"))
+FILLER = ("status: running", "queue 48 items", "last update 10:24:31")
+SIZE = (400, 120)
+
+
+def render(lines, font_size, fg=(0, 0, 0), bg=(255, 255, 255)):
+    font = load_font(font_size)
+    image = Image.new('RGB', SIZE, bg)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((8, 6 + i * int(font_size * 1.8)), line, fill=fg, font=font)
+    return image
+
+
+def check(before_text, after_text, font_size, dark):
+    """回傳 (變動行是否被標記, 其他行是否誤判, 比對 ms 清單)"""
+    colors = ((230, 230, 230), (30, 30, 30)) if dark else ((0, 0, 0), (255, 255, 255))
+    before = render(FILLER[:1] + (before_text,) + FILLER[1:], font_size, *colors)
+    after = render(FILLER[:1] + (after_text,) + FILLER[1:], font_size, *colors)
+    lines = ocr_layout.find_text_lines(ocr_preprocess.ink_mask(before))
+    reference, current = ocr_watch.grayscale(before), ocr_watch.grayscale(after)
+    rects = ocr_watch.dirty_rects(reference, current)
+    hit = ocr_watch._overlaps(lines[1], rects)
+    false = sum(ocr_watch._overlaps(line, rects) for index, line in enumerate(lines) if index != 1)
+    return hit, false
+
+
+def bench_compare(repeat):
+    """800x400 區域每張畫面的比對耗時（含轉灰階與縮小）"""
+    frame = render(FILLER, 16).resize((800, 400))
+    reference = ocr_watch.grayscale(frame)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ocr_watch.dirty_rects(reference, ocr_watch.grayscale(frame))
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def idle_cpu(polls):
+    """畫面靜止時每次輪詢的 CPU 時間（不含螢幕擷取），換算成最長間隔下的 CPU 佔用百分比"""
+    frame = render(FILLER, 16).resize((800, 400))
+    watcher = ocr_watch.RegionWatcher((0, 0, 800, 400), {'lang': 'eng'})
+    watcher.step(frame)
+    start = time.process_time()
+    for _ in range(polls):
+        watcher.step(frame)
+    per_poll = (time.process_time() - start) / polls * 1000
+    return per_poll, per_poll / (ocr_watch.MAX_INTERVAL * 1000) * 100
+
+
+def count_ocr_calls():
+    """第一張整區一次辨識、之後只改一行時只辨識該行"""
+    watcher = ocr_watch.RegionWatcher((0, 0) + SIZE, {'lang': 'eng'})
+    watcher.step(render(FILLER[:1] + ("count 123",) + FILLER[1:], 14))
+    first = watcher.ocr_calls
+    watcher.step(render(FILLER[:1] + ("count 124",) + FILLER[1:], 14))
+    return first, watcher.ocr_calls - first
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', metavar='FILE', help="另存結果為 JSON")
+    args = parser.parse_args()
+    use_simulated_engine(0)
+
+    report = {'cases': []}
+    missed = 0
+    print(f"{'字級':>4} {'主題':>4} {'變動':<26} {'偵測到':>6} {'誤判行':>6}")
+    for font_size in FONT_SIZES:
+        for dark in (False, True):
+            for before, after in CASES:
+                hit, false = check(before, after, font_size, dark)
+                missed += not hit
+                print(f"{font_size:>4} {'深色' if dark else '淺色':>4} {before + ' → ' + after:<26} "
+                      f"{str(hit):>6} {false:>6}")
+                report['cases'].append({'font_size': font_size, 'dark': dark, 'before': before,
+                                        'after': after, 'detected': hit, 'false_lines': false})
+
+    times = bench_compare(args.repeat)
+    per_poll, idle_percent = idle_cpu(args.repeat * 10)
+    first, changed = count_ocr_calls()
+    report.update(compare_p50_ms=round(percentile(times, 50), 3), idle_poll_cpu_ms=round(per_poll, 3),
+                  idle_cpu_percent=round(idle_percent, 3), first_frame_ocr_calls=first,
+                  one_line_change_ocr_calls=changed, missed=missed)
+    print(f"\n800x400 比對 p50 {report['compare_p50_ms']:.3f} ms；"
+          f"靜止時每次輪詢 CPU {per_poll:.3f} ms（每 {ocr_watch.MAX_INTERVAL:g} 秒一次約 {idle_percent:.2f}%）；"
+          f"OCR 呼叫：第一張 {first} 次，改一行 {changed} 次；漏判 {missed} 例")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n結果已保存: {args.json}")
+    return 1 if missed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
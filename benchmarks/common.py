@@ -0,0 +1,81 @@
+"""
+效能測試共用工具：專案路徑設定、合成文字圖片、統計輔助
+"""
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from ocr_metrics import percentile  # 與執行中的耗時統計共用同一個實作
+
+__all__ = ['ROOT', 'SAMPLE_WORDS', 'load_font', 'random_lines', 'fit_line', 'render_text_image',
+           'use_simulated_engine', 'percentile']
+
+SAMPLE_WORDS = (
+    "ERROR WARN INFO DEBUG request response timeout 200 404 500 user_id session "
+    "latency_ms 12.5 0x1F3A queue worker started stopped retry cache hit miss "
+    "total 1,024 98.7% OK FAILED connection reset /api/v1/items 2026-10-18"
+).split()
+
+
+def load_font(size, path=None):
+    """取得可縮放字型：指定 TrueType 檔案，或 Pillow 10.1+ 內建字型（支援指定大小）
+
+    注意 tessdata/pdf.ttf 是 Tesseract 產生可搜尋 PDF 用的無字形字型，畫不出可見文字
+    """
+    if path:
+        return ImageFont.truetype(path, size)
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def random_lines(count, seed=0, words_per_line=(4, 10)):
+    """產生可重現的隨機文字行"""
+    rng = random.Random(seed)
+    return [
+        ' '.join(rng.choice(SAMPLE_WORDS) for _ in range(rng.randint(*words_per_line)))
+        for _ in range(count)
+    ]
+
+
+def fit_line(line, font, max_width):
+    """只保留畫得進 max_width 的前幾個字，讓標準答案與畫面上的文字一致"""
+    words = line.split(' ')
+    while len(words) > 1 and font.getlength(' '.join(words)) > max_width:
+        words.pop()
+    return ' '.join(words)
+
+
+def render_text_image(size, font_size=16, seed=0, fg=(30, 30, 30), bg=(235, 235, 235),
+                      noise=0.0, font_path=None):
+    """在指定大小的背景上填滿文字行，回傳 (圖片, 文字)；noise 為高斯雜訊標準差"""
+    width, height = size
+    font = load_font(font_size, font_path)
+    line_height = int(font_size * 1.6)
+    lines = [fit_line(line, font, width - 16)
+             for line in random_lines(max(1, (height - 10) // line_height), seed=seed)]
+
+    image = Image.new('RGB', (width, height), bg)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((8, 5 + i * line_height), line, fill=fg, font=font)
+    if noise:
+        rng = np.random.default_rng(seed)
+        pixels = np.asarray(image, dtype=np.float32)
+        pixels += rng.normal(0, noise, pixels.shape).astype(np.float32)
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    return image, '\n'.join(lines)
+
+
+def use_simulated_engine(ms_per_mp):
+    """改用模擬引擎（ocr_engine 的 fake 後端）：每百萬像素 ms_per_mp 毫秒，沒有 Tesseract 時量測流程本身"""
+    import ocr_engine
+    ocr_engine.set_backend(f"fake:ms_per_mp={ms_per_mp},text=")
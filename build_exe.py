@@ -157,7 +157,7 @@ def build_exe():
     print("=" * 50)
     print("\n🚀 打包特點：")
     print("   ✓ 內建 Tesseract-OCR 引擎")
-    print("   ✓ 排除不必要模組（numpy/pandas 等）")
+    print("   ✓ 排除不必要模組（pandas/matplotlib 等）")
     print("   ✓ 僅含英文語言包（最小化體積）")
     print("   ✓ 支援快捷鍵自訂功能")
     print("   ✓ 優化後體積約 40-50 MB\n")
@@ -196,7 +196,7 @@ def build_exe():
     
     # 排除不需要的大型模組以減少體積
     exclude_modules = [
-        'numpy', 'pandas', 'matplotlib', 'scipy', 
+        'pandas', 'matplotlib', 'scipy', 
         'tensorflow', 'torch', 'IPython', 'notebook',
         'sphinx', 'pytest', 'setuptools._vendor',
         'unittest', 'test', 'tests',
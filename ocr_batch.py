@@ -0,0 +1,129 @@
+"""
+CL_Scan 批次辨識（無視窗）
+將資料夾內的圖片分派到多個工作行程進行 OCR，逐筆輸出 JSON Lines 結果
+"""
+import os
+import sys
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from PIL import Image
+
+import ocr_cache
+import ocr_core
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp'}
+
+
+def iter_images(in_dir, recursive=False):
+    """列出資料夾內的圖片檔（依路徑排序）"""
+    if recursive:
+        for dirpath, dirnames, filenames in os.walk(in_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+                    yield os.path.join(dirpath, filename)
+    else:
+        for filename in sorted(os.listdir(in_dir)):
+            path = os.path.join(in_dir, filename)
+            if os.path.isfile(path) and os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+                yield path
+
+
+_cache = None
+
+
+def _init_worker(cache_path=None, cache_perceptual=False):
+    """工作行程初始化：每個行程只偵測一次 Tesseract、開啟一次快取"""
+    global _cache
+    ocr_core.init_tesseract(verbose=False)
+    if cache_path:
+        _cache = ocr_cache.OCRCache(cache_path, perceptual=cache_perceptual)
+
+
+def ocr_file(path, options=None):
+    """辨識單一檔案，回傳可寫入 JSON 的 dict（錯誤不拋出）"""
+    record = {'path': path}
+    try:
+        if not ocr_core.has_tesseract:
+            raise RuntimeError(ocr_core.tesseract_error_msg or "OCR 引擎未載入")
+        with Image.open(path) as image:
+            image.load()
+            result = ocr_core.ocr_image(image, options, cache=_cache)
+        record.update(result.to_dict(output=(options or {}).get('output')))
+    except Exception as e:
+        record['error'] = str(e)
+    return record
+
+
+def run_batch(in_dir, out_path, workers=None, options=None, recursive=False, progress=True, cache_path=None,
+              cache_perceptual=False):
+    """執行批次辨識，結果完成一筆寫一筆；回傳統計資訊"""
+    workers = workers or os.cpu_count() or 1
+    # 限制同時排隊的工作數，避免上萬張圖片一次塞進佇列
+    max_pending = workers * 4
+    # 分塊辨識時各行程平分核心，避免行程數 × 執行緒數超出 CPU
+    if options and options.get('layout') not in (None, 'single') and not options.get('tile_workers'):
+        options = dict(options, tile_workers=max(1, (os.cpu_count() or 1) // workers))
+
+    paths = iter_images(in_dir, recursive)
+    done_count = 0
+    error_count = 0
+    cache_hits = 0
+    start = time.perf_counter()
+
+    out_file = sys.stdout if out_path in (None, '-') else open(out_path, 'w', encoding='utf-8')
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(cache_path, cache_perceptual)) as executor:
+            pending = set()
+            exhausted = False
+            while pending or not exhausted:
+                # 補滿佇列
+                while not exhausted and len(pending) < max_pending:
+                    path = next(paths, None)
+                    if path is None:
+                        exhausted = True
+                        break
+                    pending.add(executor.submit(ocr_file, path, options))
+
+                if not pending:
+                    break
+
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    out_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    out_file.flush()
+                    done_count += 1
+                    if 'error' in record:
+                        error_count += 1
+                    elif record.get('cache') not in (None, 'miss'):
+                        cache_hits += 1
+
+                if progress:
+                    elapsed = time.perf_counter() - start
+                    rate = done_count / elapsed if elapsed > 0 else 0.0
+                    print(f"\r已完成 {done_count} 張 ({rate:.2f} 張/秒)", end='', file=sys.stderr, flush=True)
+    finally:
+        if out_file is not sys.stdout:
+            out_file.close()
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        'images': done_count,
+        'errors': error_count,
+        'cache_hits': cache_hits,
+        'workers': workers,
+        'elapsed_s': round(elapsed, 3),
+        'images_per_s': round(done_count / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    if progress:
+        print(file=sys.stderr)
+        print(f"✓ 共 {stats['images']} 張，錯誤 {stats['errors']} 張，"
+              f"耗時 {stats['elapsed_s']} 秒，{stats['images_per_s']} 張/秒 "
+              f"({workers} 個工作行程)", file=sys.stderr)
+        if cache_path:
+            print(f"✓ 快取命中 {cache_hits} 張", file=sys.stderr)
+    return stats
@@ -0,0 +1,274 @@
+"""
+CL_Scan 辨識結果快取
+以截圖內容雜湊 + 辨識參數為鍵，記憶體 LRU 與 SQLite 磁碟兩層保存；可選感知雜湊比對幾乎相同的截圖
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_VERSION = 1
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_DISK_BYTES = 64 * 1024 * 1024
+DEFAULT_PHASH_DISTANCE = 3  # 磁碟層以 4 段索引查候選，距離上限 3 時保證不漏
+
+
+def image_digest(image):
+    """截圖像素內容雜湊（blake2b，含尺寸與色彩模式）"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.mode}:{image.width}x{image.height}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def params_digest(options):
+    """辨識參數雜湊（任何影響結果的參數變動都會換鍵）"""
+    payload = json.dumps({'v': CACHE_VERSION, 'options': options}, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+
+def perceptual_hash(image):
+    """64-bit dHash：縮成 9x8 灰階後比較相鄰像素亮度"""
+    small = image.convert('L').resize((9, 8))
+    pixels = small.tobytes()
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _phash_bands(value):
+    """切成 4 段 16-bit；距離 ≤ 3 時至少有一段完全相同，可用索引查候選"""
+    return [(value >> shift) & 0xFFFF for shift in (48, 32, 16, 0)]
+
+
+class OCRCache:
+    """兩層快取：記憶體 LRU（行程內）+ SQLite（跨執行、跨行程）"""
+
+    def __init__(self, path=None, memory_entries=DEFAULT_MEMORY_ENTRIES,
+                 disk_bytes=DEFAULT_DISK_BYTES, perceptual=False, phash_distance=DEFAULT_PHASH_DISTANCE):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_bytes = disk_bytes
+        self.perceptual = perceptual
+        self.phash_distance = phash_distance
+        self._memory = OrderedDict()  # (image_key, params_key) -> (text, info, phash, size)
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_total = 0
+        self.hits = {'memory': 0, 'disk': 0, 'perceptual': 0}
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        if path:
+            self._open_disk(path)
+
+    # ---------- 磁碟層 ----------
+    def _open_disk(self, path):
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS results (
+                    image_key TEXT NOT NULL,
+                    params_key TEXT NOT NULL,
+                    width INTEGER, height INTEGER,
+                    b0 INTEGER, b1 INTEGER, b2 INTEGER, b3 INTEGER,
+                    phash TEXT,
+                    text TEXT NOT NULL,
+                    info TEXT,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (image_key, params_key)
+                )''')
+            for band in ('b0', 'b1', 'b2', 'b3'):
+                self._db.execute(f'CREATE INDEX IF NOT EXISTS idx_{band} ON results (params_key, {band})')
+            self._db.execute('CREATE INDEX IF NOT EXISTS idx_last_used ON results (last_used)')
+            self._db.commit()
+            row = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()
+            self._disk_total = row[0]
+        except Exception as e:
+            print(f"快取資料庫開啟失敗，僅使用記憶體快取: {e}")
+            self._db = None
+
+    def _disk_get(self, image_key, params_key):
+        row = self._db.execute(
+            'SELECT text, info FROM results WHERE image_key=? AND params_key=?',
+            (image_key, params_key)
+        ).fetchone()
+        if row is None:
+            return None
+        self._db.execute(
+            'UPDATE results SET last_used=? WHERE image_key=? AND params_key=?',
+            (time.time(), image_key, params_key)
+        )
+        self._db.commit()
+        return row[0], json.loads(row[1] or '{}')
+
+    def _disk_get_similar(self, params_key, phash, size):
+        bands = _phash_bands(phash)
+        rows = self._db.execute(
+            'SELECT image_key, phash, text, info FROM results '
+            'WHERE params_key=? AND width=? AND height=? AND (b0=? OR b1=? OR b2=? OR b3=?)',
+            (params_key, size[0], size[1], *bands)
+        ).fetchall()
+        for image_key, stored, text, info in rows:
+            if stored and hamming(int(stored, 16), phash) <= self.phash_distance:
+                return image_key, text, json.loads(info or '{}')
+        return None
+
+    def _disk_put(self, image_key, params_key, size, phash, text, info):
+        info_json = json.dumps(info, ensure_ascii=False)
+        entry_size = len(text.encode('utf-8')) + len(info_json) + 128
+        bands = _phash_bands(phash) if phash is not None else [None] * 4
+        old = self._db.execute(
+            'SELECT size FROM results WHERE image_key=? AND params_key=?', (image_key, params_key)
+        ).fetchone()
+        self._db.execute(
+            'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (image_key, params_key, size[0], size[1], *bands,
+             f"{phash:016x}" if phash is not None else None,
+             text, info_json, entry_size, time.time())
+        )
+        self._disk_total += entry_size - (old[0] if old else 0)
+        self._evict_disk()
+        self._db.commit()
+
+    def _evict_disk(self):
+        """超過容量上限時刪除最久未使用的項目"""
+        while self._disk_total > self.disk_bytes:
+            rows = self._db.execute(
+                'SELECT image_key, params_key, size FROM results ORDER BY last_used LIMIT 64'
+            ).fetchall()
+            if not rows:
+                self._disk_total = 0
+                break
+            for image_key, params_key, entry_size in rows:
+                self._db.execute(
+                    'DELETE FROM results WHERE image_key=? AND params_key=?', (image_key, params_key)
+                )
+                self._disk_total -= entry_size
+                self.evictions += 1
+                if self._disk_total <= self.disk_bytes:
+                    break
+
+    # ---------- 記憶體層 ----------
+    def _memory_put(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _memory_get_similar(self, params_key, phash, size):
+        for (image_key, key_params), (text, info, stored, stored_size) in reversed(self._memory.items()):
+            if (key_params == params_key and stored is not None and stored_size == size
+                    and hamming(stored, phash) <= self.phash_distance):
+                return (image_key, key_params), text, info
+        return None
+
+    # ---------- 公開介面 ----------
+    def make_key(self, image, options):
+        """計算快取鍵（供 get/put 共用，避免重複雜湊整張圖）"""
+        import ocr_engine
+        phash = perceptual_hash(image) if self.perceptual else None
+        tag = ocr_engine.cache_tag()
+        if tag is not None:
+            # 模擬引擎的結果與 Tesseract 分開存放
+            options = dict(options, engine=tag)
+        return image_digest(image), params_digest(options), phash, image.size
+
+    def get(self, key):
+        """查詢快取，命中回傳 (文字, info, 命中層級)，未命中回傳 None"""
+        image_key, params_key, phash, size = key
+        with self._lock:
+            entry = self._memory.get((image_key, params_key))
+            if entry is not None:
+                self._memory.move_to_end((image_key, params_key))
+                self.hits['memory'] += 1
+                return entry[0], dict(entry[1]), 'memory'
+
+            if self._db is not None:
+                try:
+                    found = self._disk_get(image_key, params_key)
+                except sqlite3.Error as e:
+                    print(f"快取讀取失敗: {e}")
+                    found = None
+                if found is not None:
+                    text, info = found
+                    self._memory_put((image_key, params_key), (text, info, phash, size))
+                    self.hits['disk'] += 1
+                    return text, dict(info), 'disk'
+
+            if phash is not None:
+                similar = self._memory_get_similar(params_key, phash, size)
+                if similar is None and self._db is not None:
+                    try:
+                        found = self._disk_get_similar(params_key, phash, size)
+                    except sqlite3.Error:
+                        found = None
+                    if found is not None:
+                        similar = ((found[0], params_key), found[1], found[2])
+                if similar is not None:
+                    _, text, info = similar
+                    self.hits['perceptual'] += 1
+                    return text, dict(info), 'perceptual'
+
+            self.misses += 1
+            return None
+
+    def put(self, key, text, info):
+        image_key, params_key, phash, size = key
+        with self._lock:
+            self._memory_put((image_key, params_key), (text, dict(info), phash, size))
+            self.stores += 1
+            if self._db is not None:
+                try:
+                    self._disk_put(image_key, params_key, size, phash, text, info)
+                except sqlite3.Error as e:
+                    print(f"快取寫入失敗: {e}")
+
+    def stats(self):
+        """命中 / 未命中統計"""
+        with self._lock:
+            hits = sum(self.hits.values())
+            lookups = hits + self.misses
+            return {
+                'hits': hits,
+                'memory_hits': self.hits['memory'],
+                'disk_hits': self.hits['disk'],
+                'perceptual_hits': self.hits['perceptual'],
+                'misses': self.misses,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'memory_entries': len(self._memory),
+                'disk_bytes': self._disk_total if self._db is not None else 0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM results')
+                self._db.commit()
+                self._disk_total = 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,428 @@
+"""
+CL_Scan 螢幕擷取
+螢幕資訊查詢與可替換的擷取後端（PIL / mss / X11 共享記憶體 / Windows GDI），支援只擷取單一螢幕或選取區域
+"""
+import ctypes
+import ctypes.util
+import os
+import sys
+
+from PIL import Image, ImageGrab
+
+try:
+    import mss  # 選用：跨平台快速擷取
+except ImportError:
+    mss = None
+
+# 擷取模式
+CAPTURE_MODES = {
+    'virtual': "凍結整個虛擬桌面（所有螢幕）",
+    'monitor': "只凍結滑鼠所在的螢幕",
+    'region': "不預先擷取，選取後只擷取選取區域",
+}
+DEFAULT_CAPTURE_MODE = 'monitor'
+
+
+# ================= 螢幕資訊 =================
+def _windows_monitors():
+    """以 EnumDisplayMonitors 列出各螢幕在虛擬桌面中的範圍"""
+    user32 = ctypes.windll.user32
+    monitors = []
+
+    class RECT(ctypes.Structure):
+        _fields_ = [('left', ctypes.c_long), ('top', ctypes.c_long),
+                    ('right', ctypes.c_long), ('bottom', ctypes.c_long)]
+
+    callback_type = ctypes.WINFUNCTYPE(
+        ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p, ctypes.POINTER(RECT), ctypes.c_double
+    )
+
+    def callback(hmonitor, hdc, rect, data):
+        r = rect.contents
+        monitors.append((r.left, r.top, r.right, r.bottom))
+        return 1
+
+    user32.EnumDisplayMonitors(None, None, callback_type(callback), 0)
+    return monitors
+
+
+def _windows_virtual_screen():
+    user32 = ctypes.windll.user32
+    left = user32.GetSystemMetrics(76)    # SM_XVIRTUALSCREEN
+    top = user32.GetSystemMetrics(77)     # SM_YVIRTUALSCREEN
+    width = user32.GetSystemMetrics(78)   # SM_CXVIRTUALSCREEN
+    height = user32.GetSystemMetrics(79)  # SM_CYVIRTUALSCREEN
+    return left, top, left + width, top + height
+
+
+def list_monitors(tk_widget=None):
+    """回傳 [(left, top, right, bottom), ...]（虛擬桌面座標）"""
+    if sys.platform == 'win32':
+        try:
+            monitors = _windows_monitors()
+            if monitors:
+                return monitors
+        except Exception:
+            pass
+    if mss is not None:
+        try:
+            with mss.mss() as sct:
+                return [(m['left'], m['top'], m['left'] + m['width'], m['top'] + m['height'])
+                        for m in sct.monitors[1:]]
+        except Exception:
+            pass
+    return [virtual_screen(tk_widget)]
+
+
+def virtual_screen(tk_widget=None):
+    """整個虛擬桌面範圍 (left, top, right, bottom)"""
+    if sys.platform == 'win32':
+        try:
+            return _windows_virtual_screen()
+        except Exception:
+            pass
+    if tk_widget is not None:
+        return (tk_widget.winfo_vrootx(), tk_widget.winfo_vrooty(),
+                tk_widget.winfo_vrootx() + tk_widget.winfo_screenwidth(),
+                tk_widget.winfo_vrooty() + tk_widget.winfo_screenheight())
+    monitors = list_monitors()
+    return (min(m[0] for m in monitors), min(m[1] for m in monitors),
+            max(m[2] for m in monitors), max(m[3] for m in monitors))
+
+
+def monitor_at(x, y, monitors):
+    """找出包含 (x, y) 的螢幕；都不包含時取最近的一個"""
+    for bounds in monitors:
+        if bounds[0] <= x < bounds[2] and bounds[1] <= y < bounds[3]:
+            return bounds
+
+    def distance(bounds):
+        dx = max(bounds[0] - x, 0, x - bounds[2] + 1)
+        dy = max(bounds[1] - y, 0, y - bounds[3] + 1)
+        return dx * dx + dy * dy
+    return min(monitors, key=distance)
+
+
+# ================= 擷取後端 =================
+class PILGrabber:
+    """Pillow ImageGrab（Windows / macOS / X11 皆可用）
+
+    Windows 上 Pillow 會先擷取整個螢幕再裁切，因此只在選取範圍超出主螢幕時才擷取所有螢幕；
+    Windows 預設改用只複製選取範圍的 GDIGrabber
+    """
+    name = 'pil'
+
+    def grab(self, bbox):
+        if sys.platform != 'win32':
+            return ImageGrab.grab(bbox=bbox)
+        user32 = ctypes.windll.user32
+        # 主螢幕固定位於虛擬桌面的 (0, 0)
+        primary = (0, 0, user32.GetSystemMetrics(0), user32.GetSystemMetrics(1))  # SM_CXSCREEN / SM_CYSCREEN
+        inside = (bbox[0] >= primary[0] and bbox[1] >= primary[1]
+                  and bbox[2] <= primary[2] and bbox[3] <= primary[3])
+        return ImageGrab.grab(bbox=bbox, all_screens=not inside)
+
+    def close(self):
+        pass
+
+
+class MSSGrabber:
+    """mss 套件：直接讀取 BGRA 緩衝區，不經過中介格式"""
+    name = 'mss'
+
+    def __init__(self):
+        if mss is None:
+            raise RuntimeError("未安裝 mss 套件")
+        self._sct = mss.mss()
+
+    def grab(self, bbox):
+        left, top, right, bottom = bbox
+        shot = self._sct.grab({'left': left, 'top': top, 'width': right - left, 'height': bottom - top})
+        return Image.frombuffer('RGB', shot.size, shot.bgra, 'raw', 'BGRX', 0, 1)
+
+    def close(self):
+        self._sct.close()
+
+
+class _BITMAPINFOHEADER(ctypes.Structure):
+    _fields_ = [('biSize', ctypes.c_uint32), ('biWidth', ctypes.c_int32), ('biHeight', ctypes.c_int32),
+                ('biPlanes', ctypes.c_uint16), ('biBitCount', ctypes.c_uint16),
+                ('biCompression', ctypes.c_uint32), ('biSizeImage', ctypes.c_uint32),
+                ('biXPelsPerMeter', ctypes.c_int32), ('biYPelsPerMeter', ctypes.c_int32),
+                ('biClrUsed', ctypes.c_uint32), ('biClrImportant', ctypes.c_uint32)]
+
+
+class GDIGrabber:
+    """Windows GDI：BitBlt 只複製選取範圍，不必先擷取整個虛擬桌面再裁切
+
+    記憶體 DC 與點陣圖依擷取大小保留重複使用，大小改變時才重新配置
+    """
+    name = 'gdi'
+    _SRCCOPY = 0x00CC0020
+    _CAPTUREBLT = 0x40000000  # 一併擷取分層（半透明）視窗
+    _DIB_RGB_COLORS = 0
+
+    def __init__(self):
+        if sys.platform != 'win32':
+            raise RuntimeError("GDI 擷取只支援 Windows")
+        self._user32 = ctypes.windll.user32
+        self._gdi32 = ctypes.windll.gdi32
+        self._declare()
+        self._screen_dc = self._user32.GetDC(None)
+        if not self._screen_dc:
+            raise RuntimeError("GetDC 失敗")
+        self._memory_dc = self._gdi32.CreateCompatibleDC(self._screen_dc)
+        if not self._memory_dc:
+            self._user32.ReleaseDC(None, self._screen_dc)
+            raise RuntimeError("CreateCompatibleDC 失敗")
+        self._bitmap = None
+        self._previous = None
+        self._buffer = None
+        self._size = None
+
+    def _declare(self):
+        user32, gdi32 = self._user32, self._gdi32
+        handle = ctypes.c_void_p
+        user32.GetDC.argtypes = [handle]
+        user32.GetDC.restype = handle
+        user32.ReleaseDC.argtypes = [handle, handle]
+        gdi32.CreateCompatibleDC.argtypes = [handle]
+        gdi32.CreateCompatibleDC.restype = handle
+        gdi32.CreateCompatibleBitmap.argtypes = [handle, ctypes.c_int, ctypes.c_int]
+        gdi32.CreateCompatibleBitmap.restype = handle
+        gdi32.SelectObject.argtypes = [handle, handle]
+        gdi32.SelectObject.restype = handle
+        gdi32.DeleteObject.argtypes = [handle]
+        gdi32.DeleteDC.argtypes = [handle]
+        gdi32.BitBlt.argtypes = [handle, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                 handle, ctypes.c_int, ctypes.c_int, ctypes.c_uint32]
+        gdi32.GetDIBits.argtypes = [handle, handle, ctypes.c_uint, ctypes.c_uint, ctypes.c_void_p,
+                                    ctypes.POINTER(_BITMAPINFOHEADER), ctypes.c_uint]
+
+    def _allocate(self, width, height):
+        """建立指定大小的相容點陣圖與讀取緩衝區"""
+        self._release()
+        bitmap = self._gdi32.CreateCompatibleBitmap(self._screen_dc, width, height)
+        if not bitmap:
+            raise RuntimeError("CreateCompatibleBitmap 失敗")
+        self._previous = self._gdi32.SelectObject(self._memory_dc, bitmap)
+        self._bitmap = bitmap
+        self._buffer = ctypes.create_string_buffer(width * height * 4)
+        self._size = (width, height)
+
+    def _release(self):
+        if self._bitmap is None:
+            return
+        self._gdi32.SelectObject(self._memory_dc, self._previous)
+        self._gdi32.DeleteObject(self._bitmap)
+        self._bitmap = None
+        self._previous = None
+        self._buffer = None
+        self._size = None
+
+    def grab(self, bbox):
+        left, top, right, bottom = bbox
+        width, height = right - left, bottom - top
+        if self._size != (width, height):
+            self._allocate(width, height)
+        if not self._gdi32.BitBlt(self._memory_dc, 0, 0, width, height, self._screen_dc, left, top,
+                                  self._SRCCOPY | self._CAPTUREBLT):
+            raise RuntimeError("BitBlt 失敗")
+        # 高度取負值：由上而下排列，與 PIL 的列順序相同
+        header = _BITMAPINFOHEADER(biSize=ctypes.sizeof(_BITMAPINFOHEADER), biWidth=width, biHeight=-height,
+                                   biPlanes=1, biBitCount=32, biCompression=0)
+        if not self._gdi32.GetDIBits(self._memory_dc, self._bitmap, 0, height, self._buffer,
+                                     ctypes.byref(header), self._DIB_RGB_COLORS):
+            raise RuntimeError("GetDIBits 失敗")
+        return Image.frombuffer('RGB', (width, height), self._buffer.raw, 'raw', 'BGRX', 0, 1)
+
+    def close(self):
+        if getattr(self, '_memory_dc', None):
+            self._release()
+            self._gdi32.DeleteDC(self._memory_dc)
+            self._user32.ReleaseDC(None, self._screen_dc)
+            self._memory_dc = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [('shmseg', ctypes.c_ulong), ('shmid', ctypes.c_int),
+                ('shmaddr', ctypes.c_void_p), ('readOnly', ctypes.c_int)]
+
+
+class _XImage(ctypes.Structure):
+    # 只宣告到需要讀取的欄位；結構體由 Xlib 配置，不會在 Python 端建立
+    _fields_ = [('width', ctypes.c_int), ('height', ctypes.c_int), ('xoffset', ctypes.c_int),
+                ('format', ctypes.c_int), ('data', ctypes.c_void_p), ('byte_order', ctypes.c_int),
+                ('bitmap_unit', ctypes.c_int), ('bitmap_bit_order', ctypes.c_int),
+                ('bitmap_pad', ctypes.c_int), ('depth', ctypes.c_int),
+                ('bytes_per_line', ctypes.c_int), ('bits_per_pixel', ctypes.c_int)]
+
+
+class XShmGrabber:
+    """X11 MIT-SHM：X 伺服器直接把像素寫進共享記憶體，省去經由 socket 傳輸（可於 Xvfb 測試）
+
+    共享記憶體區段依擷取大小保留重複使用，大小改變時才重新配置
+    """
+    name = 'xshm'
+    _ZPIXMAP = 2
+    _IPC_PRIVATE = 0
+    _IPC_CREAT = 0o1000
+    _IPC_RMID = 0
+
+    def __init__(self, display_name=None):
+        x11_path = ctypes.util.find_library('X11')
+        xext_path = ctypes.util.find_library('Xext')
+        if not x11_path or not xext_path:
+            raise RuntimeError("找不到 libX11 / libXext")
+        self._x11 = ctypes.CDLL(x11_path)
+        self._xext = ctypes.CDLL(xext_path)
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._declare()
+
+        name = (display_name or os.environ.get('DISPLAY', '')).encode() or None
+        self._display = self._x11.XOpenDisplay(name)
+        if not self._display:
+            raise RuntimeError("無法連線到 X 伺服器")
+        if not self._xext.XShmQueryExtension(self._display):
+            self._x11.XCloseDisplay(self._display)
+            raise RuntimeError("X 伺服器不支援 MIT-SHM")
+        screen = self._x11.XDefaultScreen(self._display)
+        self._root = self._x11.XRootWindow(self._display, screen)
+        self._visual = self._x11.XDefaultVisual(self._display, screen)
+        self._depth = self._x11.XDefaultDepth(self._display, screen)
+        self._image = None
+        self._seginfo = None
+        self._size = None
+
+    def _declare(self):
+        x11, xext, libc = self._x11, self._xext, self._libc
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        x11.XRootWindow.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDefaultVisual.restype = ctypes.c_void_p
+        x11.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XFree.argtypes = [ctypes.c_void_p]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        xext.XShmCreateImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_void_p,
+            ctypes.POINTER(_XShmSegmentInfo), ctypes.c_uint, ctypes.c_uint
+        ]
+        xext.XShmCreateImage.restype = ctypes.POINTER(_XImage)
+        xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmGetImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(_XImage), ctypes.c_int, ctypes.c_int, ctypes.c_ulong
+        ]
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+    def _allocate(self, width, height):
+        """建立指定大小的共享記憶體影像"""
+        self._release()
+        seginfo = _XShmSegmentInfo()
+        image = self._xext.XShmCreateImage(
+            self._display, self._visual, self._depth, self._ZPIXMAP, None, ctypes.byref(seginfo), width, height
+        )
+        if not image:
+            raise RuntimeError("XShmCreateImage 失敗")
+        size = image.contents.bytes_per_line * height
+        shmid = self._libc.shmget(self._IPC_PRIVATE, size, self._IPC_CREAT | 0o600)
+        if shmid < 0:
+            self._x11.XFree(image)
+            raise OSError(ctypes.get_errno(), "shmget 失敗")
+        addr = self._libc.shmat(shmid, None, 0)
+        if addr in (None, ctypes.c_void_p(-1).value):
+            self._libc.shmctl(shmid, self._IPC_RMID, None)
+            self._x11.XFree(image)
+            raise OSError(ctypes.get_errno(), "shmat 失敗")
+        seginfo.shmid = shmid
+        seginfo.shmaddr = addr
+        seginfo.readOnly = 0
+        image.contents.data = addr
+        self._xext.XShmAttach(self._display, ctypes.byref(seginfo))
+        self._x11.XSync(self._display, 0)
+        # 雙方都已連上後即可標記刪除，行程結束時系統自動回收
+        self._libc.shmctl(shmid, self._IPC_RMID, None)
+        self._image = image
+        self._seginfo = seginfo
+        self._size = (width, height)
+
+    def _release(self):
+        if self._image is None:
+            return
+        self._xext.XShmDetach(self._display, ctypes.byref(self._seginfo))
+        self._x11.XSync(self._display, 0)
+        self._libc.shmdt(self._seginfo.shmaddr)
+        self._image.contents.data = None
+        self._x11.XFree(self._image)
+        self._image = None
+        self._seginfo = None
+        self._size = None
+
+    def grab(self, bbox):
+        left, top, right, bottom = bbox
+        width, height = right - left, bottom - top
+        if self._size != (width, height):
+            self._allocate(width, height)
+        all_planes = (1 << (8 * ctypes.sizeof(ctypes.c_ulong))) - 1
+        if not self._xext.XShmGetImage(self._display, self._root, self._image, left, top, all_planes):
+            raise RuntimeError("XShmGetImage 失敗")
+        info = self._image.contents
+        if info.bits_per_pixel != 32:
+            raise RuntimeError(f"不支援的像素格式: {info.bits_per_pixel} bpp")
+        data = ctypes.string_at(info.data, info.bytes_per_line * height)
+        # 只複製一次：共享記憶體 → Python bytes，再由 PIL 解成 RGB
+        return Image.frombuffer('RGB', (width, height), data, 'raw', 'BGRX', info.bytes_per_line, 1)
+
+    def close(self):
+        if getattr(self, '_display', None):
+            self._release()
+            self._x11.XCloseDisplay(self._display)
+            self._display = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+GRABBERS = {
+    'pil': PILGrabber,
+    'mss': MSSGrabber,
+    'xshm': XShmGrabber,
+    'gdi': GDIGrabber,
+}
+
+
+def create_grabber(name=None):
+    """建立擷取後端；未指定時依平台挑選最快的可用後端"""
+    if name:
+        return GRABBERS[name]()
+    candidates = []
+    if sys.platform == 'win32':
+        candidates.append('gdi')
+    if sys.platform.startswith('linux') and os.environ.get('DISPLAY'):
+        candidates.append('xshm')
+    if mss is not None:
+        candidates.append('mss')
+    for candidate in candidates:
+        try:
+            return GRABBERS[candidate]()
+        except Exception as e:
+            print(f"擷取後端 {candidate} 無法使用: {e}")
+    return PILGrabber()
@@ -0,0 +1,387 @@
+"""
+CL_Scan OCR 核心（不依賴 GUI）
+圖像預處理、Tesseract 辨識與文字清理，供視窗程式與批次模式共用
+"""
+import os
+import sys
+import shutil
+import time
+from dataclasses import dataclass, field
+
+import ocr_profiles
+
+# pytesseract、numpy（ocr_engine / ocr_preprocess）在第一次使用時才匯入，
+# 匯入本模組不會啟動子行程，也不會載入任何 GUI 模組
+
+# ================= 路徑設定（支援打包後執行）=================
+if getattr(sys, 'frozen', False):
+    # 打包後：exe 所在的資料夾
+    BASE_PATH = os.path.dirname(sys.executable)
+else:
+    # 開發中：py 檔案所在的資料夾
+    BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+
+# Tesseract 設定
+TESSERACT_DIR = os.path.join(BASE_PATH, 'tesseract')
+TESSERACT_CMD = os.path.join(TESSERACT_DIR, 'tesseract.exe')
+TESSDATA_DIR = os.path.join(TESSERACT_DIR, 'tessdata')
+
+# 辨識結果快取（與 hotkey_config.json 放在同一資料夾）
+CACHE_PATH = os.path.join(BASE_PATH, 'ocr_cache.sqlite')
+
+# 截圖歷史記錄
+HISTORY_PATH = os.path.join(BASE_PATH, 'ocr_history.sqlite')
+
+has_tesseract = False     # 辨識引擎可用（不需 Tesseract 的後端也視為可用）
+tesseract_probed = False  # init_tesseract() 是否已執行
+tesseract_error_msg = ""
+
+# 預設 OCR 參數（所有入口共用，可被個別呼叫覆寫）
+DEFAULT_OPTIONS = {
+    'lang': 'auto',           # auto: 依文字系統自動選擇語言（ocr_lang）/ 或直接指定 eng、chi_tra+eng…
+    'profile': ocr_profiles.DEFAULT_PROFILE,  # 辨識設定檔（ocr_profiles）：default / numeric / table / code / prose
+    'config': r'--oem 3 --psm 6',  # Tesseract 參數，由設定檔決定（明確指定時優先）
+    'charset': None,          # 辨識後只保留的字元，由設定檔決定（None：英文保留 ASCII、其他語言保留可列印字元）
+    'preprocess': 'fast',     # fast: 向量化處理鏈 / legacy: 原始 PIL 處理鏈
+    'deskew': 'auto',         # auto: 放大前校正傾斜與方向（投影剖面，判斷不了方向時用 OSD）/ projection: 不用 OSD / off
+    'invert': False,          # 反相（深色背景淺色文字）
+    'binarize': 'fixed',      # fixed / otsu / sauvola
+    'threshold': 150,         # fixed 二值化門檻
+    'sauvola_window': 15,     # Sauvola 視窗大小（原圖像素）
+    'sauvola_k': 0.2,
+    'scale': None,            # 放大倍率，None 為依 scale_mode 自動決定
+    'scale_mode': 'adaptive', # adaptive: 依估計的字高縮放（可縮小）/ legacy: 小圖 4 倍、其餘 2.5 倍
+    'layout': 'single',       # single: 整張辨識 / tiled: 切成文字區塊平行辨識 / auto: 大圖才切
+    'tile_workers': None,     # 分塊辨識的平行數（預設為 CPU 核心數）
+    'ensemble': False,        # 多組預處理平行辨識，取平均字詞信心值最高者（ocr_ensemble）
+    'ensemble_target': 80.0,  # 任一組平均信心值達到此值即取消其餘各組
+    'output': 'text',         # text: 純文字 / data: 字詞座標與信心值 / hocr: 另輸出 hOCR（皆為同一次辨識）
+}
+
+
+def init_tesseract(verbose=True):
+    """尋找並測試 Tesseract，設定 has_tesseract / tesseract_error_msg"""
+    global has_tesseract, tesseract_probed, tesseract_error_msg
+    tesseract_probed = True
+
+    import ocr_engine
+    try:
+        backend, _ = ocr_engine.active_backend()
+    except (ValueError, RuntimeError) as e:
+        has_tesseract = False
+        tesseract_error_msg = str(e)
+        if verbose:
+            print(f"✗ {tesseract_error_msg}")
+        return False
+    if not backend.requires_tesseract:
+        # 模擬引擎等後端不需要 tesseract 執行檔與語言包
+        has_tesseract = True
+        tesseract_error_msg = ""
+        if verbose:
+            print(f"✓ 辨識後端: {backend.name}（不使用 Tesseract）")
+        return True
+
+    if os.path.exists(TESSERACT_CMD) and os.path.exists(TESSDATA_DIR):
+        cmd = TESSERACT_CMD
+        os.environ['TESSDATA_PREFIX'] = TESSDATA_DIR
+    else:
+        # 非 Windows 或未附帶引擎時，改用系統 PATH 中的 tesseract
+        cmd = shutil.which('tesseract')
+
+    if cmd is None:
+        # 記錄找不到的原因
+        if not os.path.exists(TESSERACT_DIR):
+            tesseract_error_msg = f"找不到 tesseract 資料夾\n路徑: {TESSERACT_DIR}"
+        elif not os.path.exists(TESSERACT_CMD):
+            tesseract_error_msg = f"找不到 tesseract.exe\n路徑: {TESSERACT_CMD}"
+        elif not os.path.exists(TESSDATA_DIR):
+            tesseract_error_msg = f"找不到 tessdata 資料夾\n路徑: {TESSDATA_DIR}"
+        else:
+            tesseract_error_msg = "未知錯誤"
+        has_tesseract = False
+        if verbose:
+            print(f"✗ {tesseract_error_msg}")
+        return False
+
+    try:
+        import pytesseract
+        pytesseract.pytesseract.tesseract_cmd = cmd
+
+        # 測試 Tesseract 是否能正常工作
+        version = pytesseract.get_tesseract_version()
+        has_tesseract = True
+        tesseract_error_msg = ""
+        if verbose:
+            print(f"✓ Tesseract 已載入 (版本: {version})")
+            print(f"✓ 執行檔: {cmd}")
+            print(f"✓ 語言包: {os.environ.get('TESSDATA_PREFIX', '(系統預設)')}")
+            print(f"✓ 辨識後端: {backend.name}")
+            if not ocr_engine.pool_warm():
+                print(f"⚠ {ocr_engine.COLD_POOL_NOTICE}")
+    except Exception as e:
+        has_tesseract = False
+        tesseract_error_msg = f"初始化失敗: {str(e)}"
+        if verbose:
+            print(f"✗ Tesseract {tesseract_error_msg}")
+    return has_tesseract
+
+
+def tesseract_error_detail():
+    """引擎載入失敗時顯示給使用者的說明"""
+    return f"""OCR 引擎載入失敗
+
+{tesseract_error_msg}
+
+請確認：
+1. tesseract 資料夾在程式目錄中
+2. tessdata 資料夾包含 eng.traineddata
+3. 所有 DLL 檔案完整
+
+程式路徑: {BASE_PATH}
+"""
+
+
+# ================= 輔助函數 =================
+def clean_text(text, lang='eng', charset=None):
+    """移除雜訊字元與空白行；英文只保留 ASCII 可列印字元，其他語言保留所有可列印字元
+
+    charset 指定時（設定檔的後處理）只保留其中的字元
+    """
+    table = ocr_profiles.char_filter(charset, keep_printable=charset is None and lang != 'eng')
+    return '\n'.join(line for line in text.translate(table).splitlines() if line.strip())
+
+
+def resolve_options(options=None):
+    """以 DEFAULT_OPTIONS 為底，依序套用設定檔與呼叫端參數（未知的設定檔丟出 ValueError）"""
+    options = {k: v for k, v in (options or {}).items() if v is not None}
+    merged = dict(DEFAULT_OPTIONS)
+    merged.update(ocr_profiles.profile_options(options.get('profile', merged['profile'])))
+    merged.update(options)
+    return merged
+
+
+@dataclass
+class OCRResult:
+    """單張圖片的辨識結果"""
+    text: str = ""
+    processed_image: object = None  # 預處理後的圖片（調試用，不輸出）
+    info: dict = field(default_factory=dict)
+    data: object = None  # 結構化結果（ocr_structure.OCRData，output 非 text 時才有）
+
+    def to_dict(self, output='data'):
+        """轉為可序列化為 JSON 的 dict（output='hocr' 時附上 hOCR 而非結構化 JSON）"""
+        data = {'text': self.text}
+        data.update(self.info)
+        if self.data is not None:
+            if output == 'hocr':
+                data['hocr'] = self.data.to_hocr()
+            else:
+                data['data'] = self.data.to_dict()
+        return data
+
+
+# ================= 圖像預處理 =================
+def preprocess_image(image, options=None, on_stage=None):
+    """圖像預處理：提高辨識率（灰階、對比、放大、銳化、二值化）"""
+    import ocr_preprocess
+    processed_image, _ = ocr_preprocess.preprocess(image, resolve_options(options), on_stage)
+    return processed_image
+
+
+# ================= OCR =================
+def image_to_text(processed_image, lang='eng', config=DEFAULT_OPTIONS['config']):
+    """執行 OCR（向引擎池借用已初始化的引擎）"""
+    import ocr_engine
+    with ocr_engine.get_engine_pool().acquire(lang, config) as engine:
+        return engine.image_to_text(processed_image)
+
+
+def image_to_data(processed_image, lang='eng', config=DEFAULT_OPTIONS['config']):
+    """執行 OCR，回傳字詞層級的 TSV（座標為 processed_image 的像素）"""
+    import ocr_engine
+    with ocr_engine.get_engine_pool().acquire(lang, config) as engine:
+        return engine.image_to_data(processed_image)
+
+
+def images_to_text(processed_images, lang='eng', config=DEFAULT_OPTIONS['config']):
+    """一次辨識多張圖（後端支援批次時只呼叫一次，否則以同一個引擎逐張辨識）"""
+    import ocr_engine
+    with ocr_engine.get_engine_pool().acquire(lang, config) as engine:
+        if ocr_engine.active_backend()[0].batch:
+            return engine.images_to_text(processed_images)
+        return [engine.image_to_text(image) for image in processed_images]
+
+
+def _ocr_tiled(image, options, on_stage=None):
+    """大圖切成文字區塊平行辨識（不適合分塊時回傳 None，改走整張辨識）"""
+    import ocr_engine
+    import ocr_layout
+    workers = options['tile_workers'] or os.cpu_count() or 1
+    # 每個執行緒需要各自的引擎
+    ocr_engine.get_engine_pool().grow(workers)
+
+    langs = set()
+
+    def recognize(processed_tile):
+        # lang='auto' 時每個區塊各自偵測，只載入該區塊需要的語言
+        lang = resolve_lang(processed_tile, options)[0]
+        langs.add(lang)
+        return image_to_text(processed_tile, lang=lang, config=options['config'])
+
+    def recognize_all(processed_tiles):
+        langs.add(options['lang'])
+        return images_to_text(processed_tiles, lang=options['lang'], config=options['config'])
+
+    if options['lang'] != 'auto' and ocr_engine.active_backend()[0].batch:
+        # 後端支援批次且語言固定：各區塊平行預處理後一次送出
+        recognize_batch = recognize_all
+    else:
+        recognize_batch = None
+
+    tiled = ocr_layout.ocr_tiled(image, options, recognize, workers, on_stage, recognize_batch)
+    if tiled is not None:
+        tiled[2]['lang'] = '+'.join(sorted(langs))
+    return tiled
+
+
+def resolve_lang(processed_image, options, on_stage=None):
+    """options['lang'] 為 auto 時偵測文字系統，回傳 (lang, 偵測資訊或 None)"""
+    if options['lang'] != 'auto':
+        return options['lang'], None
+    import ocr_lang
+    stage_start = time.perf_counter()
+    lang, detected = ocr_lang.detect_language(processed_image)
+    if on_stage is not None:
+        on_stage('detect_lang', time.perf_counter() - stage_start, lang)
+    return lang, detected
+
+
+def ocr_image(image, options=None, cache=None, on_stage=None):
+    """完整流程：預處理 → OCR → 文字清理（可傳入 OCRCache 略過重複的截圖）
+
+    on_stage(name, elapsed_s, output) 會在每個階段結束時呼叫，可用於量測或中止
+    """
+    options = resolve_options(options)
+    structured = options['output'] != 'text'
+    if structured or options['ensemble']:
+        import ocr_engine
+        backend = ocr_engine.active_backend()[0]
+        if not backend.structured:
+            # 結構化輸出與多組預處理（依信心值比較）都需要字詞 TSV
+            raise ValueError(f"辨識後端 {backend.name} 不支援結構化輸出")
+    if structured:
+        import ocr_structure
+        if options['output'] not in ocr_structure.OUTPUT_MODES:
+            raise ValueError(f"未知的輸出模式: {options['output']}")
+        # 結構化輸出需要整張圖的座標，不分塊
+        options['layout'] = 'single'
+    if options['ensemble']:
+        # 各組以整張圖的平均信心值比較，不分塊
+        options['layout'] = 'single'
+    start = time.perf_counter()
+
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(image, options)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            text, info, level = cached
+            data = info.pop('data', None)
+            info['cache'] = level
+            info['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            if data is not None:
+                data = ocr_structure.OCRData.from_dict(data)
+            return OCRResult(text=text, info=info, data=data)
+
+    import ocr_preprocess
+    tiled = None
+    data = None
+    detected = None
+    ensemble = None
+    deskew = None
+    source_size = image.size
+    if options['layout'] != 'single' or options['ensemble']:
+        # 分塊、多組預處理都以整張圖為準：先校正一次，各區塊 / 各組不再各自估計
+        import ocr_deskew
+        stage_start = time.perf_counter()
+        image, deskew = ocr_deskew.deskew_image(image, options)
+        if on_stage is not None:
+            on_stage('deskew', time.perf_counter() - stage_start, image)
+        options['deskew'] = 'off'
+    if options['layout'] != 'single':
+        tiled = _ocr_tiled(image, options, on_stage)
+    if tiled is not None:
+        raw_text, processed_image, state = tiled
+        lang = state['lang']
+    elif options['ensemble']:
+        import ocr_ensemble
+        stage_start = time.perf_counter()
+        best, ensemble = ocr_ensemble.run_ensemble(image, options, on_stage)
+        if on_stage is not None:
+            on_stage('ensemble', time.perf_counter() - stage_start, best['raw_text'])
+        processed_image, state = best['processed_image'], best['state']
+        lang, detected, raw_text = best['lang'], best['detected'], best['raw_text']
+        if structured:
+            data = best['data']
+    else:
+        processed_image, state = ocr_preprocess.preprocess(image, options, on_stage)
+        deskew = state.get('deskew')
+        # 在預處理後的圖上偵測（二值化、字高已調整，OSD 也較準）
+        lang, detected = resolve_lang(processed_image, options, on_stage)
+
+        stage_start = time.perf_counter()
+        if structured:
+            # 一次 image_to_data：文字、座標與信心值都由同一份結果產生
+            tsv = image_to_data(processed_image, lang=lang, config=options['config'])
+            # 先換算到校正後（旋轉過）的截圖，下方再換回原截圖
+            size = deskew.get('size', image.size) if deskew else image.size
+            data = ocr_structure.OCRData.from_tsv(tsv, size, processed_image.size)
+            raw_text = data.text()
+        else:
+            raw_text = image_to_text(processed_image, lang=lang, config=options['config'])
+        if on_stage is not None:
+            on_stage('ocr', time.perf_counter() - stage_start, raw_text)
+
+    if data is not None and deskew and 'size' in deskew:
+        # 校正過的截圖：字詞框反向旋轉回原截圖座標
+        import ocr_deskew
+        data = ocr_structure.OCRData(data.words, ocr_deskew.unrotate_boxes(data.boxes, deskew, source_size),
+                                     data.conf, data.block, data.par, data.line, tuple(source_size))
+
+    stage_start = time.perf_counter()
+    final_text = clean_text(raw_text, lang, options['charset'])
+    if on_stage is not None:
+        on_stage('clean', time.perf_counter() - stage_start, final_text)
+
+    info = {
+        'width': source_size[0],
+        'height': source_size[1],
+        'scale': state.get('scale'),
+        'threshold': state.get('threshold'),
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+    }
+    if deskew is not None and deskew['method'] != 'off':
+        info['deskew'] = deskew
+    if state.get('scale'):
+        # 與原本固定倍率相比省下的像素數（負值代表放得更大）
+        pixels, legacy_pixels = ocr_preprocess.pixel_budget(image.size, state['scale'])
+        info['x_height'] = state.get('x_height')
+        info['pixels'] = pixels
+        info['pixels_saved'] = legacy_pixels - pixels
+    if 'tiles' in state:
+        info['tiles'] = state['tiles']
+        info['tile_workers'] = state['tile_workers']
+    if ensemble is not None:
+        info.update(ensemble)
+    if options['profile'] != ocr_profiles.DEFAULT_PROFILE:
+        info['profile'] = options['profile']
+    if options['lang'] == 'auto':
+        info['lang'] = lang
+        if detected is not None:
+            info['lang_detect'] = detected
+    if data is not None:
+        info['words'] = len(data)
+    if cache is not None:
+        cache.put(cache_key, final_text, info if data is None else dict(info, data=data.to_dict()))
+        info['cache'] = 'miss'
+    return OCRResult(text=final_text, processed_image=processed_image, info=info, data=data)
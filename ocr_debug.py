@@ -0,0 +1,262 @@
+"""
+CL_Scan 調試記錄
+保留最近幾次截圖每個處理階段的中間結果（壓縮或縮小後存在記憶體，總量不超過預算），
+辨識結果不理想時可事後匯出檢查；壓縮與寫檔都在背景執行緒進行，不拖慢截圖
+"""
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime
+
+from PIL import Image
+
+DEFAULT_CAPTURES = 8                     # 保留最近幾次截圖
+DEFAULT_BYTE_BUDGET = 64 * 1024 * 1024   # 所有中間結果壓縮後的總量上限
+MAX_SIDE = 2000        # 灰階/彩色中間圖長邊超過時先縮小（1-bit 圖以位元壓縮保存原尺寸）
+COMPRESS_LEVEL = 1     # zlib 等級：速度優先
+MAX_TEXT = 64 * 1024   # 非圖片的階段輸出（辨識文字、區塊座標）最多保留的字元數
+MAX_PENDING = 64       # 等待壓縮的階段數，超過時丟棄（不阻塞辨識）
+# 等待壓縮的階段仍是未壓縮的整張圖：其原始大小也計入預算，超過時丟棄
+
+_WAKE = object()       # 喚醒背景執行緒處理寫檔工作
+_STOP = object()
+
+
+def raw_bytes(output):
+    """階段輸出未壓縮時佔用的記憶體（非圖片以文字長度估計）"""
+    if isinstance(output, Image.Image):
+        if output.mode == '1':
+            return (output.width + 7) // 8 * output.height
+        return output.width * output.height * len(output.getbands())
+    return len(output) if isinstance(output, str) else 0
+
+
+class Snapshot:
+    """單一階段的中間結果（壓縮後）"""
+
+    def __init__(self, index, name, elapsed, output):
+        self.index = index
+        self.name = name
+        self.elapsed_ms = round(elapsed * 1000, 2)
+        self.mode = None
+        self.size = None
+        self.original_size = None
+        self.text = None
+        self.payload = b''
+        if isinstance(output, Image.Image):
+            self.original_size = output.size
+            image = output
+            if image.mode not in ('1', 'L', 'RGB'):
+                image = image.convert('RGB')
+            if image.mode != '1' and max(image.size) > MAX_SIDE:
+                image = image.reduce(-(-max(image.size) // MAX_SIDE))
+            self.mode = image.mode
+            self.size = image.size
+            self.payload = zlib.compress(image.tobytes(), COMPRESS_LEVEL)
+        else:
+            self.text = (output if isinstance(output, str) else repr(output))[:MAX_TEXT]
+
+    @property
+    def nbytes(self):
+        return len(self.payload) + len(self.text or '')
+
+    def image(self):
+        if self.mode is None:
+            return None
+        return Image.frombytes(self.mode, self.size, zlib.decompress(self.payload))
+
+    def describe(self):
+        entry = {'index': self.index, 'stage': self.name, 'elapsed_ms': self.elapsed_ms}
+        if self.mode is not None:
+            entry.update(mode=self.mode, size=list(self.size), original_size=list(self.original_size))
+        else:
+            entry['output'] = self.text
+        return entry
+
+
+class DebugCapture:
+    """一次截圖的所有中間結果"""
+    _ids = itertools.count(1)
+
+    def __init__(self, options):
+        self.id = next(self._ids)
+        self.timestamp = time.time()
+        self.options = dict(options or {})
+        self.snapshots = []
+        self.info = {}
+        self._index = itertools.count()
+
+    @property
+    def nbytes(self):
+        return sum(snapshot.nbytes for snapshot in self.snapshots)
+
+
+class DebugRecorder:
+    """最近 N 次截圖的中間結果環形緩衝區
+
+    辨識執行緒只把階段輸出的參考放入佇列（滿了、或等待中的原始大小超過預算就丟棄），
+    壓縮、淘汰與匯出都在同一個背景執行緒依序進行
+    """
+
+    def __init__(self, captures=DEFAULT_CAPTURES, byte_budget=DEFAULT_BYTE_BUDGET, enabled=False):
+        self.captures = max(1, captures)
+        self.byte_budget = byte_budget
+        self.enabled = enabled
+        self._ring = deque()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._tasks = queue.Queue(MAX_PENDING)
+        self._writes = queue.Queue()  # 寫檔工作不受 MAX_PENDING 限制
+        self._pending_bytes = 0       # 佇列中尚未壓縮的階段輸出大小
+        self._closing = False
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._worker, name="ocr-debug-writer", daemon=True)
+        self._thread.start()
+
+    # ---------- 辨識執行緒 ----------
+    def begin(self, image, options=None):
+        """開始記錄一次截圖，未啟用時回傳 None"""
+        if not self.enabled:
+            return None
+        capture = DebugCapture(options)
+        self.record(capture, 'input', 0.0, image)
+        return capture
+
+    def record(self, capture, name, elapsed, output):
+        """記錄一個階段的輸出（只放入佇列，不在呼叫端壓縮）"""
+        if capture is None:
+            return
+        size = raw_bytes(output)
+        with self._lock:
+            if self._pending_bytes + size > self.byte_budget:
+                self.dropped += 1
+                return
+            self._pending_bytes += size
+        try:
+            self._tasks.put_nowait((capture, next(capture._index), name, elapsed, output, size))
+        except queue.Full:
+            with self._lock:
+                self._pending_bytes -= size
+            self.dropped += 1
+
+    def finish(self, capture, result=None, error=None):
+        """記錄辨識結果摘要"""
+        if capture is None:
+            return
+        info = {'error': str(error)} if error is not None else {}
+        if result is not None:
+            info = dict(result.info, text=result.text)
+        self.record(capture, 'result', 0.0, info)
+
+    # ---------- 背景執行緒 ----------
+    def _worker(self):
+        while True:
+            task = self._tasks.get()
+            if task is _STOP or self._closing:
+                return
+            if task is not _WAKE:
+                *task, size = task
+                try:
+                    self._store(*task)
+                finally:
+                    with self._lock:
+                        self._pending_bytes -= size
+            # 寫檔前先處理完已排入的階段，匯出的內容包含呼叫當下已記錄的所有階段
+            while self._tasks.empty():
+                try:
+                    func, future = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    future.set_result(func())
+                except Exception as e:
+                    future.set_exception(e)
+
+    def _store(self, capture, index, name, elapsed, output):
+        if name == 'result':
+            capture.info = output
+            return
+        try:
+            snapshot = Snapshot(index, name, elapsed, output)
+        except Exception as e:
+            print(f"調試記錄壓縮失敗 ({name}): {e}")
+            return
+        if snapshot.nbytes > self.byte_budget:
+            self.dropped += 1
+            return
+        with self._lock:
+            if not self._ring or self._ring[-1] is not capture:
+                self._ring.append(capture)
+            capture.snapshots.append(snapshot)
+            self._bytes += snapshot.nbytes
+            # 超過次數或記憶體預算時，由最舊的截圖開始淘汰
+            while len(self._ring) > self.captures or (self._bytes > self.byte_budget and len(self._ring) > 1):
+                oldest = self._ring.popleft()
+                self._bytes -= oldest.nbytes
+            while self._bytes > self.byte_budget and len(capture.snapshots) > 1:
+                self._bytes -= capture.snapshots.pop(0).nbytes
+
+    def _dump(self, directory):
+        with self._lock:
+            captures = list(self._ring)
+        written = 0
+        for capture in captures:
+            stamp = datetime.fromtimestamp(capture.timestamp).strftime("%Y%m%d_%H%M%S")
+            folder = os.path.join(directory, f"{stamp}_{capture.id:04d}")
+            os.makedirs(folder, exist_ok=True)
+            stages = []
+            for snapshot in list(capture.snapshots):
+                image = snapshot.image()
+                if image is not None:
+                    image.save(os.path.join(folder, f"{snapshot.index:02d}_{snapshot.name}.png"))
+                    written += 1
+                stages.append(snapshot.describe())
+            with open(os.path.join(folder, 'capture.json'), 'w', encoding='utf-8') as f:
+                json.dump({'id': capture.id, 'timestamp': capture.timestamp, 'options': capture.options,
+                           'stages': stages, 'result': capture.info},
+                          f, ensure_ascii=False, indent=2, default=str)
+        return {'directory': directory, 'captures': len(captures), 'images': written}
+
+    # ---------- 主執行緒 ----------
+    def _submit(self, func):
+        future = Future()
+        self._writes.put((func, future))
+        try:
+            self._tasks.put_nowait(_WAKE)
+        except queue.Full:
+            pass  # 背景執行緒忙碌中，處理完佇列後會接著寫檔
+        return future
+
+    def dump(self, directory):
+        """在背景匯出目前保留的所有截圖，回傳 Future（結果為 {'directory', 'captures', 'images'}）"""
+        return self._submit(lambda: self._dump(directory))
+
+    def save_image(self, path, image):
+        """在背景保存單張圖片，回傳 Future（結果為路徑）"""
+        return self._submit(lambda: image.save(path) or path)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'captures': len(self._ring),
+                'bytes': self._bytes,
+                'pending_bytes': self._pending_bytes,
+                'byte_budget': self.byte_budget,
+                'dropped': self.dropped,
+            }
+
+    def close(self):
+        """停止背景執行緒（尚未匯出的工作會被丟棄；不會因佇列已滿而阻塞）"""
+        self.enabled = False
+        self._closing = True
+        try:
+            self._tasks.put_nowait(_STOP)
+        except queue.Full:
+            pass  # 背景執行緒處理完目前這一筆就會看到 _closing 而結束
@@ -0,0 +1,230 @@
+"""
+CL_Scan 傾斜與方向校正
+在縮小、二值化的副本上以投影剖面估計文字行的傾斜角度與橫/直方向，需要時才旋轉；
+只有直向或橫直難分時才交給 Tesseract OSD 決定轉 90 / 180 / 270 度（OSD 比投影剖面慢上百倍）
+"""
+import time
+
+import numpy as np
+from PIL import Image
+
+import ocr_engine
+import ocr_preprocess
+
+DESKEW_MODES = ('auto', 'projection', 'off')  # auto: 投影剖面 + 判斷不了時用 OSD / projection: 只用投影剖面
+
+WORK_SIDE = 640        # 估計用的副本長邊上限（像素）；傾斜與行的形狀在縮小後仍清楚
+MAX_POINTS = 12000     # 參與投票的文字像素上限（均勻取樣）
+COARSE_POINTS = 3000   # 粗搜只需要更少的點
+MIN_POINTS = 200       # 文字像素太少時不估計
+MAX_SKEW = 15.0        # 搜尋的傾斜範圍（±度）
+COARSE_STEP = 1.0      # 先以 1 度粗搜，再於最佳角度 ±1 度內以 0.1 度細搜
+FINE_STEP = 0.1
+MIN_SKEW = 0.3         # 小於此角度不旋轉（Tesseract 本身可容忍，旋轉反而讓字變模糊）
+MIN_GAIN = 1.02        # 最佳角度的剖面集中度須比 0 度高出 2% 以上才算傾斜
+
+# 方向判斷：正確方向下的文字行寬而矮（寬高比大），轉 90 度後切出的「行」是單一字元或整頁的欄。
+# 投影剖面分不出上下顛倒（縮小後上伸/下伸部的差異不可靠）：橫書視為正向（截圖絕大多數是正的），
+# 直向或橫直難分時才交給 OSD 決定 90 / 270（或 0 / 180）
+HORIZONTAL_ASPECT = 10.0  # 水平方向的行寬高比達此值即視為橫書，不再檢查直向
+LINE_ASPECT = 4.0      # 直向的行寬高比至少要達此值，且為水平的 ORIENT_MARGIN 倍以上才視為直向
+ORIENT_MARGIN = 2.0
+MIN_OSD_CONF = 1.0     # OSD 的 orientation_conf 低於此值時不採用
+
+# 順時針旋轉角度 → 對應的 transpose
+_TRANSPOSE = {90: Image.Transpose.ROTATE_270, 180: Image.Transpose.ROTATE_180, 270: Image.Transpose.ROTATE_90}
+
+
+def _ink_points(image):
+    """縮小、二值化後的文字像素座標 (ys, xs, 副本尺寸)"""
+    factor = max(1, -(-max(image.size) // WORK_SIDE))
+    gray = image.convert('L')
+    small = gray.reduce(factor) if factor > 1 else gray
+    ys, xs = np.nonzero(ocr_preprocess.ink_mask(small))
+    if len(ys) > MAX_POINTS:
+        step = -(-len(ys) // MAX_POINTS)
+        ys, xs = ys[::step], xs[::step]
+    return ys.astype(np.float32), xs.astype(np.float32), small.size
+
+
+def _profiles(ys, xs, height, angles):
+    """各角度的水平投影剖面（一次 bincount 算完所有角度），回傳 (剖面陣列, 偏移量)"""
+    tans = np.tan(np.radians(angles)).astype(np.float32)
+    offset = int(np.ceil(xs.max(initial=0) * np.abs(tans).max(initial=0))) + 1
+    nbins = height + 2 * offset
+    # 文字行往右上傾斜 skew 度時 y + x·tan(skew) 為常數，該角度的剖面最集中
+    bins = np.rint(ys[None, :] + xs[None, :] * tans[:, None]).astype(np.int32)
+    bins += (np.arange(len(angles), dtype=np.int32) * nbins + offset)[:, None]
+    counts = np.bincount(bins.ravel(), minlength=len(angles) * nbins)
+    return counts.reshape(len(angles), nbins), offset
+
+
+def _sharpness(profiles):
+    # 平方和：文字行與行距分得越開（剖面越集中）越大
+    profiles = profiles.astype(np.float64)
+    return np.einsum('ij,ij->i', profiles, profiles)
+
+
+def estimate_skew(ys, xs, height):
+    """投影剖面搜尋傾斜角度，回傳 (角度, 最佳角度剖面集中度 / 0 度的比值, 該角度的剖面, 偏移量)"""
+    step = max(1, len(ys) // COARSE_POINTS)
+    coarse = np.arange(-MAX_SKEW, MAX_SKEW + COARSE_STEP / 2, COARSE_STEP)
+    scores = _sharpness(_profiles(ys[::step], xs[::step], height, coarse)[0])
+    best = coarse[int(np.argmax(scores))]
+    fine = np.round(np.arange(best - COARSE_STEP, best + COARSE_STEP + FINE_STEP / 2, FINE_STEP), 2)
+    fine = np.union1d(fine[np.abs(fine) <= MAX_SKEW], [0.0])
+    profiles, offset = _profiles(ys, xs, height, fine)
+    scores = _sharpness(profiles)
+    index = int(np.argmax(scores))
+    baseline = scores[int(np.flatnonzero(fine == 0.0)[0])]
+    return float(fine[index]), float(scores[index] / max(baseline, 1.0)), profiles[index], offset
+
+
+def _analyze(ys, xs, height):
+    """單一方向的分析：傾斜角度與文字行的寬高比"""
+    skew, gain, profile, offset = estimate_skew(ys, xs, height)
+    if gain < MIN_GAIN:
+        skew = 0.0
+    # 以該角度的剖面切出文字行（剖面中為 0 的列是行距）
+    edges = np.diff(np.concatenate(([0], profile > 0, [0])).astype(np.int8))
+    tops, bottoms = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    line_of_bin = np.full(len(profile), -1, dtype=np.int32)
+    for line, (top, bottom) in enumerate(zip(tops, bottoms)):
+        line_of_bin[top:bottom] = line
+    bins = np.rint(ys + xs * np.float32(np.tan(np.radians(skew)))).astype(np.int32) + offset
+    lines = line_of_bin[np.clip(bins, 0, len(profile) - 1)]
+
+    # 每行的水平範圍：依行號排序後以 reduceat 取最小/最大 x
+    order = np.argsort(lines, kind='stable')
+    sorted_lines, sorted_xs = lines[order], xs[order]
+    starts = np.flatnonzero(np.concatenate(([True], sorted_lines[1:] != sorted_lines[:-1])))
+    widths = np.maximum.reduceat(sorted_xs, starts) - np.minimum.reduceat(sorted_xs, starts) + 1
+    heights = (bottoms - tops)[sorted_lines[starts]]
+    # 以墨水量加權的中位數：邊角零碎的片段不影響判斷
+    aspects = widths / heights
+    order = np.argsort(aspects)
+    weights = np.cumsum(np.diff(np.concatenate((starts, [len(sorted_lines)])))[order])
+    aspect = float(aspects[order][np.searchsorted(weights, weights[-1] / 2)]) if len(aspects) else 0.0
+    return {'skew': skew, 'gain': gain, 'aspect': aspect, 'lines': len(tops)}
+
+
+def estimate_orientation(image):
+    """估計方向與傾斜：{'rotate'（0：橫書 / 90：直向）, 'skew'（文字行往右上傾斜的角度）,
+    'ambiguous'（直向或橫直難分，需 OSD 確認）, ...}；文字太少時回傳 None"""
+    ys, xs, (width, height) = _ink_points(image)
+    if len(ys) < MIN_POINTS:
+        return None
+    result = _analyze(ys, xs, height)
+    rotate = 0
+    ambiguous = False
+    if result['aspect'] < HORIZONTAL_ASPECT:
+        # 順時針轉 90 度後的座標：x' = H - 1 - y、y' = x
+        vertical = _analyze(xs, (height - 1) - ys, width)
+        if vertical['aspect'] >= LINE_ASPECT and vertical['aspect'] >= result['aspect'] * ORIENT_MARGIN:
+            # 直向：轉 90 還是 270 投影剖面分不出來
+            result, rotate, ambiguous = vertical, 90, True
+        elif vertical['aspect'] >= LINE_ASPECT and result['aspect'] < vertical['aspect'] * ORIENT_MARGIN:
+            ambiguous = True
+    result.update(rotate=rotate, ambiguous=ambiguous)
+    return result
+
+
+def detect_osd(image):
+    """以 Tesseract OSD 判斷方向，回傳順時針旋轉角度；無法判斷時回傳 None"""
+    if ocr_engine.OSD_LANG not in ocr_engine.installed_languages():
+        return None
+    try:
+        with ocr_engine.get_engine_pool().acquire(ocr_engine.OSD_LANG, ocr_engine.OSD_CONFIG) as engine:
+            osd = engine.image_to_osd(image)
+    except Exception:
+        return None
+    if float(osd['orientation_conf']) < MIN_OSD_CONF:
+        return None
+    return int(osd['rotate']) % 360
+
+
+def _background(image):
+    """旋轉後空出的角落以背景色（多數像素的顏色）填滿"""
+    sample = image.reduce(max(1, -(-max(image.size) // WORK_SIDE)))
+    bands = np.asarray(sample).reshape(-1, len(sample.getbands()))
+    color = tuple(int(v) for v in np.median(bands, axis=0))
+    return color[0] if len(color) == 1 else color
+
+
+def rotate_image(image, rotate, skew):
+    """順時針旋轉 rotate（90 的倍數，無損）後再修正 skew 度的傾斜
+
+    傾斜以雙線性內插旋轉：之後還要以 LANCZOS 放大與銳化，雙三次內插的差異看不出來，耗時卻是兩倍以上
+    """
+    if rotate:
+        image = image.transpose(_TRANSPOSE[rotate])
+    if abs(skew) >= MIN_SKEW:
+        image = image.rotate(-skew, resample=Image.Resampling.BILINEAR, expand=True, fillcolor=_background(image))
+    return image
+
+
+def unrotate_boxes(boxes, info, size):
+    """把校正後圖上的框 (left, top, right, bottom) 換回校正前的原圖座標（size 為原圖尺寸）
+
+    四個角依序反向修正傾斜（以兩張圖的中心對齊）與反向轉向，再取外接矩形
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    xs = boxes[:, [0, 2, 2, 0]]
+    ys = boxes[:, [1, 1, 3, 3]]
+    width, height = size
+    rotate = info.get('rotate', 0)
+    turned = (height, width) if rotate in (90, 270) else (width, height)
+    if abs(info.get('skew', 0.0)) >= MIN_SKEW:
+        # rotate(-skew, expand=True) 的反向：以校正後的中心為原點轉回去，再移到轉向後的圖中心
+        angle = np.radians(-info['skew'])
+        cos, sin = np.cos(angle), np.sin(angle)
+        dx = xs - info['size'][0] / 2.0
+        dy = ys - info['size'][1] / 2.0
+        xs = dx * cos - dy * sin + turned[0] / 2.0
+        ys = dx * sin + dy * cos + turned[1] / 2.0
+    if rotate == 90:
+        xs, ys = ys, height - xs
+    elif rotate == 180:
+        xs, ys = width - xs, height - ys
+    elif rotate == 270:
+        xs, ys = width - ys, xs
+    mapped = np.rint(np.stack([xs.min(axis=1), ys.min(axis=1), xs.max(axis=1), ys.max(axis=1)], axis=1))
+    np.clip(mapped[:, 0::2], 0, width, out=mapped[:, 0::2])
+    np.clip(mapped[:, 1::2], 0, height, out=mapped[:, 1::2])
+    return mapped.astype(np.int32)
+
+
+def deskew_image(image, options):
+    """依 options['deskew'] 校正方向與傾斜，回傳 (圖片, 資訊)；不需旋轉時回傳原圖"""
+    mode = options.get('deskew', 'auto')
+    if mode not in DESKEW_MODES:
+        raise ValueError(f"未知的傾斜校正方式: {mode}")
+    info = {'rotate': 0, 'skew': 0.0, 'method': 'off'}
+    if mode == 'off':
+        return image, info
+    start = time.perf_counter()
+    if image.mode not in ('1', 'L', 'RGB', 'RGBA'):
+        image = image.convert('RGB')
+    estimate = estimate_orientation(image)
+    info['method'] = 'projection' if estimate is not None else 'none'
+    if estimate is not None:
+        # 旋轉可交換：傾斜角度不論在哪個方向量測都相同，方向改由 OSD 決定時不需重新估計
+        info['skew'] = estimate['skew']
+        if estimate['ambiguous']:
+            # 直向（90 / 270，或中日文直書）與橫直難分的情況只在 OSD 確認後才轉
+            rotate = None
+            if mode == 'auto':
+                osd_start = time.perf_counter()
+                rotate = detect_osd(image)
+                info['osd_ms'] = round((time.perf_counter() - osd_start) * 1000, 2)
+            if rotate is None:
+                info['ambiguous'] = True
+            else:
+                info['method'] = 'osd'
+                info['rotate'] = rotate
+    info['estimate_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    if info['rotate'] or abs(info['skew']) >= MIN_SKEW:
+        image = rotate_image(image, info['rotate'], info['skew'])
+        info['size'] = list(image.size)  # 校正後的尺寸（換回原圖座標時使用）
+    info['ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return image, info
@@ -0,0 +1,426 @@
+"""
+CL_Scan 多頁文件辨識
+PDF / TIFF 逐頁解碼（同一時間只保留少數幾頁），解碼、預處理與 OCR 分成三段同時進行；
+每完成一頁就寫出該頁的 JSON Lines 記錄與可搜尋 PDF 頁面，中途中斷也保有已完成的頁面
+"""
+import io
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import zlib
+
+from PIL import Image
+
+import ocr_core
+
+try:
+    import pypdfium2 as pdfium  # 選用：PDF 轉圖片
+except ImportError:
+    pdfium = None
+
+try:
+    import fitz  # 選用：PyMuPDF，沒有 pypdfium2 時使用
+except ImportError:
+    fitz = None
+
+DOCUMENT_EXTENSIONS = {'.pdf', '.tif', '.tiff'}
+DEFAULT_DPI = 300           # PDF 轉圖片的解析度；TIFF 沒有記錄 DPI 時也以此換算頁面大小
+PIPELINE_DEPTH = 2          # 每段之間最多等待的頁數
+JPEG_QUALITY = 80
+PDF_FONT_PATH = os.path.join(ocr_core.TESSDATA_DIR, 'pdf.ttf')  # Tesseract 的無字形字型（只做文字層）
+PDF_CHAR_WIDTH = 500        # pdf.ttf 每個字元的寬度（1/1000 em）
+
+
+# ================= 逐頁解碼 =================
+def iter_pages(path, dpi=DEFAULT_DPI):
+    """逐頁產生 (頁碼, 圖片, dpi)，下一頁在被取用時才解碼"""
+    if os.path.splitext(path)[1].lower() == '.pdf':
+        yield from _iter_pdf_pages(path, dpi)
+        return
+    with Image.open(path) as image:
+        for index in range(getattr(image, 'n_frames', 1)):
+            image.seek(index)
+            page = image.copy()
+            page_dpi = image.info.get('dpi', (dpi, dpi))[0] or dpi
+            if page.mode not in ('1', 'L', 'RGB'):
+                page = page.convert('RGB')
+            yield index, page, float(page_dpi)
+
+
+def _iter_pdf_pages(path, dpi):
+    if pdfium is not None:
+        document = pdfium.PdfDocument(path)
+        try:
+            for index in range(len(document)):
+                page = document[index]
+                try:
+                    image = page.render(scale=dpi / 72).to_pil()
+                finally:
+                    page.close()
+                yield index, image.convert('RGB'), float(dpi)
+        finally:
+            document.close()
+    elif fitz is not None:
+        with fitz.open(path) as document:
+            for index, page in enumerate(document):
+                pixmap = page.get_pixmap(dpi=dpi)
+                image = Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+                yield index, image, float(dpi)
+    else:
+        raise RuntimeError("讀取 PDF 需要安裝 pypdfium2 或 PyMuPDF（pip install pypdfium2）")
+
+
+# ================= 管線 =================
+class _Stop(Exception):
+    """其他階段失敗或使用者中止"""
+
+
+def process_document(path, options=None, dpi=DEFAULT_DPI, workers=1):
+    """逐頁辨識，依頁碼順序產生結果 dict
+
+    解碼、預處理各一個執行緒，OCR 有 workers 個執行緒；
+    同時在處理中的頁數不超過 workers + 2 × PIPELINE_DEPTH，記憶體與總頁數無關
+    """
+    import ocr_deskew
+    import ocr_engine
+    import ocr_preprocess
+    import ocr_structure
+    options = ocr_core.resolve_options(dict(options or {}, output='data', layout='single'))
+    # 整頁先校正再預處理（可搜尋 PDF 嵌入校正後的頁面，文字層才對得上），預處理不再重複估計
+    page_options = dict(options, deskew='off')
+    workers = max(1, workers)
+    ocr_engine.get_engine_pool().grow(workers)
+
+    window = threading.Semaphore(workers + 2 * PIPELINE_DEPTH)
+    decoded = queue.Queue(PIPELINE_DEPTH)
+    prepared = queue.Queue(PIPELINE_DEPTH)
+    stop = threading.Event()
+    done = threading.Condition()
+    results = {}
+    state = {'pages': None, 'error': None, 'ocr_running': workers}
+
+    def put(q, item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+        raise _Stop()
+
+    def get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        raise _Stop()
+
+    def fail(error):
+        with done:
+            if state['error'] is None:
+                state['error'] = error
+            stop.set()
+            done.notify_all()
+
+    def decode_stage():
+        count = 0
+        try:
+            pages = iter_pages(path, dpi)
+            while True:
+                while not window.acquire(timeout=0.1):
+                    if stop.is_set():
+                        raise _Stop()
+                start = time.perf_counter()
+                item = next(pages, None)
+                if item is None:
+                    window.release()
+                    break
+                index, image, page_dpi = item
+                timing = {'started': start, 'decode_ms': (time.perf_counter() - start) * 1000}
+                put(decoded, (index, image, page_dpi, timing))
+                count += 1
+            with done:
+                state['pages'] = count
+                done.notify_all()
+            put(decoded, None)
+        except _Stop:
+            pass
+        except Exception as e:
+            fail(e)
+
+    def preprocess_stage():
+        try:
+            while True:
+                item = get(decoded)
+                if item is None:
+                    break
+                index, image, page_dpi, timing = item
+                start = time.perf_counter()
+                deskew = None
+                try:
+                    image, deskew = ocr_deskew.deskew_image(image, options)
+                    processed, _ = ocr_preprocess.preprocess(image, page_options)
+                except Exception as e:
+                    processed = e  # 單頁失敗不中止整份文件
+                if deskew is not None and 'ms' in deskew:
+                    timing['deskew_ms'] = deskew['ms']
+                timing['preprocess_ms'] = (time.perf_counter() - start) * 1000
+                put(prepared, (index, image, page_dpi, processed, timing, deskew))
+            for _ in range(workers):
+                put(prepared, None)
+        except _Stop:
+            pass
+        except Exception as e:
+            fail(e)
+
+    def ocr_stage():
+        try:
+            while True:
+                item = get(prepared)
+                if item is None:
+                    break
+                index, image, page_dpi, processed, timing, deskew = item
+                start = time.perf_counter()
+                page = {'page': index + 1, 'image': image, 'dpi': page_dpi, 'data': None}
+                if deskew is not None and 'size' in deskew:
+                    page['deskew'] = {'rotate': deskew['rotate'], 'skew': deskew['skew'], 'method': deskew['method']}
+                try:
+                    if isinstance(processed, Exception):
+                        raise processed
+                    lang, _ = ocr_core.resolve_lang(processed, options)
+                    tsv = ocr_core.image_to_data(processed, lang=lang, config=options['config'])
+                    page['data'] = ocr_structure.OCRData.from_tsv(tsv, image.size, processed.size)
+                    page['text'] = ocr_core.clean_text(page['data'].text(), lang, options['charset'])
+                    page['lang'] = lang
+                except Exception as e:
+                    page['error'] = str(e)
+                finished = time.perf_counter()
+                timing['ocr_ms'] = (finished - start) * 1000
+                timing['latency_ms'] = (finished - timing.pop('started')) * 1000
+                page['timing'] = {key: round(value, 1) for key, value in timing.items()}
+                with done:
+                    results[index] = page
+                    done.notify_all()
+        except _Stop:
+            pass
+        except Exception as e:
+            fail(e)
+        finally:
+            with done:
+                state['ocr_running'] -= 1
+                done.notify_all()
+
+    threads = [threading.Thread(target=decode_stage, name="doc-decode", daemon=True),
+               threading.Thread(target=preprocess_stage, name="doc-preprocess", daemon=True)]
+    threads += [threading.Thread(target=ocr_stage, name=f"doc-ocr-{i}", daemon=True) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        index = 0
+        while True:
+            with done:
+                # 等到這一頁完成、發生錯誤、所有頁面都已產生，或 OCR 執行緒都已結束
+                while (index not in results and state['error'] is None
+                       and state['pages'] != index and state['ocr_running']):
+                    done.wait()
+                if state['error'] is not None:
+                    raise state['error']
+                page = results.pop(index, None)
+            if page is None:
+                return
+            window.release()
+            yield page
+            index += 1
+    finally:
+        # 使用者提早結束（例如 Ctrl+C）時通知各階段停止
+        stop.set()
+
+
+# ================= 可搜尋 PDF =================
+_TO_UNICODE = b"""/CIDInit /ProcSet findresource begin
+12 dict begin
+begincmap
+/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def
+/CMapName /Adobe-Identify-UCS def
+/CMapType 2 def
+1 begincodespacerange
+<0000> <FFFF>
+endcodespacerange
+1 beginbfrange
+<0000> <FFFF> <0000>
+endbfrange
+endcmap
+CMapName currentdict /CMap defineresource pop
+end
+end
+"""
+
+
+class SearchablePDFWriter:
+    """逐頁寫出可搜尋 PDF：頁面圖片 + 隱形文字層（Tesseract 的 pdf.ttf，CID = UTF-16 編碼）
+
+    每加入一頁就以增量更新（incremental update）附加新的 xref 與 trailer，
+    檔案隨時都是可開啟的 PDF，處理中斷時已完成的頁面不會遺失
+    """
+    CATALOG, PAGES, FONT, CID_FONT, TO_UNICODE, CID_TO_GID, DESCRIPTOR, FONT_FILE = range(1, 9)
+
+    def __init__(self, path, font_path=PDF_FONT_PATH):
+        with open(font_path, 'rb') as f:
+            font_data = f.read()
+        self.file = open(path, 'wb')
+        self.offsets = {}
+        self.pending = []
+        self.kids = []
+        self.next_id = self.FONT_FILE + 1
+        self.prev_xref = None
+        self.file.write(b'%PDF-1.5\n%\xe2\xe3\xcf\xd3\n')
+
+        self._object(self.CATALOG, b'<< /Type /Catalog /Pages 2 0 R >>')
+        self._object(self.FONT, b'<< /Type /Font /Subtype /Type0 /BaseFont /GlyphLessFont /Encoding /Identity-H '
+                                b'/DescendantFonts [4 0 R] /ToUnicode 5 0 R >>')
+        self._object(self.CID_FONT, b'<< /Type /Font /Subtype /CIDFontType2 /BaseFont /GlyphLessFont '
+                                    b'/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> '
+                                    b'/FontDescriptor 7 0 R /CIDToGIDMap 6 0 R /DW %d >>' % PDF_CHAR_WIDTH)
+        self._stream(self.TO_UNICODE, b'', _TO_UNICODE)
+        # 所有 CID 都對應到 pdf.ttf 唯一的字形 1
+        self._stream(self.CID_TO_GID, b'/Filter /FlateDecode', zlib.compress(b'\x00\x01' * 65536))
+        self._object(self.DESCRIPTOR, b'<< /Type /FontDescriptor /FontName /GlyphLessFont /Flags 5 '
+                                      b'/FontBBox [0 0 %d 1000] /ItalicAngle 0 /Ascent 1000 /Descent 0 '
+                                      b'/CapHeight 1000 /StemV 80 /FontFile2 8 0 R >>' % PDF_CHAR_WIDTH)
+        self._stream(self.FONT_FILE, b'/Length1 %d' % len(font_data), font_data)
+
+    def _object(self, obj_id, body):
+        self.offsets[obj_id] = self.file.tell()
+        self.pending.append(obj_id)
+        self.file.write(b'%d 0 obj\n' % obj_id + body + b'\nendobj\n')
+
+    def _stream(self, obj_id, dictionary, data):
+        self._object(obj_id, b'<< ' + dictionary + b' /Length %d >>\nstream\n' % len(data) + data + b'\nendstream')
+
+    def _new_id(self):
+        self.next_id += 1
+        return self.next_id - 1
+
+    @staticmethod
+    def _image_stream(image):
+        """頁面圖片：黑白頁以 1-bit Flate 壓縮，其餘以 JPEG"""
+        if image.mode == '1':
+            return (b'/ColorSpace /DeviceGray /BitsPerComponent 1 /Filter /FlateDecode',
+                    zlib.compress(image.tobytes()))
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=JPEG_QUALITY)
+        color = b'/DeviceGray' if image.mode == 'L' else b'/DeviceRGB'
+        return b'/ColorSpace ' + color + b' /BitsPerComponent 8 /Filter /DCTDecode', buffer.getvalue()
+
+    @staticmethod
+    def _text_layer(data, scale, page_height):
+        """每個字詞一段隱形文字，以水平縮放（Tz）拉到與原圖字詞同寬，供搜尋與選取"""
+        ops = [b'BT', b'3 Tr']
+        for word, box in zip(data.words, data.boxes.tolist()):
+            encoded = word.encode('utf-16-be')
+            chars = len(encoded) // 2
+            left, top, right, bottom = (value * scale for value in box)
+            size = max(1.0, bottom - top)
+            width = max(1.0, right - left)
+            stretch = 100.0 * width / (chars * size * PDF_CHAR_WIDTH / 1000)
+            ops.append(b'/F1 %.2f Tf %.2f Tz 1 0 0 1 %.2f %.2f Tm <%s> Tj' % (
+                size, stretch, left, page_height - bottom, encoded.hex().encode('ascii')))
+        ops.append(b'ET')
+        return b'\n'.join(ops)
+
+    def add_page(self, image, dpi, data=None):
+        scale = 72.0 / dpi
+        width, height = image.width * scale, image.height * scale
+        image_id, content_id, page_id = self._new_id(), self._new_id(), self._new_id()
+
+        image_dict, image_data = self._image_stream(image)
+        self._stream(image_id, b'/Type /XObject /Subtype /Image /Width %d /Height %d ' % image.size + image_dict,
+                     image_data)
+        content = b'q %.2f 0 0 %.2f 0 0 cm /Im0 Do Q\n' % (width, height)
+        if data is not None and len(data):
+            content += self._text_layer(data, scale, height)
+        self._stream(content_id, b'/Filter /FlateDecode', zlib.compress(content))
+        self._object(page_id, b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] '
+                              b'/Resources << /XObject << /Im0 %d 0 R >> /Font << /F1 3 0 R >> >> '
+                              b'/Contents %d 0 R >>' % (width, height, image_id, content_id))
+        self.kids.append(page_id)
+        self._update()
+
+    def _update(self):
+        """寫入最新的頁面樹與一段 xref / trailer（增量更新）"""
+        kids = b' '.join(b'%d 0 R' % kid for kid in self.kids)
+        self._object(self.PAGES, b'<< /Type /Pages /Kids [' + kids + b'] /Count %d >>' % len(self.kids))
+
+        xref_offset = self.file.tell()
+        lines = [b'xref']
+        # 每段都列出空閒串列的開頭（物件 0），部分閱讀器要求 xref 由 0 開始
+        ids = [0] + sorted(self.pending)
+        run_start = 0
+        for i in range(1, len(ids) + 1):
+            if i == len(ids) or ids[i] != ids[i - 1] + 1:
+                run = ids[run_start:i]
+                lines.append(b'%d %d' % (run[0], len(run)))
+                for obj_id in run:
+                    lines.append(b'0000000000 65535 f ' if obj_id == 0 else b'%010d 00000 n ' % self.offsets[obj_id])
+                run_start = i
+        trailer = b'/Size %d /Root 1 0 R' % self.next_id
+        if self.prev_xref is not None:
+            trailer += b' /Prev %d' % self.prev_xref
+        lines.append(b'trailer\n<< ' + trailer + b' >>\nstartxref\n%d\n%%%%EOF\n' % xref_offset)
+        self.file.write(b'\n'.join(lines))
+        self.file.flush()
+        self.prev_xref = xref_offset
+        self.pending = []
+
+    def close(self):
+        if self.pending:
+            self._update()  # 沒有任何頁面時仍寫出合法的空文件
+        self.file.close()
+
+
+# ================= 命令列 =================
+def run_document(path, out_path='-', pdf_path=None, options=None, dpi=DEFAULT_DPI, workers=1):
+    """辨識多頁文件：每頁完成即寫出 JSON Lines（與可搜尋 PDF），回傳錯誤頁數"""
+    if not ocr_core.init_tesseract(verbose=False):
+        print(ocr_core.tesseract_error_msg, file=sys.stderr)
+        return 1
+    out_file = sys.stdout if out_path in (None, '-') else open(out_path, 'w', encoding='utf-8')
+    writer = SearchablePDFWriter(pdf_path) if pdf_path else None
+    pages = errors = 0
+    start = time.perf_counter()
+    latencies = []
+    try:
+        for page in process_document(path, options, dpi=dpi, workers=workers):
+            pages += 1
+            record = {'path': path, 'page': page['page'], 'text': page.get('text', ''), 'lang': page.get('lang')}
+            record.update(page['timing'])
+            if 'deskew' in page:
+                record['deskew'] = page['deskew']
+            if 'error' in page:
+                errors += 1
+                record['error'] = page['error']
+            out_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            out_file.flush()
+            if writer is not None:
+                writer.add_page(page['image'], page['dpi'], page['data'])
+            latencies.append(page['timing']['latency_ms'])
+            print(f"\r第 {pages} 頁完成（{page['timing']['latency_ms']:.0f} ms）", end='', file=sys.stderr, flush=True)
+    except KeyboardInterrupt:
+        print(f"\n已中止，保留前 {pages} 頁", file=sys.stderr)
+    finally:
+        if writer is not None:
+            writer.close()
+        if out_file is not sys.stdout:
+            out_file.close()
+
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    if latencies:
+        print(f"\n✓ 共 {pages} 頁，錯誤 {errors} 頁，耗時 {elapsed:.2f} 秒（{pages / elapsed:.2f} 頁/秒），"
+              f"單頁延遲 p50 {latencies[len(latencies) // 2]:.0f} ms / 最大 {latencies[-1]:.0f} ms", file=sys.stderr)
+    return 1 if errors else 0
@@ -0,0 +1,651 @@
+"""
+CL_Scan OCR 引擎池
+保留已初始化的 Tesseract 實例重複使用，避免每次截圖都重新載入 traineddata；
+辨識後端（tesserocr / tesseract 執行檔 / 模擬引擎）由登錄表依能力與速度挑選
+"""
+import functools
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+try:
+    import pytesseract  # tesseract 執行檔後端需要
+except ImportError:
+    pytesseract = None
+
+try:
+    import tesserocr  # 選用：Tesseract 函式庫綁定，可常駐於記憶體
+except ImportError:
+    tesserocr = None
+
+DEFAULT_POOL_SIZE = 2
+DEFAULT_IDLE_TIMEOUT = 300  # 秒，閒置超過即釋放
+DEFAULT_MEMORY_BUDGET = 768 * 1024 * 1024  # 常駐引擎的語言模型總量上限（估計值）
+MODEL_MEMORY_FACTOR = 3     # 載入後的記憶體約為 traineddata 檔案大小的倍數
+OSD_LANG = 'osd'
+OSD_CONFIG = '--psm 0'      # 只偵測方向與文字系統
+ENGINE_ENV = 'CL_SCAN_ENGINE'  # 指定辨識後端，例如 cli、fake:ms=20,ms_per_mp=40（批次的工作行程也會繼承）
+
+
+def parse_config(config):
+    """解析 '--oem 3 --psm 6 -c key=value' 形式的參數"""
+    oem = None
+    psm = None
+    variables = {}
+    tokens = shlex.split(config or '')
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == '--oem' and i + 1 < len(tokens):
+            oem = int(tokens[i + 1])
+            i += 2
+        elif token == '--psm' and i + 1 < len(tokens):
+            psm = int(tokens[i + 1])
+            i += 2
+        elif token == '-c' and i + 1 < len(tokens):
+            key, _, value = tokens[i + 1].partition('=')
+            variables[key] = value
+            i += 2
+        else:
+            i += 1
+    return oem, psm, variables
+
+
+def decode_output(raw_bytes):
+    """將 Tesseract 輸出的 bytes 解碼為文字（嘗試多種編碼）"""
+    for encoding in ['utf-8', 'big5', 'gbk']:
+        try:
+            return raw_bytes.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return raw_bytes.decode('latin-1')
+
+
+# ================= 語言模型 =================
+def tessdata_dir():
+    """語言包資料夾（由 init_tesseract 設定 TESSDATA_PREFIX；未設定時回傳 None）"""
+    return os.environ.get('TESSDATA_PREFIX') or None
+
+
+_languages = None
+
+
+def installed_languages():
+    """可用的語言（含 osd）：tessdata 中的模型，或後端自行提供的清單；第一次呼叫時列出後保留"""
+    global _languages
+    if _languages is None:
+        found = set()
+        folder = tessdata_dir()
+        backend, params = active_backend()
+        if backend.languages is not None:
+            # 不使用 tessdata 的後端自行提供可用語言
+            found = set(backend.languages(params))
+        elif folder and os.path.isdir(folder):
+            found = {name[:-len('.traineddata')] for name in os.listdir(folder) if name.endswith('.traineddata')}
+        else:
+            try:
+                found = set(pytesseract.get_languages(config=''))
+            except Exception:
+                found = set()
+        if not backend.osd:
+            # 不支援方向偵測的後端：語言偵測與傾斜校正都不會呼叫 OSD
+            found.discard(OSD_LANG)
+        _languages = frozenset(found)
+    return _languages
+
+
+@functools.lru_cache(maxsize=64)
+def model_bytes(lang):
+    """'eng+chi_tra' 各語言模型載入後的估計記憶體（找不到檔案時以 0 計）"""
+    folder = tessdata_dir()
+    if not folder:
+        return 0
+    total = 0
+    for name in lang.split('+'):
+        path = os.path.join(folder, f"{name}.traineddata")
+        if os.path.exists(path):
+            total += os.path.getsize(path) * MODEL_MEMORY_FACTOR
+    return total
+
+
+def engine_memory(key):
+    """引擎常駐記憶體估計；執行檔引擎每次辨識才啟動行程，不佔常駐記憶體"""
+    if not active_backend()[0].resident:
+        return 0
+    return model_bytes(key[0])
+
+
+# ================= 執行檔管線 =================
+def encode_pnm(image):
+    """圖片 → 未壓縮的 PBM / PGM / PPM bytes（只在像素前加一行檔頭，不壓縮、不寫檔）"""
+    if image.mode == '1':
+        # PBM 以 1 代表黑色，與 PIL 相反
+        return b'P4\n%d %d\n' % image.size + image.tobytes('raw', '1;I')
+    if image.mode == 'L':
+        return b'P5\n%d %d\n255\n' % image.size + image.tobytes()
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return b'P6\n%d %d\n255\n' % image.size + image.tobytes()
+
+
+def tesseract_args(image, lang, config, extra=()):
+    """tesseract 命令列：由 stdin 讀圖、結果寫到 stdout"""
+    args = [pytesseract.pytesseract.tesseract_cmd, 'stdin', 'stdout']
+    if lang:
+        args += ['-l', lang]
+    args += shlex.split(config or '', posix=sys.platform != 'win32')
+    # PNM 不記錄解析度；圖片本身帶有 DPI（例如 PDF / TIFF 頁面）時明確告知
+    dpi = image.info.get('dpi')
+    if dpi and dpi[0] and '--dpi' not in args:
+        args += ['--dpi', str(int(round(dpi[0])))]
+    return args + list(extra)
+
+
+def run_tesseract(image, lang, config, extra=()):
+    """以管線執行 tesseract：像素經 stdin 傳入、結果由 stdout 以 bytes 讀回"""
+    args = tesseract_args(image, lang, config, extra)
+    try:
+        # subprocess_args 已設定 stdin / stdout / stderr 管線，並在 Windows 上隱藏主控台視窗
+        proc = subprocess.Popen(args, **pytesseract.pytesseract.subprocess_args())
+    except FileNotFoundError:
+        raise pytesseract.TesseractNotFoundError()
+    stdout, stderr = proc.communicate(encode_pnm(image))
+    if proc.returncode:
+        raise pytesseract.TesseractError(proc.returncode, decode_output(stderr).strip())
+    return stdout
+
+
+# ================= 引擎實作 =================
+class TesseractCLIEngine:
+    """透過 tesseract 執行檔辨識（每次呼叫啟動一個行程，無法常駐）
+
+    圖片以未壓縮的 PNM 經 stdin 傳入、結果由 stdout 讀回，不經過暫存檔；
+    一律取 bytes 再自行解碼一次，避免 UnicodeDecodeError 時整個重跑
+    """
+
+    def __init__(self, lang, config):
+        self.lang = lang
+        self.config = config
+
+    def image_to_text(self, image):
+        return decode_output(run_tesseract(image, self.lang, self.config))
+
+    def image_to_data(self, image):
+        """字詞層級的 TSV（含座標與信心值）"""
+        return decode_output(run_tesseract(image, self.lang, self.config, ('-c', 'tessedit_create_tsv=1')))
+
+    def image_to_osd(self, image):
+        """方向與文字系統偵測：{'orientation', 'rotate', 'orientation_conf', 'script', 'script_conf'}"""
+        config = self.config if '--psm' in (self.config or '') else f"--psm 0 {self.config or ''}"
+        osd = pytesseract.pytesseract.osd_to_dict(decode_output(run_tesseract(image, self.lang, config)))
+        if 'script' not in osd:
+            raise RuntimeError("文字太少，無法偵測方向與文字系統")
+        return {key: osd[key] for key in ('orientation', 'rotate', 'orientation_conf', 'script', 'script_conf')}
+
+    def close(self):
+        pass
+
+
+class TesserocrEngine:
+    """透過 tesserocr 函式庫辨識，語言模型只在建立時載入一次"""
+
+    def __init__(self, lang, config):
+        self.lang = lang
+        self.config = config
+        oem, psm, variables = parse_config(config)
+
+        kwargs = {'lang': lang}
+        tessdata = os.environ.get('TESSDATA_PREFIX')
+        if tessdata:
+            kwargs['path'] = tessdata
+        if psm is not None:
+            kwargs['psm'] = psm
+        if oem is not None:
+            kwargs['oem'] = oem
+        self.api = tesserocr.PyTessBaseAPI(**kwargs)
+        for key, value in variables.items():
+            self.api.SetVariable(key, value)
+
+    def image_to_text(self, image):
+        self.api.SetImage(image)
+        return self.api.GetUTF8Text()
+
+    def image_to_data(self, image):
+        self.api.SetImage(image)
+        self.api.Recognize()
+        return self.api.GetTSVText(0)
+
+    def image_to_osd(self, image):
+        self.api.SetImage(image)
+        osd = self.api.DetectOrientationScript()
+        if not osd:
+            raise RuntimeError("文字太少，無法偵測方向與文字系統")
+        return {
+            'orientation': osd['orient_deg'],
+            'rotate': (360 - osd['orient_deg']) % 360,
+            'orientation_conf': osd['orient_conf'],
+            'script': osd['script_name'],
+            'script_conf': osd['script_conf'],
+        }
+
+    def close(self):
+        self.api.End()
+
+
+class FakeEngine:
+    """模擬引擎：不需 Tesseract，等待設定的延遲後回傳可重現的結果（吞吐量、佇列、快取的負載測試用）
+
+    每次呼叫耗時 ms + ms_per_mp × 百萬像素；未指定 text 時回傳圖片尺寸與像素的 CRC32，
+    相同圖片一定得到相同文字，不同圖片幾乎不會相同
+    """
+
+    def __init__(self, lang, config, ms=0.0, ms_per_mp=0.0, text=None, conf=95.0):
+        self.lang = lang
+        self.config = config
+        self.ms = float(ms)
+        self.ms_per_mp = float(ms_per_mp)
+        self.text = text
+        self.conf = float(conf)
+        self.calls = 0
+
+    def _wait(self, pixels):
+        self.calls += 1
+        delay = self.ms + self.ms_per_mp * pixels / 1e6
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def _text(self, image):
+        if self.text is not None:
+            return self.text
+        return f"FAKE {image.width}x{image.height} {zlib.crc32(image.tobytes()):08x}"
+
+    def image_to_text(self, image):
+        self._wait(image.width * image.height)
+        return self._text(image) + '\n'
+
+    def images_to_text(self, images):
+        """批次辨識：固定開銷只算一次"""
+        self._wait(sum(image.width * image.height for image in images))
+        return [self._text(image) + '\n' for image in images]
+
+    def image_to_data(self, image):
+        """TSV：每行文字一列，字詞依字元數平均分配在圖片寬度上"""
+        self._wait(image.width * image.height)
+        lines = self._text(image).splitlines() or ['']
+        height = max(1, image.height // len(lines))
+        rows = []
+        for line_num, line in enumerate(lines, 1):
+            words = line.split()
+            chars = max(1, sum(len(word) + 1 for word in words))
+            left = 0
+            for word_num, word in enumerate(words, 1):
+                width = image.width * len(word) // chars
+                top = (line_num - 1) * height
+                rows.append(f"5\t1\t1\t1\t{line_num}\t{word_num}\t{left}\t{top}\t{width}\t{height}\t"
+                            f"{self.conf:g}\t{word}")
+                left += image.width * (len(word) + 1) // chars
+        return '\n'.join(rows)
+
+    def image_to_osd(self, image):
+        raise RuntimeError("模擬引擎不支援方向偵測")
+
+    def close(self):
+        pass
+
+
+def create_engine(lang, config):
+    """依目前選用的後端建立引擎（引擎池的預設 factory）"""
+    backend, params = active_backend()
+    return backend.factory(lang, config, **params)
+
+
+# ================= 後端登錄 =================
+class Backend:
+    """可登錄的辨識後端：建立引擎的 factory、是否可用與能力旗標
+
+    structured: 可輸出字詞 TSV（座標、信心值）/ osd: 可偵測方向與文字系統 /
+    batch: 引擎有 images_to_text()，一次呼叫辨識多張 / resident: 語言模型常駐（計入引擎池記憶體預算）/
+    requires_tesseract: 需要 tesseract 執行檔與語言包 / languages: 不使用 tessdata 時回傳可用語言的函式 /
+    priority: auto 時依此由快到慢挑選，負值不參與自動挑選 /
+    cache_tag: 結果與 Tesseract 不同的後端以此區分快取（None 與 Tesseract 共用）/ params: 可接受的參數名稱
+    """
+
+    def __init__(self, name, factory, available=lambda: True, priority=0, structured=True, osd=True,
+                 batch=False, resident=False, requires_tesseract=True, languages=None, cache_tag=None,
+                 params=()):
+        self.name = name
+        self.factory = factory
+        self.available = available
+        self.priority = priority
+        self.structured = structured
+        self.osd = osd
+        self.batch = batch
+        self.resident = resident
+        self.requires_tesseract = requires_tesseract
+        self.languages = languages
+        self.cache_tag = cache_tag
+        self.params = params
+
+    def capabilities(self):
+        return {'structured': self.structured, 'osd': self.osd, 'batch': self.batch, 'resident': self.resident}
+
+
+BACKENDS = {}
+
+
+def register_backend(backend):
+    BACKENDS[backend.name] = backend
+    return backend
+
+
+def _tesserocr_engine(lang, config):
+    # 個別語言組合初始化失敗時（例如模型檔損毀）退回執行檔
+    try:
+        return TesserocrEngine(lang, config)
+    except Exception as e:
+        print(f"tesserocr 初始化失敗，改用 tesseract 執行檔: {e}")
+        return TesseractCLIEngine(lang, config)
+
+
+def _fake_languages(params):
+    return params.get('langs', 'eng').split('+')
+
+
+def _fake_engine(lang, config, langs=None, **params):
+    return FakeEngine(lang, config, **params)
+
+
+register_backend(Backend('tesserocr', _tesserocr_engine, available=lambda: tesserocr is not None,
+                         priority=20, resident=True))
+register_backend(Backend('cli', TesseractCLIEngine, available=lambda: pytesseract is not None, priority=10))
+register_backend(Backend('fake', _fake_engine, priority=-1, osd=False, batch=True, requires_tesseract=False,
+                         languages=_fake_languages, cache_tag='fake',
+                         params=('ms', 'ms_per_mp', 'text', 'conf', 'langs')))
+
+
+def parse_engine_spec(spec):
+    """'fake:ms=20,ms_per_mp=40' → ('fake', {'ms': 20.0, 'ms_per_mp': 40.0})；text 與 langs 保留字串"""
+    name, _, rest = (spec or 'auto').partition(':')
+    params = {}
+    for item in filter(None, rest.split(',')):
+        key, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f"辨識後端參數格式應為 key=value: {item}")
+        params[key.strip()] = value if key.strip() in ('text', 'langs') else float(value)
+    return name.strip() or 'auto', params
+
+
+def select_backend(spec=None):
+    """依指定（或 auto：可用的後端中最快者）挑選後端，回傳 (Backend, 參數)"""
+    name, params = parse_engine_spec(spec)
+    if name == 'auto':
+        ranked = sorted((b for b in BACKENDS.values() if b.priority >= 0 and b.available()),
+                        key=lambda b: -b.priority)
+        if not ranked:
+            raise RuntimeError("沒有可用的辨識後端（請安裝 pytesseract 或 tesserocr）")
+        return ranked[0], params
+    backend = BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"未知的辨識後端: {name}（可用: auto, {', '.join(BACKENDS)}）")
+    if not backend.available():
+        raise RuntimeError(f"辨識後端 {name} 無法使用（缺少對應的套件）")
+    unknown = set(params) - set(backend.params)
+    if unknown:
+        raise ValueError(f"辨識後端 {name} 不接受參數: {', '.join(sorted(unknown))}")
+    return backend, params
+
+
+_backend = None
+
+
+def active_backend():
+    """目前使用的 (Backend, 參數)；第一次呼叫時依環境變數 CL_SCAN_ENGINE 挑選"""
+    global _backend
+    if _backend is None:
+        _backend = select_backend(os.environ.get(ENGINE_ENV))
+    return _backend
+
+
+def set_backend(spec):
+    """切換辨識後端並重建引擎池；同時寫入環境變數，之後啟動的工作行程使用相同後端"""
+    global _backend, _pool, _languages
+    backend = select_backend(spec)
+    os.environ[ENGINE_ENV] = spec
+    with _pool_lock:
+        old, _pool = _pool, None
+        _backend = backend
+        _languages = None
+    if old is not None:
+        old.close()
+    return backend[0]
+
+
+def pool_warm():
+    """引擎池是否真的常駐：只有 resident 後端（tesserocr）會保留已載入的語言模型，
+    執行檔後端（cli）每次辨識仍會啟動一次 tesseract 並重新載入語言包"""
+    return active_backend()[0].resident
+
+
+COLD_POOL_NOTICE = "未安裝 tesserocr：每次辨識都會啟動 tesseract 執行檔並重新載入語言包（引擎池不會常駐）"
+
+
+def cache_tag():
+    """快取鍵需附加的後端標記（模擬引擎的結果不可與真正的辨識結果混用）"""
+    backend, params = active_backend()
+    if backend.cache_tag is None:
+        return None
+    return f"{backend.cache_tag}:{sorted(params.items())}"
+
+
+# ================= 引擎池 =================
+class EnginePool:
+    """依 (語言, 參數) 分組保存引擎，限制總數與語言模型記憶體，超出時釋放最久未用的閒置實例"""
+
+    def __init__(self, max_size=DEFAULT_POOL_SIZE, idle_timeout=DEFAULT_IDLE_TIMEOUT, factory=create_engine,
+                 memory_budget=DEFAULT_MEMORY_BUDGET, memory_cost=engine_memory):
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self.factory = factory
+        self.memory_budget = memory_budget
+        self.memory_cost = memory_cost
+        self._cond = threading.Condition()
+        self._idle = {}   # key -> [(engine, last_used), ...]
+        self._total = 0   # 已建立（閒置 + 使用中）的引擎數
+        self._bytes = 0   # 已建立引擎的估計記憶體
+        self._reaper = None
+        self._closed = False
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def _pop_lru_idle(self, exclude_key=None):
+        """取出最久未使用的閒置引擎（可排除指定 key）"""
+        oldest_key = None
+        oldest_time = None
+        for key, entries in self._idle.items():
+            if key == exclude_key or not entries:
+                continue
+            if oldest_time is None or entries[0][1] < oldest_time:
+                oldest_key = key
+                oldest_time = entries[0][1]
+        if oldest_key is None:
+            return None
+        engine, _ = self._idle[oldest_key].pop(0)
+        if not self._idle[oldest_key]:
+            del self._idle[oldest_key]
+        self._bytes -= self.memory_cost(oldest_key)
+        return engine
+
+    def _checkout(self, key):
+        """取得一個引擎；若需新建則回傳 None（名額已預留）"""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("引擎池已關閉")
+                entries = self._idle.get(key)
+                if entries:
+                    engine, _ = entries.pop()
+                    if not entries:
+                        del self._idle[key]
+                    self.reused += 1
+                    return engine, []
+                victims = []
+                if self.memory_budget is not None:
+                    # 語言模型超出記憶體預算：由最久未用的閒置引擎開始釋放
+                    cost = self.memory_cost(key)
+                    while self._bytes + cost > self.memory_budget:
+                        victim = self._pop_lru_idle(exclude_key=key)
+                        if victim is None:
+                            break  # 其餘都在使用中，暫時超出預算
+                        self._total -= 1
+                        self.evicted += 1
+                        victims.append(victim)
+                if self._total < self.max_size:
+                    self._total += 1
+                    self._bytes += self.memory_cost(key)
+                    return None, victims
+                # 名額已滿：釋放其他組合的閒置引擎騰出空間
+                victim = self._pop_lru_idle(exclude_key=key)
+                if victim is not None:
+                    # 名額直接轉給新引擎，總數不變
+                    self.evicted += 1
+                    self._bytes += self.memory_cost(key)
+                    return None, victims + [victim]
+                self._cond.wait()
+
+    @contextmanager
+    def acquire(self, lang, config):
+        """借用引擎，離開區塊時歸還"""
+        key = (lang, config)
+        engine, to_close = self._checkout(key)
+        for victim in to_close:
+            victim.close()
+        if engine is None:
+            try:
+                engine = self.factory(lang, config)
+            except Exception:
+                self._discard(key)
+                raise
+            with self._cond:
+                self.created += 1
+            self._ensure_reaper()
+
+        try:
+            yield engine
+        except Exception:
+            # 引擎狀態不明，直接丟棄
+            engine.close()
+            self._discard(key)
+            raise
+        else:
+            with self._cond:
+                if self._closed:
+                    self._total -= 1
+                    self._bytes -= self.memory_cost(key)
+                    engine.close()
+                else:
+                    self._idle.setdefault(key, []).append((engine, time.monotonic()))
+                self._cond.notify()
+
+    def _discard(self, key):
+        with self._cond:
+            self._total -= 1
+            self._bytes -= self.memory_cost(key)
+            self._cond.notify()
+
+    def warm(self, lang, config):
+        """預先建立引擎（背景執行緒呼叫，讓第一次截圖不必等待載入）"""
+        with self.acquire(lang, config):
+            pass
+
+    def grow(self, max_size):
+        """提高引擎數上限（分塊平行辨識時每個執行緒各需一個引擎）"""
+        with self._cond:
+            if max_size > self.max_size:
+                self.max_size = max_size
+                self._cond.notify_all()
+
+    def evict_idle(self, now=None):
+        """釋放閒置超過 idle_timeout 的引擎，回傳釋放數量"""
+        now = time.monotonic() if now is None else now
+        expired = []
+        with self._cond:
+            for key in list(self._idle):
+                keep = []
+                for engine, last_used in self._idle[key]:
+                    if now - last_used >= self.idle_timeout:
+                        expired.append(engine)
+                        self._bytes -= self.memory_cost(key)
+                    else:
+                        keep.append((engine, last_used))
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    del self._idle[key]
+            self._total -= len(expired)
+            self.evicted += len(expired)
+            if expired:
+                self._cond.notify_all()
+        for engine in expired:
+            engine.close()
+        return len(expired)
+
+    def _ensure_reaper(self):
+        """啟動背景執行緒定期釋放閒置引擎"""
+        if self.idle_timeout is None or self._reaper is not None:
+            return
+        with self._cond:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name="ocr-engine-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        interval = max(1.0, self.idle_timeout / 4)
+        while not self._closed:
+            time.sleep(interval)
+            self.evict_idle()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'warm': pool_warm(),
+                'size': self._total,
+                'memory_bytes': self._bytes,
+                'memory_budget': self.memory_budget,
+                'idle': sum(len(v) for v in self._idle.values()),
+                'max_size': self.max_size,
+                'created': self.created,
+                'reused': self.reused,
+                'evicted': self.evicted,
+            }
+
+    def close(self):
+        """關閉所有閒置引擎，使用中的引擎歸還時關閉"""
+        with self._cond:
+            self._closed = True
+            engines = [engine for entries in self._idle.values() for engine, _ in entries]
+            self._total -= len(engines)
+            self._bytes -= sum(self.memory_cost(key) * len(entries) for key, entries in self._idle.items())
+            self._idle.clear()
+            self._cond.notify_all()
+        for engine in engines:
+            engine.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_engine_pool():
+    """取得行程內共用的引擎池（GUI 與批次模式皆使用）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = EnginePool()
+        return _pool
@@ -0,0 +1,177 @@
+"""
+CL_Scan 多組預處理辨識
+同一張截圖以多種預處理（反相、不同二值化門檻、不同縮放）辨識，依平均字詞信心值選出最佳結果；
+先單獨辨識第一組（目前的設定），達到信心目標就直接採用，一般截圖的耗時與 CPU 用量與單一處理相同；
+未達標時其餘各組才以有限的執行緒平行辨識，任一組達標即取消尚未開始的組
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import ocr_core
+import ocr_engine
+import ocr_preprocess
+import ocr_structure
+
+# 第一組未達標時，其餘各組最多同時辨識的組數（每組都是一個完整的 Tesseract 行程 / 引擎）
+MAX_WORKERS = 3
+
+# (名稱, 覆寫參數)；依序送出，第一組為目前的設定。scale_factor 為相對於自動倍率的倍數
+VARIANTS = (
+    ('default', {}),
+    ('inverted', {'invert': True}),                        # 深色背景淺色文字
+    ('otsu', {'binarize': 'otsu'}),
+    ('sauvola', {'binarize': 'sauvola'}),                  # 彩色介面、背景明暗不均
+    ('threshold_low', {'binarize': 'fixed', 'threshold': 110}),
+    ('threshold_high', {'binarize': 'fixed', 'threshold': 190}),
+    ('upscale', {'scale_factor': 1.5}),                    # 小字
+)
+
+
+class _Cancelled(Exception):
+    """已有其他組達到信心目標"""
+
+
+def variant_options(image, options, variants=VARIANTS):
+    """展開各組的完整參數（與前面某組完全相同的略過），回傳 [(名稱, 參數), ...]"""
+    # 倍率只估計一次，各組共用（scale_factor 以此為基準）
+    base_scale = ocr_preprocess.resolve_scale(image, options)
+    expanded = []
+    seen = []
+    for name, overrides in variants:
+        overrides = dict(overrides)
+        factor = overrides.pop('scale_factor', None)
+        merged = dict(options, scale=base_scale, **overrides)
+        if factor:
+            merged['scale'] = round(min(ocr_preprocess.SCALE_LIMITS[1], base_scale * factor), 2)
+        if merged in seen:
+            continue
+        seen.append(merged)
+        expanded.append((name, merged))
+    return expanded
+
+
+def mean_confidence(data):
+    """平均字詞信心值（0~100），沒有字詞時為 0"""
+    return float(data.conf.mean()) if len(data) else 0.0
+
+
+def recognize_variant(image, name, options, cancel, on_stage=None):
+    """單組預處理 + 辨識（每個處理階段結束時檢查是否已取消）"""
+    start = time.perf_counter()
+
+    def stage_hook(stage, elapsed, output):
+        if cancel.is_set():
+            raise _Cancelled()
+        if on_stage is not None:
+            on_stage('variant.' + stage, elapsed, output)
+
+    processed, state = ocr_preprocess.preprocess(image, options, stage_hook)
+    lang, detected = ocr_core.resolve_lang(processed, options, stage_hook)
+    if cancel.is_set():
+        raise _Cancelled()
+    stage_start = time.perf_counter()
+    tsv = ocr_core.image_to_data(processed, lang=lang, config=options['config'])
+    data = ocr_structure.OCRData.from_tsv(tsv, image.size, processed.size)
+    raw_text = data.text()
+    if on_stage is not None:
+        on_stage('variant.ocr', time.perf_counter() - stage_start, raw_text)
+    return {
+        'name': name,
+        'processed_image': processed,
+        'state': state,
+        'lang': lang,
+        'detected': detected,
+        'data': data,
+        'raw_text': raw_text,
+        'conf': mean_confidence(data),
+        'chars': sum(len(word) for word in data.words),
+        'ms': round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def best_variant(finished):
+    """選出最佳的一組：平均信心值 × 辨識出的字元數相對於最多一組的比例
+    （避免只認出一兩個字、信心值卻很高的結果勝出）"""
+    most_chars = max(result['chars'] for result in finished) or 1
+    return max(finished, key=lambda result: result['conf'] * min(1.0, result['chars'] / most_chars))
+
+
+def run_ensemble(image, options, on_stage=None, variants=VARIANTS, workers=None):
+    """先辨識第一組，未達標時再平行執行其餘各組，回傳 (最佳一組的結果 dict, 摘要 info)
+
+    第一組平均信心值達到 options['ensemble_target'] 時不再辨識其餘各組；
+    否則其餘各組依序送入 workers 個執行緒（預設為 CPU 核心數，最多 MAX_WORKERS），
+    任一組達標即取消尚未開始的組，執行中的組在下一個處理階段邊界中止
+    """
+    start = time.perf_counter()
+    target = options['ensemble_target']
+    candidates = variant_options(image, options, variants)
+    cancel = threading.Event()
+    finished = []
+    summary = []
+    errors = []
+    early = None
+
+    def collect(name, run):
+        """執行一組並記錄結果；達標時設定 early 並通知其他組停止"""
+        nonlocal early
+        try:
+            result = run()
+        except _Cancelled:
+            summary.append({'name': name, 'state': 'cancelled'})
+            return
+        except (OSError, RuntimeError, ValueError) as e:
+            # 單組辨識失敗不影響其他組；其餘例外（例如呼叫端 on_stage 中止）直接拋出
+            errors.append(e)
+            summary.append({'name': name, 'state': 'error', 'error': str(e)})
+            return
+        finished.append(result)
+        summary.append({'name': name, 'state': 'done', 'conf': round(result['conf'], 1),
+                        'words': len(result['data']), 'ms': result['ms']})
+        if early is None and result['conf'] >= target and result['chars']:
+            early = name
+            cancel.set()
+
+    # 第一組在呼叫端的執行緒單獨辨識：一般截圖到此即可結束
+    first_name, first_options = candidates[0]
+    collect(first_name, lambda: recognize_variant(image, first_name, first_options, cancel, on_stage))
+
+    rest = candidates[1:]
+    if early is None and rest:
+        workers = max(1, min(len(rest), MAX_WORKERS, workers or os.cpu_count() or 1))
+        ocr_engine.get_engine_pool().grow(workers)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr-ensemble") as executor:
+            pending = {executor.submit(recognize_variant, image, name, variant, cancel, on_stage): name
+                       for name, variant in rest}
+            try:
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(pending.pop(future), future.result)
+                    if early is not None:
+                        for future, name in pending.items():
+                            if future.cancel():
+                                summary.append({'name': name, 'state': 'cancelled'})
+                        pending = {future: name for future, name in pending.items() if not future.cancelled()}
+            except BaseException:
+                cancel.set()
+                for future in pending:
+                    future.cancel()
+                raise
+
+    if not finished:
+        raise errors[0] if errors else RuntimeError("所有預處理組合都未完成")
+    if early is not None:
+        best = next(result for result in finished if result['name'] == early)
+    else:
+        best = best_variant(finished)
+    info = {
+        'variant': best['name'],
+        'variant_conf': round(best['conf'], 1),
+        'early_exit': early is not None,
+        'variants': summary,
+        'ensemble_ms': round((time.perf_counter() - start) * 1000, 1),
+    }
+    return best, info
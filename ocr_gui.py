@@ -0,0 +1,1168 @@
+"""
+CL_Scan 視窗程式
+截圖選取與辨識結果視窗；OCR 核心在背景執行緒載入，視窗先行顯示
+"""
+import customtkinter as ctk
+import tkinter as tk
+from PIL import ImageTk
+import os
+import ctypes
+import importlib
+import threading
+import time
+import json
+from collections import OrderedDict
+
+import ocr_cache
+import ocr_capture
+import ocr_core
+import ocr_debug
+import ocr_history
+import ocr_jobs
+import ocr_metrics
+import ocr_overlay
+import ocr_profiles
+import ocr_startup
+from ocr_core import BASE_PATH
+
+ctk.set_appearance_mode("Dark")
+ctk.set_default_color_theme("blue")
+
+# ================= DPI 設定 (關鍵修復) =================
+try:
+    # 設定為 Per-Monitor DPI Aware V2，這對於解決座標偏移至關重要
+    ctypes.windll.shcore.SetProcessDpiAwareness(2)
+except Exception:
+    try:
+        ctypes.windll.user32.SetProcessDPIAware()
+    except Exception:
+        pass
+
+# ================= 截圖工具類別 (修復版) =================
+class SnippingTool(tk.Toplevel):
+    def __init__(self, parent, callback, grabber, mode=ocr_capture.DEFAULT_CAPTURE_MODE, trace=None):
+        super().__init__(parent)
+        self.callback = callback
+        self.grabber = grabber
+        self.mode = mode
+        self.bbox = None  # 選取範圍（虛擬螢幕座標），回調時可取用
+        # 各階段耗時（隱藏主視窗、擷取、建立覆蓋視窗、使用者選取、裁切）
+        self.trace = trace or ocr_metrics.SnipTrace()
+        
+        # 1. 隱藏主視窗並等待一下，確保不會截到主視窗
+        with self.trace.stage('hide_window'):
+            parent.withdraw()
+            time.sleep(0.2)
+        
+        grab_start = time.perf_counter()
+        # 2. 決定覆蓋範圍 (處理多螢幕座標)
+        if mode == 'monitor':
+            # 只覆蓋滑鼠所在的螢幕
+            pointer_x, pointer_y = parent.winfo_pointerxy()
+            bounds = ocr_capture.monitor_at(pointer_x, pointer_y, ocr_capture.list_monitors(parent))
+        else:
+            bounds = ocr_capture.virtual_screen(parent)
+        self.virtual_left, self.virtual_top = bounds[0], bounds[1]
+        self.virtual_width = bounds[2] - bounds[0]
+        self.virtual_height = bounds[3] - bounds[1]
+        
+        # 3. 凍結畫面：只擷取需要的範圍，不進行任何 resize，保持原始像素以確保 OCR 準確度
+        self.original_image = None
+        if mode != 'region':
+            self.original_image = self.grabber.grab(bounds)
+        overlay_start = time.perf_counter()
+        self.trace.add('grab', overlay_start - grab_start)
+        
+        # 4. 設定視窗屬性
+        self.overrideredirect(True) # 無邊框
+        self.attributes('-topmost', True) # 最上層
+        
+        # 設定視窗位置覆蓋整個虛擬螢幕
+        geometry_str = f"{self.virtual_width}x{self.virtual_height}+{self.virtual_left}+{self.virtual_top}"
+        self.geometry(geometry_str)
+        
+        # 5. 建立 Canvas
+        self.canvas = tk.Canvas(
+            self, 
+            width=self.virtual_width, 
+            height=self.virtual_height,
+            cursor="cross", 
+            highlightthickness=0
+        )
+        self.canvas.pack(fill="both", expand=True)
+
+        if self.original_image is not None:
+            # 轉換圖片為 Tkinter 格式，整張亮圖只繪製一次
+            self.tk_original_image = ImageTk.PhotoImage(self.original_image)
+            self.canvas.create_image(0, 0, anchor="nw", image=self.tk_original_image)
+
+            # 6. 「變暗」效果 (微軟截圖風格)：以四個暗色遮罩蓋住選取區以外的範圍
+            self.selection = ocr_overlay.MaskSelectionRenderer(
+                self.canvas, self.virtual_width, self.virtual_height
+            )
+        else:
+            # region 模式：半透明視窗蓋住即時畫面，不保留任何全螢幕圖片
+            self.selection = ocr_overlay.HoleSelectionRenderer(self, self.canvas)
+        # 滑鼠移動事件依螢幕更新率合併，每個畫面最多重繪一次
+        self.motion = ocr_overlay.MotionThrottle(self, self.render_selection)
+
+        # 初始化變數
+        self.start_x = None
+        self.start_y = None
+
+        # 綁定滑鼠事件
+        self.canvas.bind("<ButtonPress-1>", self.on_button_press)
+        self.canvas.bind("<B1-Motion>", self.on_move_press)
+        self.canvas.bind("<ButtonRelease-1>", self.on_button_release)
+        
+        # ESC 或 右鍵 退出
+        self.bind("<Escape>", self.exit_snipping)
+        self.canvas.bind("<Button-3>", self.exit_snipping)
+        
+        # 顯示操作提示
+        self.canvas.create_text(
+            self.virtual_width // 2, 100,
+            text="拖曳滑鼠選取區域 (ESC 取消)",
+            fill="white", font=("Arial", 16, "bold"), tags="instruction"
+        )
+        self.select_start = time.perf_counter()
+        self.trace.add('overlay', self.select_start - overlay_start)
+
+    def on_button_press(self, event):
+        # 記錄起始座標
+        self.start_x = self.canvas.canvasx(event.x)
+        self.start_y = self.canvas.canvasy(event.y)
+        
+        # 清除提示文字
+        self.canvas.delete("instruction")
+        
+        # 顯示選取框 (紅色邊框)
+        self.selection.update(self.start_x, self.start_y, self.start_x, self.start_y)
+
+    def on_move_press(self, event):
+        if self.start_x is None:
+            return
+        self.motion.push(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+
+    def render_selection(self, cur_x, cur_y):
+        # === 實現微軟截圖的「打亮」效果 ===
+        # 計算正規化的座標 (左上, 右下)，只移動遮罩與紅框，成本與選取範圍大小無關
+        x1, y1 = min(self.start_x, cur_x), min(self.start_y, cur_y)
+        x2, y2 = max(self.start_x, cur_x), max(self.start_y, cur_y)
+        self.selection.update(x1, y1, x2, y2)
+
+    def on_button_release(self, event):
+        self.motion.cancel()
+        if self.start_x is None:
+            self.exit_snipping()
+            return
+        crop_start = time.perf_counter()
+        self.trace.add('select', crop_start - self.select_start)
+
+        cur_x = self.canvas.canvasx(event.x)
+        cur_y = self.canvas.canvasy(event.y)
+        
+        x1 = min(self.start_x, cur_x)
+        y1 = min(self.start_y, cur_y)
+        x2 = max(self.start_x, cur_x)
+        y2 = max(self.start_y, cur_y)
+
+        # 關閉截圖視窗
+        self.withdraw()
+        
+        # 執行裁切與回調
+        if (x2 - x1) > 5 and (y2 - y1) > 5:
+            self.bbox = (self.virtual_left + int(x1), self.virtual_top + int(y1),
+                         self.virtual_left + int(x2), self.virtual_top + int(y2))
+            try:
+                if self.original_image is not None:
+                    # 裁切圖片
+                    selected_area = self.original_image.crop((int(x1), int(y1), int(x2), int(y2)))
+                else:
+                    # region 模式：視窗隱藏後只擷取選取區域
+                    self.update_idletasks()
+                    time.sleep(0.05)
+                    selected_area = self.grabber.grab(self.bbox)
+                self.original_image = None
+                self.destroy()
+                self.trace.add('crop', time.perf_counter() - crop_start)
+                self.callback(selected_area)
+            except Exception as e:
+                print(f"裁切錯誤: {e}")
+                self.exit_snipping()
+        else:
+            self.exit_snipping()
+
+    def exit_snipping(self, event=None):
+        self.destroy()
+        # 恢復主視窗
+        self.master.deiconify()
+
+# ================= 截圖歷史視窗 =================
+class HistoryWindow(ctk.CTkToplevel):
+    """截圖歷史：搜尋框 + 虛擬化列表
+
+    只繪製可見的列，資料一次讀一頁、縮圖捲動到時才解碼，兩者都只保留最近用到的少量項目，
+    記憶體用量與歷史筆數無關
+    """
+    ROW_HEIGHT = 64
+    MAX_PAGES = 8        # 保留的資料頁數（每頁 ocr_history.PAGE_SIZE 筆）
+    MAX_THUMBS = 64      # 保留的已解碼縮圖數
+    SEARCH_DELAY = 200   # 毫秒；停止輸入後才查詢
+
+    def __init__(self, parent, history, on_select):
+        super().__init__(parent)
+        self.title("截圖歷史")
+        self.geometry("520x600")
+        self.history = history
+        self.on_select = on_select
+        self.query = ''
+        self.total = 0
+        self.offset = 0          # 列表頂端的像素位置
+        self.pages = OrderedDict()   # 頁碼 -> [記錄, ...]
+        self.thumbs = OrderedDict()  # id -> PhotoImage（None 代表沒有縮圖）
+        self.search_after_id = None
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(2, weight=1)
+
+        self.entry = ctk.CTkEntry(self, placeholder_text="搜尋文字（空白分隔多個詞）",
+                                  font=("Microsoft JhengHei UI", 13), height=32)
+        self.entry.grid(row=0, column=0, columnspan=2, padx=10, pady=(10, 5), sticky="ew")
+        self.entry.bind("<KeyRelease>", self.on_search_key)
+
+        self.lbl_count = ctk.CTkLabel(self, text="", text_color="#AAAAAA", anchor="w")
+        self.lbl_count.grid(row=1, column=0, columnspan=2, padx=12, sticky="ew")
+
+        self.canvas = tk.Canvas(self, bg="#1D1D1D", highlightthickness=0)
+        self.canvas.grid(row=2, column=0, padx=(10, 0), pady=(5, 10), sticky="nsew")
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.on_scrollbar)
+        self.scrollbar.grid(row=2, column=1, padx=(0, 10), pady=(5, 10), sticky="ns")
+
+        self.canvas.bind("<Configure>", lambda e: self.redraw())
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<MouseWheel>", lambda e: self.scroll_by(-e.delta // 120 * self.ROW_HEIGHT))
+        self.canvas.bind("<Button-4>", lambda e: self.scroll_by(-self.ROW_HEIGHT))
+        self.canvas.bind("<Button-5>", lambda e: self.scroll_by(self.ROW_HEIGHT))
+        self.entry.focus()
+        self.refresh()
+
+    # ---------- 資料 ----------
+    def refresh(self, keep_position=False):
+        """重新查詢筆數並清除頁面快取（搜尋條件改變或有新記錄時）"""
+        self.total = self.history.count(self.query)
+        self.pages.clear()
+        if not keep_position:
+            self.offset = 0
+        self.lbl_count.configure(text=f"共 {self.total} 筆" + (f"（搜尋: {self.query}）" if self.query else ""))
+        self.redraw()
+
+    def row(self, index):
+        """第 index 筆記錄（所在的頁不在快取中時查詢一頁）"""
+        page_index, position = divmod(index, ocr_history.PAGE_SIZE)
+        page = self.pages.get(page_index)
+        if page is None:
+            page = self.history.search(self.query, offset=page_index * ocr_history.PAGE_SIZE)
+            self.pages[page_index] = page
+            while len(self.pages) > self.MAX_PAGES:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(page_index)
+        return page[position] if position < len(page) else None
+
+    def thumbnail(self, capture_id):
+        """解碼縮圖（只解碼捲動到的列）"""
+        if capture_id in self.thumbs:
+            self.thumbs.move_to_end(capture_id)
+            return self.thumbs[capture_id]
+        image = self.history.thumbnail(capture_id)
+        photo = ImageTk.PhotoImage(image, master=self.canvas) if image is not None else None
+        self.thumbs[capture_id] = photo
+        while len(self.thumbs) > self.MAX_THUMBS:
+            self.thumbs.popitem(last=False)
+        return photo
+
+    # ---------- 繪製 ----------
+    def redraw(self):
+        height = max(1, self.canvas.winfo_height())
+        width = self.canvas.winfo_width()
+        self.offset = max(0, min(self.offset, self.total * self.ROW_HEIGHT - height))
+        self.canvas.delete("all")
+        first = self.offset // self.ROW_HEIGHT
+        last = min(self.total, (self.offset + height) // self.ROW_HEIGHT + 1)
+        thumb_width = ocr_history.THUMB_SIZE[0] // 2
+        for index in range(first, last):
+            entry = self.row(index)
+            if entry is None:
+                break
+            y = index * self.ROW_HEIGHT - self.offset
+            if index % 2:
+                self.canvas.create_rectangle(0, y, width, y + self.ROW_HEIGHT, fill="#242424", width=0)
+            photo = self.thumbnail(entry['id'])
+            if photo is not None:
+                self.canvas.create_image(6, y + self.ROW_HEIGHT // 2, image=photo, anchor="w")
+            stamp = time.strftime("%m/%d %H:%M", time.localtime(entry['timestamp']))
+            label = ocr_profiles.PROFILES.get(entry['profile'] or '', {}).get('label', '')
+            self.canvas.create_text(thumb_width + 12, y + 6, anchor="nw", fill="#888888",
+                                    font=("Consolas", 9), text=f"{stamp}  {label}")
+            preview = ' / '.join(line for line in entry['preview'].splitlines() if line.strip())
+            self.canvas.create_text(thumb_width + 12, y + 22, anchor="nw", fill="#FFFFFF",
+                                    font=("Consolas", 11), text=preview[:120],
+                                    width=max(50, width - thumb_width - 20))
+        total_height = max(1, self.total * self.ROW_HEIGHT)
+        self.scrollbar.set(self.offset / total_height, min(1.0, (self.offset + height) / total_height))
+
+    # ---------- 事件 ----------
+    def scroll_by(self, pixels):
+        self.offset += pixels
+        self.redraw()
+
+    def on_scrollbar(self, *args):
+        height = self.canvas.winfo_height()
+        if args[0] == 'moveto':
+            self.offset = int(float(args[1]) * self.total * self.ROW_HEIGHT)
+        elif args[0] == 'scroll':
+            step = height if args[2] == 'pages' else self.ROW_HEIGHT
+            self.offset += int(args[1]) * step
+        self.redraw()
+
+    def on_search_key(self, event=None):
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+        self.search_after_id = self.after(self.SEARCH_DELAY, self.apply_search)
+
+    def apply_search(self):
+        self.search_after_id = None
+        query = self.entry.get().strip()
+        if query != self.query:
+            self.query = query
+            self.refresh()
+
+    def on_click(self, event):
+        index = (self.offset + event.y) // self.ROW_HEIGHT
+        if index >= self.total:
+            return
+        entry = self.row(index)
+        if entry is not None:
+            self.on_select(entry['id'])
+
+
+# ================= 主程式 =================
+class OCRApp(ctk.CTk):
+    def __init__(self, bench_startup=None):
+        super().__init__()
+
+        self.title("CL_Scan (OCR Tool)")
+        self.geometry("500x700")
+        
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(5, weight=1)
+        
+        # 調試模式：記錄最近幾次截圖每個處理階段的中間結果（右鍵點擊保存按鈕切換）
+        self.debug_mode = False
+        self.debug_recorder = None  # ocr_debug.DebugRecorder，由 init_ocr() 建立
+        self.last_processed_image = None
+        
+        # 辨識結果快取與背景辨識佇列由 init_ocr() 在背景建立，視窗不必等待
+        self.cache = None
+        self.jobs = None
+        self.ocr_ready = threading.Event()
+        self.pending_image = None  # OCR 核心尚未就緒時先保留的截圖
+        self.bench_startup = bench_startup
+        self.current_job = None
+        self.watcher = None  # 區域監看（ocr_watch.RegionWatcher）
+        self.scroller = None  # 捲動長截圖（ocr_scroll.ScrollCapture）
+        self.scroll_after_id = None
+        self.scroll_unaligned = 0  # 已提示過的「對不上」次數
+        self.history = None  # 截圖歷史（ocr_history.CaptureHistory），由 init_ocr() 開啟
+        self.history_window = None
+        self.history_image = None  # 辨識中截圖的原圖，完成後存入歷史縮圖
+        self.watch_after_id = None
+        self.watch_log_path = os.path.join(BASE_PATH, 'ocr_watch.jsonl')
+        
+        # 各階段耗時：每次截圖寫入 ocr_metrics.jsonl（自動輪替），統計可隨時匯出成 ocr_metrics.json
+        self.metrics = ocr_metrics.StageMetrics(os.path.join(BASE_PATH, 'ocr_metrics.jsonl'))
+        self.metrics_dump_path = os.path.join(BASE_PATH, 'ocr_metrics.json')
+        self.snip_trace = None
+        self.current_trace = None
+        self.poll_after_id = None
+        self.snipping_tool = None
+        self.last_snip_request = 0.0
+        
+        # 載入快捷鍵設定
+        self.config_file = os.path.join(BASE_PATH, 'hotkey_config.json')
+        self.hotkey = self.load_hotkey()
+        self.debug_mode = bool(self.load_config().get('debug_capture', False))
+        
+        # 擷取模式：virtual（全部螢幕）/ monitor（滑鼠所在螢幕）/ region（只擷取選取區域）
+        self.capture_mode = self.load_config().get('capture_mode', ocr_capture.DEFAULT_CAPTURE_MODE)
+        if self.capture_mode not in ocr_capture.CAPTURE_MODES:
+            self.capture_mode = ocr_capture.DEFAULT_CAPTURE_MODE
+        self.grabber = ocr_capture.create_grabber(self.load_config().get('grabber'))
+        
+        # 版面模式：single（整張辨識）/ tiled（切成文字區塊平行辨識）/ auto（大圖才切）
+        # 辨識語言：auto（依文字系統自動選擇）或直接指定，例如 chi_tra+eng
+        # 辨識設定檔：default / numeric / table / code / prose（ocr_profiles），由工具列切換，套用到之後的截圖
+        profile = self.load_config().get('profile', ocr_profiles.DEFAULT_PROFILE)
+        if profile not in ocr_profiles.PROFILES:
+            profile = ocr_profiles.DEFAULT_PROFILE
+        # 多組預處理（ocr_ensemble）：反相、不同二值化、放大平行辨識，取信心值最高者
+        self.ocr_options = {'layout': self.load_config().get('layout'), 'lang': self.load_config().get('lang'),
+                            'profile': profile, 'ensemble': bool(self.load_config().get('ensemble', False))}
+        
+        # 綁定快捷鍵
+        self.bind(f"<{self.hotkey}>", lambda e: self.start_snipping())
+
+        # 按鈕區
+        self.btn_capture = ctk.CTkButton(
+            self, text=f"截圖辨識 (Screen Snipping) - {self.hotkey}", command=self.start_snipping,
+            height=50, font=("Microsoft JhengHei UI", 16, "bold"),
+            fg_color="#106EBE", hover_color="#005A9E"
+        )
+        self.btn_capture.grid(row=0, column=0, padx=20, pady=20, sticky="ew")
+        
+        # 綁定右鍵更改快捷鍵
+        self.btn_capture.bind("<Button-3>", self.change_hotkey)
+        
+        # 調試與監看按鈕
+        tool_frame = ctk.CTkFrame(self, fg_color="transparent")
+        tool_frame.grid(row=1, column=0, padx=20, pady=(0, 10), sticky="ew")
+        tool_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
+
+        self.btn_debug = ctk.CTkButton(
+            tool_frame, text="💾 保存預處理圖片", command=self.save_debug_image,
+            height=30, font=("Microsoft JhengHei UI", 12),
+            fg_color="#666666", hover_color="#555555"
+        )
+        self.btn_debug.grid(row=0, column=0, padx=(0, 5), sticky="ew")
+        self.btn_debug.bind("<Button-3>", lambda e: self.toggle_debug_mode())
+        self.update_debug_button()
+
+        # 選取一個區域持續監看，畫面有變動才重新辨識
+        self.btn_watch = ctk.CTkButton(
+            tool_frame, text="📌 監看區域", command=self.toggle_watch,
+            height=30, font=("Microsoft JhengHei UI", 12),
+            fg_color="#666666", hover_color="#555555"
+        )
+        self.btn_watch.grid(row=0, column=1, padx=5, sticky="ew")
+
+        # 選取一個區域後捲動內容，只辨識新捲入的部分，接成一整段文字
+        self.btn_scroll = ctk.CTkButton(
+            tool_frame, text="📜 長截圖", command=self.toggle_scroll,
+            height=30, font=("Microsoft JhengHei UI", 12),
+            fg_color="#666666", hover_color="#555555"
+        )
+        self.btn_scroll.grid(row=0, column=2, padx=5, sticky="ew")
+
+        # 過去的截圖與辨識文字（可搜尋）
+        self.btn_history = ctk.CTkButton(
+            tool_frame, text="🕘 歷史記錄", command=self.open_history,
+            height=30, font=("Microsoft JhengHei UI", 12),
+            fg_color="#666666", hover_color="#555555"
+        )
+        self.btn_history.grid(row=0, column=3, padx=(5, 0), sticky="ew")
+
+        # 辨識設定檔（依截圖內容切換字元白名單與頁面分割模式）
+        self.profile_labels = {profile['label']: name for name, profile in ocr_profiles.PROFILES.items()}
+        self.seg_profile = ctk.CTkSegmentedButton(
+            tool_frame, values=list(self.profile_labels), command=self.change_profile,
+            height=28, font=("Microsoft JhengHei UI", 12)
+        )
+        self.seg_profile.set(ocr_profiles.PROFILES[profile]['label'])
+        self.seg_profile.grid(row=1, column=0, columnspan=4, pady=(8, 0), sticky="ew")
+
+        # 難以辨識的截圖（深色主題、淡色文字）改用多組預處理
+        self.switch_ensemble = ctk.CTkSwitch(
+            tool_frame, text="多組預處理（較慢，難辨識的截圖用）", command=self.toggle_ensemble,
+            font=("Microsoft JhengHei UI", 12)
+        )
+        if self.ocr_options['ensemble']:
+            self.switch_ensemble.select()
+        self.switch_ensemble.grid(row=2, column=0, columnspan=4, pady=(8, 0), sticky="w")
+
+        # 圖片預覽區
+        self.preview_frame = ctk.CTkFrame(self, fg_color="#2B2B2B")
+        self.preview_frame.grid(row=2, column=0, padx=20, pady=0, sticky="ew")
+        
+        self.lbl_image = ctk.CTkLabel(
+            self.preview_frame, text="截圖預覽", width=300, height=150, corner_radius=8
+        )
+        self.lbl_image.pack(padx=10, pady=10)
+
+        # 狀態標籤
+        self.lbl_status = ctk.CTkLabel(self, text="OCR 引擎載入中...", text_color="#AAAAAA")
+        self.lbl_status.grid(row=3, column=0, pady=(10, 5))
+
+        # 各階段耗時（右鍵匯出統計）
+        self.lbl_timing = ctk.CTkLabel(
+            self, text="", text_color="#777777", font=("Consolas", 11), wraplength=460, justify="left"
+        )
+        self.lbl_timing.grid(row=4, column=0, padx=20, pady=0, sticky="ew")
+        self.lbl_timing.bind("<Button-3>", lambda e: self.dump_metrics())
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # 結果文字框
+        lbl_result_title = ctk.CTkLabel(self, text="辨識結果 (點擊複製):", anchor="w")
+        lbl_result_title.grid(row=5, column=0, padx=20, pady=(10,0), sticky="nw")
+
+        self.textbox = ctk.CTkTextbox(
+            self, font=("Consolas", 14), fg_color="#1D1D1D", text_color="#FFFFFF"
+        )
+        self.textbox.grid(row=6, column=0, padx=20, pady=(5, 20), sticky="nsew")
+        self.textbox.bind("<Button-1>", self.copy_to_clipboard)
+
+        ocr_startup.mark('window_created')
+        self.after_idle(lambda: ocr_startup.mark('window_shown'))
+
+        # 背景偵測 Tesseract 並預熱 OCR 引擎，視窗與快捷鍵立即可用
+        threading.Thread(target=self.init_ocr, name="ocr-init", daemon=True).start()
+        self.after(50, self.check_ocr_ready)
+
+    def init_ocr(self):
+        """背景載入 OCR 核心：偵測 Tesseract、開啟快取、預熱引擎"""
+        try:
+            ocr_core.init_tesseract()
+            ocr_startup.mark('tesseract_probed')
+            # 辨識結果快取（重複截取相同畫面時直接取用）
+            config = self.load_config()
+            self.cache = ocr_cache.OCRCache(ocr_core.CACHE_PATH,
+                                            perceptual=bool(config.get('cache_perceptual', False)))
+            # 調試記錄（壓縮與寫檔在背景執行緒）
+            self.debug_recorder = ocr_debug.DebugRecorder(
+                captures=config.get('debug_captures', ocr_debug.DEFAULT_CAPTURES),
+                byte_budget=int(config.get('debug_budget_mb', ocr_debug.DEFAULT_BYTE_BUDGET // (1024 * 1024)))
+                * 1024 * 1024,
+                enabled=self.debug_mode
+            )
+            # 背景辨識佇列（UI 不會因 OCR 卡住）
+            self.jobs = ocr_jobs.OCRJobQueue(cache=self.cache, recorder=self.debug_recorder)
+            try:
+                self.history = ocr_history.CaptureHistory(ocr_core.HISTORY_PATH)
+            except Exception as e:
+                print(f"歷史記錄開啟失敗: {e}")
+            ocr_startup.mark('cache_opened')
+            if ocr_core.has_tesseract:
+                self.warm_engine()
+        finally:
+            self.ocr_ready.set()
+
+    def warm_engine(self):
+        """預先載入預處理模組並建立預設參數的 OCR 引擎，第一次截圖不必等待語言包載入"""
+        options = ocr_core.resolve_options(self.ocr_options)
+        try:
+            import ocr_engine
+            importlib.import_module('ocr_preprocess')  # numpy 匯入較慢，先在背景載入
+            ocr_startup.mark('modules_imported')
+            lang = options['lang']
+            if lang == 'auto':
+                # 自動偵測時先載入最常用的預設語言
+                import ocr_lang
+                lang = ocr_lang.FALLBACK_LANG
+            ocr_engine.get_engine_pool().warm(lang, options['config'])
+            ocr_startup.mark('engine_warm')
+        except Exception as e:
+            print(f"OCR 引擎預熱失敗: {e}")
+
+    def check_ocr_ready(self):
+        """在主執行緒等待 OCR 核心載入完成（只在啟動期間輪詢）"""
+        if not self.ocr_ready.is_set():
+            self.after(50, self.check_ocr_ready)
+            return
+        ocr_startup.mark('ocr_ready')
+        if self.pending_image is not None:
+            image, self.pending_image = self.pending_image, None
+            self.submit_image(image)
+        elif self.current_job is None:
+            if ocr_core.has_tesseract:
+                self.lbl_status.configure(text="準備就緒", text_color="#AAAAAA")
+            else:
+                self.lbl_status.configure(text="❌ OCR 引擎載入失敗", text_color="red")
+        if self.bench_startup is not None:
+            # 啟動量測模式：視窗顯示且 OCR 就緒後輸出報告並結束
+            self.after(100, self.finish_startup_bench)
+
+    def finish_startup_bench(self):
+        ocr_startup.write_report(self.bench_startup)
+        self.destroy()
+    
+    def load_config(self):
+        """載入設定檔（不存在或格式錯誤時回傳空設定）"""
+        try:
+            if os.path.exists(self.config_file):
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+                    if isinstance(config, dict):
+                        return config
+        except:
+            pass
+        return {}
+    
+    def save_config(self, **updates):
+        """更新設定檔中的指定項目，保留其他設定"""
+        config = self.load_config()
+        config.update(updates)
+        try:
+            with open(self.config_file, 'w', encoding='utf-8') as f:
+                json.dump(config, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"儲存設定失敗: {e}")
+    
+    def change_profile(self, label):
+        """切換辨識設定檔，套用到下一次截圖並記住選擇"""
+        profile = self.profile_labels[label]
+        self.ocr_options['profile'] = profile
+        self.save_config(profile=profile)
+        self.lbl_status.configure(text=f"辨識設定檔: {label}", text_color="#AAAAAA")
+
+    def toggle_ensemble(self):
+        """切換多組預處理，套用到下一次截圖並記住選擇"""
+        enabled = bool(self.switch_ensemble.get())
+        self.ocr_options['ensemble'] = enabled
+        self.save_config(ensemble=enabled)
+        self.lbl_status.configure(text=f"多組預處理: {'開啟' if enabled else '關閉'}", text_color="#AAAAAA")
+
+    def load_hotkey(self):
+        """載入快捷鍵設定"""
+        return self.load_config().get('hotkey', 'F3')  # 預設值 F3
+    
+    def save_hotkey(self, hotkey):
+        """儲存快捷鍵設定"""
+        self.save_config(hotkey=hotkey)
+    
+    def change_hotkey(self, event):
+        """右鍵更改快捷鍵"""
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("更改快捷鍵")
+        dialog.geometry("400x220")
+        dialog.transient(self)
+        dialog.grab_set()
+        
+        # 置中顯示
+        dialog.update_idletasks()
+        x = self.winfo_x() + (self.winfo_width() // 2) - (200)
+        y = self.winfo_y() + (self.winfo_height() // 2) - (110)
+        dialog.geometry(f"400x220+{x}+{y}")
+        
+        # 標題
+        title_label = ctk.CTkLabel(
+            dialog, 
+            text="⌨️ 自訂快捷鍵", 
+            font=("Microsoft JhengHei UI", 18, "bold")
+        )
+        title_label.pack(pady=(20, 10))
+        
+        # 當前快捷鍵顯示
+        current_label = ctk.CTkLabel(
+            dialog, 
+            text=f"目前快捷鍵: {self.hotkey}", 
+            font=("Microsoft JhengHei UI", 12),
+            text_color="#AAAAAA"
+        )
+        current_label.pack(pady=5)
+        
+        # 提示文字
+        hint_label = ctk.CTkLabel(
+            dialog, 
+            text="輸入新快捷鍵 (例如: F3, F4, Control-s)", 
+            font=("Microsoft JhengHei UI", 10),
+            text_color="#888888"
+        )
+        hint_label.pack(pady=(5, 10))
+        
+        # 輸入框
+        entry = ctk.CTkEntry(
+            dialog, 
+            font=("Microsoft JhengHei UI", 14),
+            width=250,
+            height=35,
+            justify="center"
+        )
+        entry.insert(0, self.hotkey)
+        entry.pack(pady=10)
+        entry.focus()
+        entry.select_range(0, tk.END)
+        
+        def apply_hotkey():
+            new_hotkey = entry.get().strip()
+            if new_hotkey:
+                # 解除舊快捷鍵
+                try:
+                    self.unbind(f"<{self.hotkey}>")
+                except:
+                    pass
+                
+                # 設定新快捷鍵
+                self.hotkey = new_hotkey
+                self.save_hotkey(new_hotkey)
+                
+                # 綁定新快捷鍵
+                try:
+                    self.bind(f"<{new_hotkey}>", lambda e: self.start_snipping())
+                    self.btn_capture.configure(text=f"截圖辨識 (Screen Snipping) - {new_hotkey}")
+                    self.lbl_status.configure(text=f"✅ 快捷鍵已更改為 {new_hotkey}", text_color="#2CC985")
+                except Exception as e:
+                    self.lbl_status.configure(text=f"❌ 快捷鍵設定失敗: {e}", text_color="red")
+                
+                dialog.destroy()
+        
+        # 按鈕區
+        btn_frame = ctk.CTkFrame(dialog, fg_color="transparent")
+        btn_frame.pack(pady=15)
+        
+        btn_ok = ctk.CTkButton(
+            btn_frame, 
+            text="✓ 確定", 
+            command=apply_hotkey,
+            font=("Microsoft JhengHei UI", 12, "bold"),
+            width=100,
+            height=35,
+            fg_color="#106EBE",
+            hover_color="#005A9E"
+        )
+        btn_ok.pack(side=tk.LEFT, padx=5)
+        
+        btn_cancel = ctk.CTkButton(
+            btn_frame, 
+            text="✕ 取消", 
+            command=dialog.destroy,
+            font=("Microsoft JhengHei UI", 12),
+            width=100,
+            height=35,
+            fg_color="#666666",
+            hover_color="#555555"
+        )
+        btn_cancel.pack(side=tk.LEFT, padx=5)
+        
+        # 按 Enter 確定
+        entry.bind("<Return>", lambda e: apply_hotkey())
+        # 按 Escape 取消
+        dialog.bind("<Escape>", lambda e: dialog.destroy())
+
+    def start_snipping(self, callback=None):
+        # 合併連續快捷鍵：截圖視窗已開啟或剛按過就忽略
+        now = time.monotonic()
+        if self.snipping_tool is not None and self.snipping_tool.winfo_exists():
+            return
+        if now - self.last_snip_request < 0.3:
+            return
+        self.last_snip_request = now
+        self.snip_trace = ocr_metrics.SnipTrace()
+        # SnippingTool 會自動隱藏主視窗，這裡不需要手動 iconify
+        self.snipping_tool = SnippingTool(self, callback or self.process_image, self.grabber,
+                                          self.capture_mode, trace=self.snip_trace)
+
+    def process_image(self, image):
+        self.deiconify() # 顯示主視窗
+        self.snipping_tool = None
+        if self.snip_trace is None:
+            self.snip_trace = ocr_metrics.SnipTrace()
+        trace = self.snip_trace
+        
+        # 顯示預覽 (縮放以適應視窗)
+        with trace.stage('preview'):
+            display_img = image.copy()
+            # 限制預覽圖最大尺寸
+            display_img.thumbnail((400, 200))
+            ctk_img = ctk.CTkImage(light_image=display_img, dark_image=display_img, size=display_img.size)
+            self.lbl_image.configure(image=ctk_img, text="")
+        
+        self.lbl_status.configure(text="處理中...", text_color="#FFD700")
+        self.textbox.delete("0.0", "end")
+
+        if not self.ocr_ready.is_set():
+            # OCR 核心仍在背景載入，完成後由 check_ocr_ready() 送出
+            self.pending_image = image
+            self.lbl_status.configure(text="處理中... 等待 OCR 引擎載入", text_color="#FFD700")
+            return
+        self.submit_image(image)
+
+    def submit_image(self, image):
+        if not ocr_core.has_tesseract:
+            self.textbox.insert("0.0", ocr_core.tesseract_error_detail())
+            self.lbl_status.configure(text="❌ 系統錯誤", text_color="red")
+            return
+
+        # 預處理 + OCR 交給背景佇列，新截圖會取代尚未完成的舊工作
+        self.current_trace = self.snip_trace or ocr_metrics.SnipTrace()
+        self.snip_trace = None
+        self.current_job = self.jobs.submit(image, self.ocr_options)
+        self.history_image = image
+        self.poll_jobs()
+
+    def poll_jobs(self):
+        """在主執行緒取回背景辨識的進度與結果"""
+        if self.poll_after_id is not None:
+            self.after_cancel(self.poll_after_id)
+            self.poll_after_id = None
+
+        for job, event in self.jobs.poll():
+            if job is not self.current_job:
+                continue  # 已被新截圖取代的工作
+            if event in ('done', 'error'):
+                # 背景執行緒量到的各階段耗時併入這次截圖的記錄
+                trace = self.current_trace
+                if job.started is not None:
+                    trace.add('queue_wait', job.started - job.submitted)
+                for name, seconds in job.stage_times.items():
+                    trace.add(name, seconds)
+            if event == 'done':
+                self.show_result(job.result)
+                self.add_history(job)
+                self.record_metrics(job, state='done', **{
+                    key: job.result.info.get(key) for key in ('cache', 'scale', 'width', 'height')
+                })
+            elif event == 'error':
+                print(f"OCR Error: {job.error}")
+                self.textbox.insert("0.0", f"OCR 執行錯誤：{str(job.error)}")
+                self.lbl_status.configure(text="❌ 執行錯誤", text_color="red")
+                self.record_metrics(job, state='error', error=str(job.error))
+            elif event == 'cancelled':
+                self.lbl_status.configure(text="⚠️ 已取消", text_color="#FFA500")
+
+        job = self.current_job
+        if job is not None and job.state in ('queued', 'preprocessing', 'ocr'):
+            phase = {'queued': "排隊中", 'preprocessing': "預處理", 'ocr': "辨識中"}[job.state]
+            self.lbl_status.configure(text=f"處理中... {phase} ({job.elapsed():.1f}s)", text_color="#FFD700")
+        if self.jobs.busy or (job is not None and job.state in ('queued', 'preprocessing', 'ocr')):
+            # 只在有工作時輪詢，閒置時不佔用 CPU
+            self.poll_after_id = self.after(50, self.poll_jobs)
+
+    def record_metrics(self, job, **extra):
+        """寫入這次截圖的耗時記錄並顯示各階段明細"""
+        import ocr_engine
+        # engine_warm=False 代表每次辨識都啟動 tesseract 執行檔（未安裝 tesserocr）
+        entry = self.metrics.record(self.current_trace, engine=ocr_engine.active_backend()[0].name,
+                                    engine_warm=ocr_engine.pool_warm(), **extra)
+        self.lbl_timing.configure(text=ocr_metrics.format_breakdown(entry))
+
+    def dump_metrics(self, quiet=False):
+        """匯出各階段 p50 / p95 / p99 統計"""
+        try:
+            self.metrics.dump(self.metrics_dump_path)
+            if not quiet:
+                self.lbl_status.configure(text="📊 已匯出耗時統計: ocr_metrics.json", text_color="#00BFFF")
+        except Exception as e:
+            print(f"匯出耗時統計失敗: {e}")
+            if not quiet:
+                self.lbl_status.configure(text=f"❌ 匯出失敗: {e}", text_color="red")
+
+    # ---------- 區域監看 ----------
+    def check_ocr_available(self):
+        """監看、長截圖開始前確認 OCR 可用，不可用時顯示原因"""
+        if not self.ocr_ready.is_set():
+            self.lbl_status.configure(text="⚠️ OCR 引擎載入中，請稍候", text_color="#FFA500")
+            return False
+        if not ocr_core.has_tesseract:
+            self.textbox.delete("0.0", "end")
+            self.textbox.insert("0.0", ocr_core.tesseract_error_detail())
+            self.lbl_status.configure(text="❌ 系統錯誤", text_color="red")
+            return False
+        return True
+
+    def toggle_watch(self):
+        if self.watcher is not None:
+            self.stop_watch()
+            return
+        if self.check_ocr_available():
+            self.start_snipping(callback=self.start_watch)
+
+    def start_watch(self, image):
+        """以剛選取的範圍開始監看"""
+        self.deiconify()
+        bbox = self.snipping_tool.bbox
+        self.snipping_tool = None
+        self.snip_trace = None
+
+        import ocr_watch
+        self.watcher = ocr_watch.RegionWatcher(
+            bbox, self.ocr_options, grabber_name=self.load_config().get('grabber'), cache=self.cache
+        )
+        self.watcher.start()
+        self.btn_watch.configure(text="⏹ 停止監看", fg_color="#B8860B", hover_color="#8B6508")
+        self.lbl_status.configure(text="📌 監看中...", text_color="#00BFFF")
+        self.textbox.delete("0.0", "end")
+        self.poll_watch()
+
+    def poll_watch(self):
+        """取回監看的文字變更，寫入 ocr_watch.jsonl 並更新結果框"""
+        self.watch_after_id = None
+        watcher = self.watcher
+        if watcher is None:
+            return
+        events = watcher.poll()
+        for event in events:
+            try:
+                with open(self.watch_log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(event, ensure_ascii=False) + '\n')
+            except OSError as e:
+                print(f"監看記錄寫入失敗: {e}")
+            if 'error' in event:
+                self.stop_watch()
+                self.lbl_status.configure(text=f"❌ 監看中止: {event['error']}", text_color="red")
+                return
+        if events:
+            latest = events[-1]
+            self.textbox.delete("0.0", "end")
+            self.textbox.insert("0.0", latest['text'] or "（未偵測到有效文字）")
+            stats = watcher.stats()
+            self.lbl_status.configure(
+                text=f"📌 監看中 — {latest['ts'][11:]} 更新 {len(latest['changes'])} 行"
+                     f"（擷取 {stats['frames']} 次 / OCR {stats['ocr_calls']} 次）",
+                text_color="#00BFFF"
+            )
+        # 監看間隔至少 0.5 秒，輪詢不需更頻繁
+        self.watch_after_id = self.after(250, self.poll_watch)
+
+    def stop_watch(self):
+        if self.watch_after_id is not None:
+            self.after_cancel(self.watch_after_id)
+            self.watch_after_id = None
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        self.btn_watch.configure(text="📌 監看區域", fg_color="#666666", hover_color="#555555")
+        self.lbl_status.configure(text="⏹ 已停止監看", text_color="#AAAAAA")
+
+    # ---------- 捲動長截圖 ----------
+    def toggle_scroll(self):
+        if self.scroller is not None:
+            self.finish_scroll()
+            return
+        if self.check_ocr_available():
+            self.start_snipping(callback=self.start_scroll)
+
+    def start_scroll(self, image):
+        """以剛選取的範圍開始長截圖，之後由使用者捲動內容"""
+        self.deiconify()
+        bbox = self.snipping_tool.bbox
+        self.snipping_tool = None
+        self.snip_trace = None
+
+        import ocr_scroll
+        self.scroller = ocr_scroll.ScrollCapture(
+            bbox, self.ocr_options, grabber_name=self.load_config().get('grabber'), cache=self.cache
+        )
+        self.scroller.start()
+        self.btn_scroll.configure(text="⏹ 完成長截圖", fg_color="#B8860B", hover_color="#8B6508")
+        self.lbl_status.configure(text="📜 長截圖中：請捲動內容，完成後再按一次", text_color="#00BFFF")
+        self.textbox.delete("0.0", "end")
+        self.scroll_unaligned = 0
+        self.poll_scroll()
+
+    def poll_scroll(self):
+        """取回已辨識的文字帶並接到結果框後面；結束後顯示完整文字並複製"""
+        self.scroll_after_id = None
+        scroller = self.scroller
+        if scroller is None:
+            return
+        for event in scroller.poll():
+            if 'error' in event:
+                self.stop_scroll()
+                self.lbl_status.configure(text=f"❌ 長截圖中止: {event['error']}", text_color="red")
+                return
+            if event.get('done'):
+                self.stop_scroll()
+                self.show_scroll_result(scroller, event)
+                return
+            if event['text']:
+                self.textbox.insert("end", event['text'] + "\n")
+                self.textbox.see("end")
+        if scroller.running and not scroller.stopping:
+            stats = scroller.stats()
+            if stats['unaligned'] > self.scroll_unaligned:
+                # 前後兩張畫面沒有重疊：請使用者往回捲到上次的位置
+                self.scroll_unaligned = stats['unaligned']
+                self.lbl_status.configure(text="⚠️ 捲動太快，請往回捲一點再慢慢捲", text_color="#FFA500")
+            else:
+                self.lbl_status.configure(
+                    text=f"📜 長截圖中 — 已擷取 {stats['rows']} 列，辨識 {stats['ocr_calls']} 段（完成後再按一次）",
+                    text_color="#00BFFF"
+                )
+        self.scroll_after_id = self.after(200, self.poll_scroll)
+
+    def finish_scroll(self):
+        """停止擷取，等剩下的內容辨識完成（poll_scroll 收到 done 事件後顯示結果）"""
+        self.scroller.stop()
+        self.btn_scroll.configure(text="辨識剩餘內容...", state="disabled")
+        self.lbl_status.configure(text="處理中... 辨識剩餘內容", text_color="#FFD700")
+
+    def stop_scroll(self):
+        if self.scroll_after_id is not None:
+            self.after_cancel(self.scroll_after_id)
+            self.scroll_after_id = None
+        if self.scroller is not None:
+            self.scroller.stop()
+            self.scroller = None
+        self.btn_scroll.configure(text="📜 長截圖", state="normal", fg_color="#666666", hover_color="#555555")
+
+    def show_scroll_result(self, scroller, event):
+        text = event['text']
+        stats = event['stats']
+        self.textbox.delete("0.0", "end")
+        if not text.strip():
+            self.textbox.insert("0.0", "（未偵測到有效文字）")
+            self.lbl_status.configure(text="⚠️ 無內容", text_color="#FFA500")
+            return
+        self.textbox.insert("0.0", text)
+        self.lbl_status.configure(
+            text=f"✅ 長截圖完成 ({stats['rows']} 列 / {stats['ocr_calls']} 段，點擊複製)", text_color="#2CC985"
+        )
+        import pyperclip
+        pyperclip.copy(text)
+        if self.history is not None:
+            # 縮圖以第一張畫面代表
+            future = self.history.add_async(text, scroller.first_frame, {'scroll': stats},
+                                            self.ocr_options['profile'])
+            self.poll_history_add(future)
+
+    def on_close(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.scroller is not None:
+            self.scroller.stop()
+        # 關閉前更新統計檔，供監控程式收集
+        if self.metrics.count:
+            self.dump_metrics(quiet=True)
+        if self.debug_recorder is not None:
+            self.debug_recorder.close()
+        if self.history is not None:
+            self.history.close()
+        self.destroy()
+
+    def show_result(self, result):
+        # 保存預處理後的圖片供調試使用
+        self.last_processed_image = result.processed_image
+        final_text = result.text
+
+        trace = self.current_trace
+        if final_text.strip():
+            with trace.stage('display'):
+                self.textbox.insert("0.0", final_text)
+            if result.info.get('cache') not in (None, 'miss'):
+                stats = self.cache.stats()
+                status = f"✅ 完成 (快取命中 {stats['hits']}/{stats['hits'] + stats['misses']}，點擊複製)"
+            elif result.info.get('variant'):
+                status = f"✅ 完成 ({result.info['variant']}，信心值 {result.info['variant_conf']:g}，點擊複製)"
+            elif result.info.get('scale'):
+                status = f"✅ 完成 ({result.info['scale']:g}x，點擊複製)"
+            else:
+                status = "✅ 完成 (點擊複製)"
+            self.lbl_status.configure(text=status, text_color="#2CC985")
+            # 自動複製到剪貼簿 (可選)
+            with trace.stage('clipboard'):
+                import pyperclip
+                pyperclip.copy(final_text)
+        else:
+            self.textbox.insert("0.0", "（未偵測到有效文字）")
+            self.lbl_status.configure(text="⚠️ 無內容", text_color="#FFA500")
+
+    def copy_to_clipboard(self, event):
+        content = self.textbox.get("0.0", "end").strip()
+        if content:
+            import pyperclip
+            pyperclip.copy(content)
+            self.lbl_status.configure(text="📋 已複製！", text_color="#00BFFF")
+            self.after(1500, lambda: self.lbl_status.configure(text="✅ 完成 (點擊複製)", text_color="#2CC985"))
+    
+    # ---------- 歷史記錄 ----------
+    def add_history(self, job):
+        """辨識完成的截圖存入歷史（縮圖壓縮與寫入在背景執行緒）"""
+        image, self.history_image = self.history_image, None
+        if self.history is None or not job.result.text.strip():
+            return
+        future = self.history.add_async(job.result.text, image, job.result.info, job.options['profile'])
+        self.poll_history_add(future)
+
+    def poll_history_add(self, future):
+        if not future.done():
+            self.after(100, lambda: self.poll_history_add(future))
+            return
+        if future.exception() is not None:
+            print(f"歷史記錄寫入失敗: {future.exception()}")
+        elif self.history_window is not None and self.history_window.winfo_exists():
+            self.history_window.refresh(keep_position=True)
+
+    def open_history(self):
+        if self.history is None:
+            self.lbl_status.configure(text="⚠️ 歷史記錄尚未載入", text_color="#FFA500")
+            return
+        if self.history_window is not None and self.history_window.winfo_exists():
+            self.history_window.focus()
+            return
+        self.history_window = HistoryWindow(self, self.history, self.show_history_entry)
+
+    def show_history_entry(self, capture_id):
+        """顯示歷史記錄的文字與縮圖，並複製到剪貼簿"""
+        entry = self.history.get(capture_id)
+        if entry is None:
+            return
+        thumb = self.history.thumbnail(capture_id)
+        if thumb is not None:
+            ctk_img = ctk.CTkImage(light_image=thumb, dark_image=thumb, size=thumb.size)
+            self.lbl_image.configure(image=ctk_img, text="")
+        self.textbox.delete("0.0", "end")
+        self.textbox.insert("0.0", entry['text'])
+        import pyperclip
+        pyperclip.copy(entry['text'])
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry['timestamp']))
+        self.lbl_status.configure(text=f"📋 已複製歷史記錄 ({stamp})", text_color="#00BFFF")
+
+    # ---------- 調試 ----------
+    def update_debug_button(self):
+        if self.debug_mode:
+            self.btn_debug.configure(text="💾 匯出調試記錄", fg_color="#B8860B", hover_color="#8B6508")
+        else:
+            self.btn_debug.configure(text="💾 保存預處理圖片", fg_color="#666666", hover_color="#555555")
+
+    def toggle_debug_mode(self):
+        """切換調試記錄：開啟後保留最近幾次截圖每個階段的中間結果"""
+        self.debug_mode = not self.debug_mode
+        if self.debug_recorder is not None:
+            self.debug_recorder.enabled = self.debug_mode
+        self.save_config(debug_capture=self.debug_mode)
+        self.update_debug_button()
+        text = "🐞 調試記錄已開啟（保留最近幾次截圖的各階段圖片）" if self.debug_mode else "調試記錄已關閉"
+        self.lbl_status.configure(text=text, text_color="#00BFFF")
+
+    def save_debug_image(self):
+        """保存預處理後的圖片（調試模式下匯出所有保留的中間結果），寫檔在背景執行緒"""
+        if self.debug_recorder is None:
+            self.lbl_status.configure(text="⚠️ OCR 引擎載入中，請稍候", text_color="#FFA500")
+            return
+        # 生成檔名（使用時間戳記）
+        from datetime import datetime
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if self.debug_mode:
+            if not self.debug_recorder.stats()['captures']:
+                self.lbl_status.configure(text="⚠️ 尚無調試記錄，請先執行截圖辨識", text_color="#FFA500")
+                return
+            future = self.debug_recorder.dump(os.path.join(BASE_PATH, 'debug', timestamp))
+        elif self.last_processed_image is None:
+            self.lbl_status.configure(text="⚠️ 請先執行截圖辨識", text_color="#FFA500")
+            return
+        else:
+            filepath = os.path.join(BASE_PATH, f"debug_processed_{timestamp}.png")
+            future = self.debug_recorder.save_image(filepath, self.last_processed_image)
+        self.lbl_status.configure(text="💾 保存中...", text_color="#FFD700")
+        self.poll_debug_save(future)
+
+    def poll_debug_save(self, future):
+        """等待背景寫檔完成後更新狀態"""
+        if not future.done():
+            self.after(100, lambda: self.poll_debug_save(future))
+            return
+        try:
+            saved = future.result()
+        except Exception as e:
+            self.lbl_status.configure(text=f"❌ 保存失敗: {str(e)}", text_color="red")
+            print(f"保存調試圖片失敗: {e}")
+            return
+        if isinstance(saved, dict):
+            name = os.path.relpath(saved['directory'], BASE_PATH)
+            self.lbl_status.configure(text=f"💾 已匯出 {saved['captures']} 次截圖: {name}", text_color="#00FF00")
+            print(f"調試記錄已匯出: {saved['directory']}")
+        else:
+            self.lbl_status.configure(text=f"💾 已保存: {os.path.basename(saved)}", text_color="#00FF00")
+            print(f"調試圖片已保存: {saved}")
+        # 3秒後恢復原狀態
+        self.after(3000, lambda: self.lbl_status.configure(text="✅ 完成 (點擊複製)", text_color="#2CC985"))
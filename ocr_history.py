@@ -0,0 +1,239 @@
+"""
+CL_Scan 截圖歷史記錄
+每次辨識的文字、時間、設定檔與截圖縮圖存入 SQLite；以 FTS5 全文索引搜尋，數萬筆記錄也能即時查詢
+縮圖壓縮後另存一張表，列表只讀文字欄位，需要顯示時才逐張解碼
+"""
+import io
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from PIL import Image, features
+
+THUMB_SIZE = (240, 96)      # 縮圖最大尺寸
+THUMB_QUALITY = 70
+THUMB_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+PAGE_SIZE = 100             # 列表每次讀取的筆數
+PREVIEW_CHARS = 200         # 列表只讀取文字的前幾個字
+DEFAULT_MAX_ENTRIES = 50000 # 超過時刪除最舊的記錄
+PRUNE_EVERY = 100           # 每新增幾筆檢查一次上限
+MIN_TRIGRAM = 3             # trigram 索引只能比對 3 個字以上，較短的詞改以 LIKE 比對
+
+
+def make_thumbnail(image):
+    """截圖 → 壓縮縮圖 bytes"""
+    ratio = min(THUMB_SIZE[0] / image.width, THUMB_SIZE[1] / image.height, 1.0)
+    size = (max(1, round(image.width * ratio)), max(1, round(image.height * ratio)))
+    # reducing_gap：先以整數倍快速縮小再重新取樣，不複製整張截圖
+    thumb = image.resize(size, Image.BILINEAR, reducing_gap=2.0) if ratio < 1.0 else image
+    if thumb.mode not in ('RGB', 'L'):
+        thumb = thumb.convert('RGB')
+    buffer = io.BytesIO()
+    thumb.save(buffer, format=THUMB_FORMAT, quality=THUMB_QUALITY)
+    return buffer.getvalue()
+
+
+class CaptureHistory:
+    """截圖歷史資料庫（可跨執行緒使用；add_async 在背景寫入）"""
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = None
+        self._writer = None
+        self._added = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS captures (
+                id INTEGER PRIMARY KEY,
+                timestamp REAL NOT NULL,
+                text TEXT NOT NULL,
+                profile TEXT,
+                lang TEXT,
+                width INTEGER, height INTEGER,
+                info TEXT
+            )''')
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS thumbnails (
+                id INTEGER PRIMARY KEY,  -- 與 captures.id 相同，刪除記錄時由觸發器一併刪除
+                data BLOB NOT NULL
+            )''')
+        self.fts = self._create_index()
+        self._db.commit()
+
+    def _create_index(self):
+        """建立 FTS5 全文索引（trigram 可搜尋中文等無空白分詞的文字），不支援時回傳 None 改以 LIKE 查詢"""
+        for tokenizer in ('trigram', 'unicode61'):
+            try:
+                self._db.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS captures_fts USING fts5("
+                    f"text, content='captures', content_rowid='id', tokenize='{tokenizer}')"
+                )
+            except sqlite3.OperationalError:
+                continue
+            # 外部內容表：以觸發器與 captures 同步
+            self._db.executescript('''
+                CREATE TRIGGER IF NOT EXISTS captures_ai AFTER INSERT ON captures BEGIN
+                    INSERT INTO captures_fts(rowid, text) VALUES (new.id, new.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS captures_ad AFTER DELETE ON captures BEGIN
+                    INSERT INTO captures_fts(captures_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                    DELETE FROM thumbnails WHERE id = old.id;
+                END;
+            ''')
+            row = self._db.execute("SELECT sql FROM sqlite_master WHERE name='captures_fts'").fetchone()
+            return 'trigram' if 'trigram' in row[0] else 'unicode61'
+        self._db.executescript('''
+            CREATE TRIGGER IF NOT EXISTS captures_ad AFTER DELETE ON captures BEGIN
+                DELETE FROM thumbnails WHERE id = old.id;
+            END;
+        ''')
+        return None
+
+    # ---------- 寫入 ----------
+    def add(self, text, image=None, info=None, profile=None, timestamp=None):
+        """新增一筆記錄，回傳 id"""
+        info = dict(info or {})
+        thumb = make_thumbnail(image) if image is not None else None
+        with self._lock:
+            cursor = self._db.execute(
+                'INSERT INTO captures (timestamp, text, profile, lang, width, height, info) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (timestamp or time.time(), text, profile, info.get('lang'),
+                 image.width if image is not None else info.get('width'),
+                 image.height if image is not None else info.get('height'),
+                 json.dumps(info, ensure_ascii=False, default=str))
+            )
+            capture_id = cursor.lastrowid
+            if thumb is not None:
+                self._db.execute('INSERT INTO thumbnails (id, data) VALUES (?, ?)', (capture_id, thumb))
+            self._added += 1
+            if self.max_entries and self._added % PRUNE_EVERY == 0:
+                self._prune()
+            self._db.commit()
+        return capture_id
+
+    def add_async(self, text, image=None, info=None, profile=None):
+        """在背景執行緒新增記錄（縮圖壓縮不佔用呼叫端），回傳 Future（結果為 id）"""
+        future = Future()
+        if self._writes is None:
+            self._writes = queue.Queue()
+            self._writer = threading.Thread(target=self._write_loop, name="ocr-history-writer", daemon=True)
+            self._writer.start()
+        self._writes.put((future, (text, image, info, profile, time.time())))
+        return future
+
+    def _write_loop(self):
+        while True:
+            task = self._writes.get()
+            if task is None:
+                return
+            future, args = task
+            try:
+                future.set_result(self.add(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _prune(self):
+        """只保留最新的 max_entries 筆"""
+        self._db.execute(
+            'DELETE FROM captures WHERE id <= (SELECT id FROM captures ORDER BY id DESC LIMIT 1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def delete(self, capture_id):
+        with self._lock:
+            self._db.execute('DELETE FROM captures WHERE id=?', (capture_id,))
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM captures')
+            self._db.commit()
+
+    # ---------- 查詢 ----------
+    def _where(self, query):
+        """搜尋字串 → (FROM / WHERE 子句, 參數, 排序欄位)；空白分隔的每個詞都必須出現"""
+        terms = (query or '').split()
+        indexed = [term for term in terms
+                   if self.fts is not None and (self.fts != 'trigram' or len(term) >= MIN_TRIGRAM)]
+        # 索引查不到的詞（trigram 的 1~2 字詞、沒有 FTS5 時）直接比對原文
+        clauses = ["c.text LIKE ? ESCAPE '\\'" for term in terms if term not in indexed]
+        params = [f"%{_escape_like(term)}%" for term in terms if term not in indexed]
+        if not indexed:
+            where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+            return 'FROM captures c' + where, params, 'c.id'
+        match = ' AND '.join('"' + term.replace('"', '""') + '"' for term in indexed)
+        # 依 FTS 的 rowid 排序可直接倒序走訪索引，不必排序所有符合的記錄
+        return ('FROM captures_fts JOIN captures c ON c.id = captures_fts.rowid '
+                f"WHERE {' AND '.join(['captures_fts MATCH ?'] + clauses)}",
+                [match] + params, 'captures_fts.rowid')
+
+    def count(self, query=None):
+        source, params, _ = self._where(query)
+        with self._lock:
+            return self._db.execute(f'SELECT COUNT(*) {source}', params).fetchone()[0]
+
+    def search(self, query=None, offset=0, limit=PAGE_SIZE):
+        """新到舊排列的一頁記錄 [{'id', 'timestamp', 'preview', 'profile', 'lang'}]（不含縮圖與完整文字）"""
+        source, params, order = self._where(query)
+        with self._lock:
+            rows = self._db.execute(
+                f'SELECT c.id, c.timestamp, substr(c.text, 1, {PREVIEW_CHARS}), c.profile, c.lang '
+                f'{source} ORDER BY {order} DESC LIMIT ? OFFSET ?',
+                params + [limit, offset]
+            ).fetchall()
+        return [{'id': row[0], 'timestamp': row[1], 'preview': row[2], 'profile': row[3], 'lang': row[4]}
+                for row in rows]
+
+    def get(self, capture_id):
+        """完整記錄（含文字與 info，不含縮圖）"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT id, timestamp, text, profile, lang, width, height, info FROM captures WHERE id=?',
+                (capture_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ('id', 'timestamp', 'text', 'profile', 'lang', 'width', 'height')
+        entry = dict(zip(keys, row[:7]))
+        entry['info'] = json.loads(row[7] or '{}')
+        return entry
+
+    def thumbnail(self, capture_id):
+        """解碼縮圖（需要顯示時才呼叫），沒有縮圖時回傳 None"""
+        with self._lock:
+            row = self._db.execute('SELECT data FROM thumbnails WHERE id=?', (capture_id,)).fetchone()
+        if row is None:
+            return None
+        image = Image.open(io.BytesIO(row[0]))
+        image.load()
+        return image
+
+    def stats(self):
+        with self._lock:
+            count = self._db.execute('SELECT COUNT(*) FROM captures').fetchone()[0]
+            thumbs = self._db.execute('SELECT COALESCE(SUM(length(data)), 0) FROM thumbnails').fetchone()[0]
+        return {'entries': count, 'thumbnail_bytes': thumbs, 'index': self.fts or 'like'}
+
+    def close(self):
+        if self._writes is not None:
+            # 等待排隊中的記錄寫完
+            self._writes.put(None)
+            self._writer.join(timeout=5)
+        with self._lock:
+            self._db.close()
+
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
@@ -0,0 +1,165 @@
+"""
+CL_Scan 背景辨識佇列
+OCR 在背景執行緒執行，結果交回 Tk 主執行緒；新截圖會取代尚未完成的舊工作
+"""
+import itertools
+import queue
+import threading
+import time
+
+import ocr_core
+
+
+class JobCancelled(Exception):
+    """工作已被較新的截圖取代"""
+
+
+class OCRJob:
+    """單次截圖的辨識工作"""
+    _ids = itertools.count(1)
+
+    def __init__(self, image, options=None):
+        self.id = next(self._ids)
+        self.image = image
+        self.options = ocr_core.resolve_options(options)
+        self.state = 'queued'     # queued / preprocessing / ocr / done / cancelled / error
+        self.result = None
+        self.error = None
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.finished = None
+        self.stage_times = {}     # 階段 -> 累計秒數（tile.* / variant.* 為多個執行緒的總和）
+        self._cancel = threading.Event()
+        self._times_lock = threading.Lock()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def add_stage_time(self, name, seconds):
+        with self._times_lock:
+            self.stage_times[name] = self.stage_times.get(name, 0.0) + seconds
+
+    def elapsed(self):
+        end = self.finished or time.perf_counter()
+        return end - (self.started or self.submitted)
+
+
+class OCRJobQueue:
+    """單一背景執行緒的辨識佇列
+
+    - 最多保留一個等待中的工作：新工作送入時直接取代舊的（合併連續快捷鍵）
+    - 執行中的工作會被標記取消，在下一個處理階段邊界中止，結果不會送回
+    - 事件放入執行緒安全的佇列，由主執行緒以 poll() 取出（搭配 Tk 的 after()）
+    """
+
+    def __init__(self, cache=None, runner=None, recorder=None):
+        self.cache = cache
+        self.runner = runner or ocr_core.ocr_image
+        self.recorder = recorder  # ocr_debug.DebugRecorder：啟用時記錄各階段的中間結果
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._events = queue.Queue()
+        self._pending = None
+        self._current = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._worker, name="ocr-job-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, image, options=None):
+        """送出新工作，取代等待中與執行中的舊工作"""
+        job = OCRJob(image, options)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.cancel()
+                self._pending.state = 'cancelled'
+                self._events.put((self._pending, 'cancelled'))
+            if self._current is not None:
+                self._current.cancel()
+            self._pending = job
+        self._events.put((job, 'queued'))
+        self._wake.set()
+        return job
+
+    def cancel_all(self):
+        with self._lock:
+            for job in (self._pending, self._current):
+                if job is not None:
+                    job.cancel()
+
+    @property
+    def busy(self):
+        with self._lock:
+            return self._pending is not None or self._current is not None
+
+    def poll(self):
+        """取出所有待處理事件 [(job, event), ...]，僅可在主執行緒呼叫"""
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def close(self):
+        self._closed = True
+        self.cancel_all()
+        self._wake.set()
+
+    def _worker(self):
+        while not self._closed:
+            self._wake.wait()
+            with self._lock:
+                job = self._pending
+                self._pending = None
+                self._current = job
+                if job is None:
+                    self._wake.clear()
+                    continue
+            self._run(job)
+            with self._lock:
+                self._current = None
+
+    def _run(self, job):
+        if job.cancelled:
+            job.state = 'cancelled'
+            self._events.put((job, 'cancelled'))
+            return
+
+        job.started = time.perf_counter()
+        job.state = 'preprocessing'
+        self._events.put((job, 'preprocessing'))
+        import ocr_preprocess
+        stages = ocr_preprocess.PIPELINES.get(job.options['preprocess'], [])
+        last_stage = stages[-1][0] if stages else None
+        capture = self.recorder.begin(job.image, job.options) if self.recorder is not None else None
+
+        def on_stage(name, elapsed, output):
+            job.add_stage_time(name, elapsed)
+            if capture is not None:
+                self.recorder.record(capture, name, elapsed, output)
+            # 每個處理階段結束時檢查是否已被取代
+            if job.cancelled:
+                raise JobCancelled()
+            if name.rpartition('.')[2] == last_stage:
+                job.state = 'ocr'
+                self._events.put((job, 'ocr'))
+
+        try:
+            job.result = self.runner(job.image, job.options, cache=self.cache, on_stage=on_stage)
+            if job.cancelled:
+                raise JobCancelled()
+            job.state = 'done'
+        except JobCancelled:
+            job.state = 'cancelled'
+        except Exception as e:
+            job.error = e
+            job.state = 'error'
+        job.finished = time.perf_counter()
+        job.image = None  # 釋放截圖
+        if capture is not None:
+            self.recorder.finish(capture, job.result, job.error)
+        self._events.put((job, job.state))
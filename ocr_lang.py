@@ -0,0 +1,119 @@
+"""
+CL_Scan 文字系統偵測
+lang='auto' 時依截圖（或分塊辨識的每個區塊）偵測文字系統，只載入需要的語言模型：
+同時指定多個語言（eng+chi_tra+jpn）會讓每次辨識都慢上數倍、記憶體也多數倍
+"""
+import time
+
+import numpy as np
+
+import ocr_engine
+import ocr_layout
+import ocr_preprocess
+
+FALLBACK_LANG = 'eng'
+
+# OSD 回報的文字系統 → 候選語言（依偏好順序，取第一個已安裝的）
+SCRIPT_LANGS = {
+    'Latin': ('eng',),
+    'Han': ('chi_tra', 'chi_sim', 'jpn', 'kor'),
+    'Japanese': ('jpn',),
+    'Katakana': ('jpn',),
+    'Hiragana': ('jpn',),
+    'Hangul': ('kor',),
+    'Cyrillic': ('rus', 'ukr', 'bul', 'srp'),
+    'Greek': ('ell',),
+    'Arabic': ('ara', 'fas'),
+    'Hebrew': ('heb',),
+    'Thai': ('tha',),
+    'Devanagari': ('hin', 'mar', 'nep'),
+}
+MIN_SCRIPT_CONF = 1.0    # OSD 的 script_conf 低於此值視為不可靠
+
+# 本地分類器（沒有 osd.traineddata 或 OSD 失敗時使用）：
+# 漢字筆畫密集，每一欄垂直方向平均有 2 段以上的墨水；拉丁字母幾乎都在 1.5~1.85 之間
+HAN_STROKE_RUNS = 2.0
+MIN_CLASSIFY_HEIGHT = 10  # 太矮的文字行筆畫會黏在一起，不列入判斷
+MIN_SCRIPT_SHARE = 0.2    # 某文字系統至少佔 2 成的行才加入語言組合
+
+
+def recognition_languages():
+    """已安裝、可用於辨識的語言（排除 osd）"""
+    return ocr_engine.installed_languages() - {ocr_engine.OSD_LANG}
+
+
+def script_lang(script, installed=None):
+    """文字系統 → 已安裝的語言，沒有對應的語言包時回傳 None"""
+    installed = recognition_languages() if installed is None else installed
+    for lang in SCRIPT_LANGS.get(script, ()):
+        if lang in installed:
+            return lang
+    return None
+
+
+def classify_lines(image):
+    """本地分類：各文字行判斷為 'Han' 或 'Latin'，回傳 {文字系統: 行數}
+
+    只區分筆畫密集的方塊字與字母文字，無法分辨中、日、韓或拉丁、西里爾字母
+    """
+    mask = ocr_preprocess.ink_mask(image)
+    counts = {}
+    for top, bottom, left, right in ocr_layout.find_text_lines(mask):
+        if bottom - top < MIN_CLASSIFY_HEIGHT:
+            continue
+        line = mask[top:bottom, left:right]
+        # 每一欄由空白進入墨水的次數 = 該欄的筆畫段數
+        runs = np.count_nonzero(line[1:] & ~line[:-1], axis=0) + line[0]
+        inked = runs > 0
+        if not inked.any():
+            continue
+        script = 'Han' if runs[inked].mean() >= HAN_STROKE_RUNS else 'Latin'
+        counts[script] = counts.get(script, 0) + 1
+    return counts
+
+
+def detect_osd(image):
+    """以 Tesseract OSD 偵測文字系統，回傳 (script, 信心值)；無法判斷時回傳 (None, 0)"""
+    try:
+        with ocr_engine.get_engine_pool().acquire(ocr_engine.OSD_LANG, ocr_engine.OSD_CONFIG) as engine:
+            osd = engine.image_to_osd(image)
+    except Exception:
+        # 文字太少時 Tesseract 會回報錯誤
+        return None, 0.0
+    return osd['script'], float(osd['script_conf'])
+
+
+def detect_language(image, fallback=FALLBACK_LANG):
+    """選出辨識這張圖所需的最少語言，回傳 (lang, info)
+
+    只安裝一種語言時直接使用，不做偵測；有 osd.traineddata 時以 OSD 判斷，
+    否則以本地分類器判斷（可組合成 'chi_tra+eng' 這類混合語言）
+    """
+    start = time.perf_counter()
+    installed = recognition_languages()
+    info = {'method': 'installed', 'scripts': []}
+    if len(installed) <= 1:
+        lang = next(iter(installed), fallback)
+        info['detect_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        return lang, info
+
+    langs = []
+    if ocr_engine.OSD_LANG in ocr_engine.installed_languages():
+        script, conf = detect_osd(image)
+        if script is not None and conf >= MIN_SCRIPT_CONF:
+            info.update(method='osd', scripts=[script], script_conf=round(conf, 2))
+            langs = [script_lang(script, installed)]
+    if not langs:
+        counts = classify_lines(image)
+        total = sum(counts.values())
+        scripts = [script for script, count in sorted(counts.items(), key=lambda item: -item[1])
+                   if count >= total * MIN_SCRIPT_SHARE]
+        info.update(method='local', scripts=scripts)
+        langs = [script_lang(script, installed) for script in scripts]
+
+    langs = list(dict.fromkeys(lang for lang in langs if lang))
+    if not langs:
+        langs = [fallback if fallback in installed else min(installed)]
+    lang = '+'.join(langs)
+    info['detect_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return lang, info
@@ -0,0 +1,164 @@
+"""
+CL_Scan 版面分析與分塊辨識
+以投影剖面找出文字行，分組成區塊後平行預處理與辨識，再依座標合併回閱讀順序
+"""
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import numpy as np
+from PIL import Image
+
+import ocr_preprocess
+
+LAYOUT_MODES = ('single', 'tiled', 'auto')
+AUTO_MIN_PIXELS = 400_000  # auto 模式：原圖超過此像素數才分塊（約半個 1080p 畫面的 1/2）
+AUTO_MIN_LINES = 8         # auto 模式：至少要有這麼多行才分塊
+MIN_TILE_LINES = 3         # 每個區塊至少的行數（太小的區塊 Tesseract 啟動成本划不來）
+TILES_PER_WORKER = 2       # 區塊數約為平行數的倍數，讓快慢不一的區塊能互相補位
+TILE_PAD = 8               # 區塊左右與上下邊緣保留的空白（原圖像素）
+
+
+def _runs(profile):
+    """profile 中連續為 True 的區段 [(start, end), ...]"""
+    padded = np.concatenate(([False], profile, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return [(int(start), int(end)) for start, end in zip(edges[::2], edges[1::2])]
+
+
+def find_text_lines(mask):
+    """水平投影剖面找出文字行，回傳 [(top, bottom, left, right), ...]（由上而下）
+
+    i、j 的點或標點與本體之間只隔 1~2 列空白，間距太小或高度太矮的片段會併入相鄰的行
+    """
+    runs = _runs(mask.any(axis=1))
+    if not runs:
+        return []
+    line_height = float(np.percentile([bottom - top for top, bottom in runs], 75))
+    min_gap = max(2.0, line_height * 0.25)
+    merged = []
+    for top, bottom in runs:
+        if merged and (top - merged[-1][1] < min_gap or bottom - top < line_height * 0.4
+                       or merged[-1][1] - merged[-1][0] < line_height * 0.4):
+            merged[-1] = (merged[-1][0], bottom)
+        else:
+            merged.append((top, bottom))
+
+    lines = []
+    for top, bottom in merged:
+        cols = np.flatnonzero(mask[top:bottom].any(axis=0))
+        lines.append((top, bottom, int(cols[0]), int(cols[-1]) + 1))
+    return lines
+
+
+def plan_tiles(lines, width, height, workers, min_lines=MIN_TILE_LINES):
+    """將連續的文字行分組成區塊，回傳各區塊在原圖中的 (left, top, right, bottom)
+
+    只沿行距切開（不切欄），表格與對齊的日誌欄位仍保持在同一行；
+    上下邊界取相鄰區塊行距的中點，左右只保留有文字的範圍
+    """
+    if not lines:
+        return []
+    target = max(1, workers * TILES_PER_WORKER)
+    per_tile = max(min_lines, -(-len(lines) // target))
+    groups = [lines[i:i + per_tile] for i in range(0, len(lines), per_tile)]
+    if len(groups) > 1 and len(groups[-1]) < min_lines:
+        groups[-2] = groups[-2] + groups.pop()
+
+    boxes = []
+    for i, group in enumerate(groups):
+        top = group[0][0]
+        bottom = group[-1][1]
+        upper = (groups[i - 1][-1][1] + top) // 2 if i > 0 else max(0, top - TILE_PAD)
+        lower = (bottom + groups[i + 1][0][0]) // 2 if i + 1 < len(groups) else min(height, bottom + TILE_PAD)
+        left = max(0, min(line[2] for line in group) - TILE_PAD)
+        right = min(width, max(line[3] for line in group) + TILE_PAD)
+        boxes.append((left, upper, right, lower))
+    return boxes
+
+
+def should_tile(image, options, lines):
+    """依 options['layout'] 判斷是否分塊"""
+    layout = options.get('layout', 'single')
+    if layout not in LAYOUT_MODES:
+        raise ValueError(f"未知的版面模式: {layout}")
+    if layout == 'tiled':
+        return len(lines) > 1
+    if layout == 'auto':
+        return image.width * image.height >= AUTO_MIN_PIXELS and len(lines) >= AUTO_MIN_LINES
+    return False
+
+
+def stitch(size, scale, boxes, images):
+    """將各區塊的預處理結果貼回整張圖（供調試保存）"""
+    width, height = max(1, int(size[0] * scale)), max(1, int(size[1] * scale))
+    canvas = Image.new(images[0].mode, (width, height), 255)
+    for box, tile in zip(boxes, images):
+        canvas.paste(tile, (int(box[0] * scale), int(box[1] * scale)))
+    return canvas
+
+
+def ocr_tiled(image, options, recognize, workers, on_stage=None, recognize_batch=None):
+    """分塊辨識：回傳 (合併文字, 拼回整張的預處理圖, state)；不適合分塊時回傳 None
+
+    recognize(processed_tile) 回傳文字，會在多個執行緒中同時呼叫；
+    指定 recognize_batch(processed_tiles) 時各區塊只做預處理，全部完成後一次辨識。
+    預處理與 Tesseract（執行檔或 tesserocr）執行時都會釋放 GIL，執行緒即可用滿多核心。
+    on_stage 會收到 'layout'、各區塊的預處理階段（來自不同執行緒，名稱加上 'tile.'）與 'tiles'（實際耗時）
+    """
+    start = time.perf_counter()
+    lines = find_text_lines(ocr_preprocess.ink_mask(image))
+    if not should_tile(image, options, lines):
+        return None
+    boxes = plan_tiles(lines, image.width, image.height, workers)
+    if on_stage is not None:
+        on_stage('layout', time.perf_counter() - start, boxes)
+
+    # 所有區塊沿用整張圖的放大倍率，避免矮小的區塊被當成小圖放大 4 倍
+    state = {}
+    scale = ocr_preprocess.resolve_scale(image, options, state)
+    tile_options = dict(options, scale=scale)
+
+    tile_stage = None
+    if on_stage is not None:
+        def tile_stage(name, elapsed, output):
+            on_stage('tile.' + name, elapsed, output)
+
+    def run(box):
+        processed, tile_state = ocr_preprocess.preprocess(image.crop(box), tile_options, tile_stage)
+        if recognize_batch is not None:
+            return None, processed, tile_state
+        return recognize(processed), processed, tile_state
+
+    start = time.perf_counter()
+    workers = max(1, min(workers, len(boxes)))
+    if workers == 1:
+        results = [run(box) for box in boxes]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ocr-tile') as executor:
+            futures = [executor.submit(run, box) for box in boxes]
+            try:
+                results = [future.result() for future in futures]
+            except BaseException:
+                # 任一區塊失敗或被取消：尚未開始的區塊不再執行
+                for future in futures:
+                    future.cancel()
+                raise
+    if recognize_batch is not None:
+        texts = recognize_batch([result[1] for result in results])
+        results = [(text,) + result[1:] for text, result in zip(texts, results)]
+
+    # 依座標排回閱讀順序（由上而下，同一列由左而右）
+    order = sorted(range(len(boxes)), key=lambda i: (boxes[i][1], boxes[i][0]))
+    text = '\n'.join(results[i][0].strip('\n') for i in order if results[i][0].strip())
+    if on_stage is not None:
+        on_stage('tiles', time.perf_counter() - start, text)
+
+    state.update({
+        'scale': scale,
+        'threshold': results[0][2].get('threshold'),
+        'tiles': len(boxes),
+        'tile_workers': workers,
+        'lines': len(lines),
+    })
+    processed_image = stitch(image.size, scale, boxes, [result[1] for result in results])
+    return text, processed_image, state
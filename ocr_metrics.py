@@ -0,0 +1,170 @@
+"""
+CL_Scan 階段耗時統計
+記錄每次截圖各階段的耗時，寫入輪替的 JSON Lines 記錄檔，並保留最近的樣本計算 p50 / p95 / p99
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_WINDOW = 1024              # 每個階段保留最近的樣本數
+DEFAULT_LOG_BYTES = 5 * 1024 * 1024
+DEFAULT_LOG_BACKUPS = 3
+# 使用者拖曳選取的時間不算入處理耗時
+EXCLUDED_FROM_TOTAL = ('select',)
+# 名稱含 '.' 的階段（tile.grayscale、variant.ocr…）來自平行的工作執行緒，彼此重疊，
+# 實際耗時已算在 tiles / ensemble 階段內：另外累計，不併入各階段與合計
+PARALLEL_SEPARATOR = '.'
+
+
+def percentile(values, pct):
+    """最近秩百分位數：排序後第 ceil(pct/100 · n) 個值
+
+    >>> percentile([2, 1], 50)
+    1
+    >>> percentile(range(1, 11), 50)
+    5
+    >>> percentile(range(1, 101), 95)
+    95
+    >>> percentile([3, 1, 2], 0), percentile([3, 1, 2], 100)
+    (1, 3)
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    # pct·n 先相乘再除，避免 0.07 * 100 之類的浮點誤差多進一位
+    return ordered[min(len(ordered), max(1, math.ceil(pct * len(ordered) / 100))) - 1]
+
+
+def is_parallel(name):
+    return PARALLEL_SEPARATOR in name
+
+
+class SnipTrace:
+    """單次截圖的各階段耗時（毫秒），可從多個執行緒累加"""
+
+    def __init__(self):
+        self.created = time.time()
+        self.stages = {}
+        self.parallel = {}  # 平行執行緒的階段：各執行緒耗時的總和，只供參考
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            stages = self.parallel if is_parallel(name) else self.stages
+            stages[name] = stages.get(name, 0.0) + seconds * 1000
+
+    @contextmanager
+    def stage(self, name):
+        """with trace.stage('grab'): ... 量測區塊耗時"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def total_ms(self):
+        with self._lock:
+            return sum(ms for name, ms in self.stages.items() if name not in EXCLUDED_FROM_TOTAL)
+
+    def to_dict(self, **extra):
+        with self._lock:
+            stages = {name: round(ms, 2) for name, ms in self.stages.items()}
+            parallel = {name: round(ms, 2) for name, ms in self.parallel.items()}
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.created)),
+            'stages_ms': stages,
+            'total_ms': round(sum(ms for name, ms in stages.items() if name not in EXCLUDED_FROM_TOTAL), 2),
+        }
+        if parallel:
+            entry['parallel_ms'] = parallel
+        entry.update(extra)
+        return entry
+
+
+def format_breakdown(entry):
+    """顯示用的一行摘要：grab 42 · ocr 310 · … (ms)"""
+    parts = [f"{name} {ms:.0f}" for name, ms in entry['stages_ms'].items() if name not in EXCLUDED_FROM_TOTAL]
+    return f"{' · '.join(parts)}  (合計 {entry['total_ms']:.0f} ms)"
+
+
+class StageMetrics:
+    """各階段耗時的滾動統計 + 輪替的 JSON Lines 記錄檔"""
+
+    def __init__(self, log_path=None, window=DEFAULT_WINDOW,
+                 max_bytes=DEFAULT_LOG_BYTES, backups=DEFAULT_LOG_BACKUPS):
+        self.log_path = log_path
+        self.window = window
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.count = 0
+        self._samples = {}  # 階段 -> deque(最近 window 筆毫秒數)
+        self._lock = threading.Lock()
+
+    def record(self, trace, **extra):
+        """記錄一次截圖，回傳寫入記錄檔的 dict"""
+        entry = trace.to_dict(**extra)
+        with self._lock:
+            self.count += 1
+            for name, ms in list(entry['stages_ms'].items()) + [('total', entry['total_ms'])]:
+                samples = self._samples.get(name)
+                if samples is None:
+                    samples = self._samples[name] = deque(maxlen=self.window)
+                samples.append(ms)
+            if self.log_path:
+                try:
+                    self._append(json.dumps(entry, ensure_ascii=False))
+                except OSError as e:
+                    print(f"耗時記錄寫入失敗: {e}")
+        return entry
+
+    def _append(self, line):
+        if os.path.exists(self.log_path) and os.path.getsize(self.log_path) + len(line) > self.max_bytes:
+            self._rotate()
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+    def _rotate(self):
+        """ocr_metrics.jsonl → .1 → .2 …，超過 backups 份的最舊記錄刪除"""
+        for i in range(self.backups - 1, 0, -1):
+            source = f"{self.log_path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.log_path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.log_path, f"{self.log_path}.1")
+        else:
+            os.remove(self.log_path)
+
+    def snapshot(self):
+        """各階段最近 window 筆的 count / p50 / p95 / p99 / mean / max（毫秒）"""
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+            count = self.count
+        stages = {}
+        for name, values in samples.items():
+            stages[name] = {
+                'count': len(values),
+                'p50': round(percentile(values, 50), 2),
+                'p95': round(percentile(values, 95), 2),
+                'p99': round(percentile(values, 99), 2),
+                'mean': round(sum(values) / len(values), 2),
+                'max': round(max(values), 2),
+            }
+        return {
+            'generated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'snips': count,
+            'window': self.window,
+            'stages_ms': stages,
+        }
+
+    def dump(self, path):
+        """將目前的統計寫成 JSON（先寫暫存檔再取代，讀取端不會讀到寫一半的檔案）"""
+        snapshot = self.snapshot()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+        return snapshot
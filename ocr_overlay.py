@@ -0,0 +1,136 @@
+"""
+CL_Scan 截圖選取框繪製
+以固定數量的畫布物件表現「選取區明亮、其餘變暗」，每次滑鼠移動的成本與選取範圍大小無關
+"""
+import ctypes
+
+from PIL import ImageTk
+
+DEFAULT_REFRESH_HZ = 60
+
+
+def display_refresh_rate():
+    """取得主螢幕更新率（Hz），無法取得時回傳 60"""
+    try:
+        user32 = ctypes.windll.user32
+        gdi32 = ctypes.windll.gdi32
+        hdc = user32.GetDC(0)
+        try:
+            rate = gdi32.GetDeviceCaps(hdc, 116)  # VREFRESH
+        finally:
+            user32.ReleaseDC(0, hdc)
+        if rate and rate > 1:
+            return rate
+    except Exception:
+        pass
+    return DEFAULT_REFRESH_HZ
+
+
+class MaskSelectionRenderer:
+    """明亮底圖 + 四個半透明（點陣）暗色矩形遮住選取區以外的範圍
+
+    每次更新只改五個畫布物件的座標，不裁切圖片、不建立新的 PhotoImage
+    """
+
+    def __init__(self, canvas, width, height, outline='#FF3333'):
+        self.canvas = canvas
+        self.width = width
+        self.height = height
+        mask = {'fill': 'black', 'stipple': 'gray50', 'width': 0}
+        # 尚未選取時由上方矩形蓋住整個畫面
+        self.masks = [
+            canvas.create_rectangle(0, 0, width, height, **mask),  # 上
+            canvas.create_rectangle(0, 0, 0, 0, **mask),           # 下
+            canvas.create_rectangle(0, 0, 0, 0, **mask),           # 左
+            canvas.create_rectangle(0, 0, 0, 0, **mask),           # 右
+        ]
+        self.rect_id = canvas.create_rectangle(0, 0, 0, 0, outline=outline, width=2, state='hidden')
+
+    def update(self, x1, y1, x2, y2):
+        """選取範圍改為 (x1, y1)-(x2, y2)（已正規化為左上、右下）"""
+        top, bottom, left, right = self.masks
+        coords = self.canvas.coords
+        coords(top, 0, 0, self.width, y1)
+        coords(bottom, 0, y2, self.width, self.height)
+        coords(left, 0, y1, x1, y2)
+        coords(right, x2, y1, self.width, y2)
+        coords(self.rect_id, x1, y1, x2, y2)
+        self.canvas.itemconfigure(self.rect_id, state='normal')
+
+
+class HoleSelectionRenderer:
+    """region 模式：整個視窗半透明變暗，選取區以透明色「挖空」露出即時畫面
+
+    Windows 以 -transparentcolor 實現挖空；其他平台只顯示紅框
+    """
+    HOLE_COLOR = '#010203'
+
+    def __init__(self, window, canvas, outline='#FF3333', alpha=0.4):
+        self.canvas = canvas
+        canvas.configure(bg='black')
+        window.attributes('-alpha', alpha)
+        fill = ''
+        try:
+            window.attributes('-transparentcolor', self.HOLE_COLOR)
+            fill = self.HOLE_COLOR
+        except Exception:
+            pass
+        self.rect_id = canvas.create_rectangle(0, 0, 0, 0, outline=outline, width=2, fill=fill, state='hidden')
+
+    def update(self, x1, y1, x2, y2):
+        self.canvas.coords(self.rect_id, x1, y1, x2, y2)
+        self.canvas.itemconfigure(self.rect_id, state='normal')
+
+
+class CropSelectionRenderer:
+    """原本的做法：每次移動都裁切亮圖並建立新的 PhotoImage（成本隨選取面積成長，僅供效能比較）"""
+
+    def __init__(self, canvas, bright_image, outline='#FF3333'):
+        self.canvas = canvas
+        self.bright_image = bright_image
+        self.highlight_id = None
+        self.tk_crop = None
+        self.rect_id = canvas.create_rectangle(0, 0, 0, 0, outline=outline, width=2)
+
+    def update(self, x1, y1, x2, y2):
+        self.canvas.coords(self.rect_id, x1, y1, x2, y2)
+        if self.highlight_id:
+            self.canvas.delete(self.highlight_id)
+            self.highlight_id = None
+        if (x2 - x1) > 1 and (y2 - y1) > 1:
+            crop = self.bright_image.crop((int(x1), int(y1), int(x2), int(y2)))
+            self.tk_crop = ImageTk.PhotoImage(crop)
+            self.highlight_id = self.canvas.create_image(x1, y1, anchor="nw", image=self.tk_crop)
+            self.canvas.tag_raise(self.rect_id)
+
+
+class MotionThrottle:
+    """合併滑鼠移動事件：每個畫面更新週期最多繪製一次，永遠使用最新座標"""
+
+    def __init__(self, widget, render, refresh_hz=None):
+        self.widget = widget
+        self.render = render
+        self.interval_ms = max(1, int(1000 / (refresh_hz or display_refresh_rate())))
+        self.pending = None
+        self.after_id = None
+
+    def push(self, *args):
+        self.pending = args
+        if self.after_id is None:
+            self.after_id = self.widget.after(self.interval_ms, self.flush)
+
+    def cancel(self):
+        """丟棄尚未繪製的座標"""
+        self.pending = None
+        if self.after_id is not None:
+            self.widget.after_cancel(self.after_id)
+            self.after_id = None
+
+    def flush(self):
+        """立即繪製最新的座標"""
+        if self.after_id is not None:
+            self.widget.after_cancel(self.after_id)
+            self.after_id = None
+        if self.pending is not None:
+            args, self.pending = self.pending, None
+            self.render(*args)
@@ -0,0 +1,351 @@
+"""
+CL_Scan 圖像預處理引擎
+放大後的對比度/銳化/二值化以查表與整數運算逐段融合，取代每步都產生整張圖片副本的 PIL 處理鏈（結果逐像素相同）
+"""
+import time
+
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter, ImageOps
+
+CONTRAST_FACTOR = 2.5
+BINARIZE_METHODS = ('fixed', 'otsu', 'sauvola')
+STRIP_PIXELS = 1 << 20  # 每段處理的輸出像素數，決定暫存記憶體上限（約 2 MB / int16 緩衝區）
+
+# Tesseract 在大寫字母約 30 像素高時最準確，換算 x-height 約 20 像素；
+# adaptive 模式只把 x-height 拉進這個範圍，已在範圍內就不縮放
+X_HEIGHT_RANGE = (18.0, 30.0)
+SCALE_LIMITS = (0.25, 4.0)
+SCALE_MODES = ('adaptive', 'legacy')
+MIN_LINE_ROWS = 3      # 估計 x-height 時忽略高度不到 3 列的片段
+
+
+def legacy_scale(width, height):
+    """原本的放大規則：小圖 4 倍，其餘 2.5 倍"""
+    if width < 100 or height < 50:
+        return 4
+    return 2.5
+
+
+def _scaled_size(image, scale):
+    return max(1, int(image.width * scale)), max(1, int(image.height * scale))
+
+
+def ink_mask(image):
+    """文字像素遮罩：Otsu 分成兩類，數量較少的一類視為文字（深色主題也適用）"""
+    gray = image.convert('L')
+    threshold = otsu_threshold(gray.histogram())
+    mask = np.asarray(gray) <= threshold
+    if np.count_nonzero(mask) * 2 > mask.size:
+        mask = ~mask
+    return mask
+
+
+def estimate_x_height(image):
+    """以各文字行的水平投影估計小寫字母的 x-height（像素），找不到文字行時回傳 None
+
+    以空白列切出文字行後，行內墨水量達該行最大值一半以上的列數即為 x-height：
+    上伸部（l、d）與下伸部（p、g）只佔少數像素，不會被算進去
+    """
+    mask = ink_mask(image)
+    rows = np.count_nonzero(mask, axis=1)
+    edges = np.diff(np.concatenate(([0], rows > 0, [0])).astype(np.int8))
+    heights = []
+    for top, bottom in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+        # 太矮的是 i 的點或雜點
+        if bottom - top < MIN_LINE_ROWS:
+            continue
+        band = rows[top:bottom]
+        heights.append(np.count_nonzero(band * 2 >= band.max()))
+    if not heights:
+        return None
+    return float(np.median(heights))
+
+
+def adaptive_scale(x_height):
+    """讓 x-height 落入 X_HEIGHT_RANGE 的最小縮放倍率（已在範圍內回傳 1）"""
+    low, high = X_HEIGHT_RANGE
+    if x_height < low:
+        scale = np.ceil(low / x_height * 100) / 100
+    elif x_height > high:
+        scale = np.floor(high / x_height * 100) / 100
+    else:
+        return 1.0
+    return float(min(SCALE_LIMITS[1], max(SCALE_LIMITS[0], scale)))
+
+
+def resolve_scale(image, options, state=None):
+    """放大倍率：options['scale'] 指定時直接使用（分塊辨識時各區塊沿用整張圖的倍率），
+    adaptive 模式依估計的 x-height 決定，估計不到時退回原本的規則"""
+    if options.get('scale'):
+        return options['scale']
+    scale_mode = options.get('scale_mode', 'legacy')
+    if scale_mode not in SCALE_MODES:
+        raise ValueError(f"未知的縮放模式: {scale_mode}")
+    if scale_mode == 'adaptive':
+        x_height = estimate_x_height(image)
+        if state is not None:
+            state['x_height'] = x_height
+        if x_height is not None:
+            return adaptive_scale(x_height)
+    return legacy_scale(image.width, image.height)
+
+
+def pixel_budget(size, scale):
+    """回傳 (實際送進 OCR 的像素數, 原本規則的像素數)"""
+    width, height = size
+    legacy = legacy_scale(width, height)
+    return (max(1, int(width * scale)) * max(1, int(height * scale)),
+            max(1, int(width * legacy)) * max(1, int(height * legacy)))
+
+
+# ================= 傾斜與方向校正（兩條處理鏈共用）=================
+def _deskew(image, state):
+    # 在放大前的灰階圖上估計與旋轉
+    import ocr_deskew
+    image, state['deskew'] = ocr_deskew.deskew_image(image, state['options'])
+    return image
+
+
+# ================= 原始處理鏈（保留作為對照基準）=================
+def _legacy_grayscale(image, state):
+    gray = image.convert('L')
+    return ImageOps.invert(gray) if state['options'].get('invert') else gray
+
+
+def _legacy_autocontrast(image, state):
+    return ImageOps.autocontrast(image)
+
+
+def _legacy_upscale(image, state):
+    state['scale'] = resolve_scale(image, state['options'], state)
+    return image.resize(_scaled_size(image, state['scale']), Image.Resampling.LANCZOS)
+
+
+def _legacy_contrast(image, state):
+    return ImageEnhance.Contrast(image).enhance(CONTRAST_FACTOR)
+
+
+def _legacy_sharpen(image, state):
+    return image.filter(ImageFilter.SHARPEN)
+
+
+def _legacy_threshold(image, state):
+    # 與向量化處理鏈相同的 binarize 選項；Otsu 與 Sauvola 在銳化後的放大圖上計算
+    options = state['options']
+    method = options.get('binarize', 'fixed')
+    if method == 'sauvola':
+        # 視窗大小以原圖像素計，換算到放大後的圖
+        window = max(3, int(options['sauvola_window'] * state.get('scale', 1)))
+        tmap = sauvola_threshold_map(image, window=window, k=options['sauvola_k'])
+        state['threshold'] = 'sauvola'
+        return Image.fromarray(np.where(np.asarray(image) > tmap, 255, 0).astype(np.uint8))
+    if method == 'otsu':
+        threshold = otsu_threshold(image.histogram())
+    elif method == 'fixed':
+        threshold = options['threshold']
+    else:
+        raise ValueError(f"未知的二值化方法: {method}")
+    state['threshold'] = threshold
+    return image.point(lambda p: 255 if p > threshold else 0)
+
+
+LEGACY_STAGES = [
+    ('grayscale', _legacy_grayscale),
+    ('deskew', _deskew),
+    ('autocontrast', _legacy_autocontrast),
+    ('upscale', _legacy_upscale),
+    ('contrast', _legacy_contrast),
+    ('sharpen', _legacy_sharpen),
+    ('sharpen2', _legacy_sharpen),
+    ('binarize', _legacy_threshold),
+]
+
+
+# ================= 向量化處理鏈 =================
+def contrast_lut(histogram, factor=CONTRAST_FACTOR):
+    """與 ImageEnhance.Contrast 相同的 256 階查表：以灰階平均值為中心拉伸
+
+    平均值取四捨五入後的整數；Image.blend 以 float 計算後截斷小數
+    """
+    hist = np.asarray(histogram[:256], dtype=np.float64)
+    total = hist.sum()
+    mean = np.float32(int((hist * np.arange(256)).sum() / total + 0.5) if total else 0)
+    values = np.arange(256, dtype=np.float32)
+    return np.clip((mean + np.float32(factor) * (values - mean)).astype(np.int32), 0, 255).astype(np.uint8)
+
+
+def otsu_threshold(histogram):
+    """Otsu 門檻（以 256 階直方圖向量化計算類間變異數）"""
+    hist = np.asarray(histogram[:256], dtype=np.float64)
+    total = hist.sum()
+    if total == 0:
+        return 127
+    levels = np.arange(256, dtype=np.float64)
+    weight_bg = np.cumsum(hist)
+    weight_fg = total - weight_bg
+    cum_mean = np.cumsum(hist * levels)
+    mean_bg = cum_mean / np.maximum(weight_bg, 1)
+    mean_fg = (cum_mean[-1] - cum_mean) / np.maximum(weight_fg, 1)
+    between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(between))
+
+
+def sauvola_threshold_map(gray, window=15, k=0.2, dynamic_range=128.0, strip_rows=64):
+    """Sauvola 局部門檻：分段以積分影像計算視窗平均與標準差，記憶體只與分段大小有關"""
+    arr = np.asarray(gray)
+    height, width = arr.shape
+    window = max(3, int(window) | 1)
+    radius = window // 2
+    padded = np.pad(arr, radius, mode='reflect')
+    del arr
+    area = float(window * window)
+    tmap = np.empty((height, width), dtype=np.float32)
+
+    for y0 in range(0, height, strip_rows):
+        y1 = min(height, y0 + strip_rows)
+        block = padded[y0:y1 + 2 * radius].astype(np.float64)
+        sums = []
+        for values in (block, block * block):
+            integral = np.zeros((values.shape[0] + 1, values.shape[1] + 1))
+            np.cumsum(values, axis=0, out=integral[1:, 1:])
+            np.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:])
+            sums.append(integral[window:, window:] - integral[:-window, window:]
+                        - integral[window:, :-window] + integral[:-window, :-window])
+        mean = sums[0] / area
+        var = sums[1] / area - mean * mean
+        std = np.sqrt(np.maximum(var, 0))
+        tmap[y0:y1] = mean * (1.0 + k * (std / dynamic_range - 1.0))
+    return tmap
+
+
+def sharpen_rows(block, top, height):
+    """一次 SHARPEN（與 ImageFilter.SHARPEN 相同：(34·中心 - 2·3x3 總和) / 16 四捨五入並截到 0~255，
+    影像最外圈的像素不變），回傳 (結果, 結果第一列的列號)
+
+    block 為從第 top 列開始的連續列（int16，中間值介於 -4590 ~ 8678 不會溢位）；
+    上下緣不是影像邊緣時缺少鄰列，結果少那一列
+    """
+    rows = len(block)
+    start = 0 if top == 0 else 1
+    end = rows if top + rows == height else rows - 1
+    out = block[start:end].copy()
+    lo, hi = max(start, 1), min(end, rows - 1)
+    if hi > lo and block.shape[1] > 2:
+        s3 = block[lo - 1:hi - 1] + block[lo:hi]
+        s3 += block[lo + 1:hi + 1]
+        inner = s3[:, :-2] + s3[:, 1:-1]
+        inner += s3[:, 2:]
+        del s3
+        inner *= -2
+        inner += block[lo:hi, 1:-1] * 34
+        inner += 8
+        inner //= 16
+        np.clip(inner, 0, 255, out=inner)
+        out[lo - start:hi - start, 1:-1] = inner
+    return out, top + start
+
+
+def _fast_upscale(image, state):
+    if state['options']['binarize'] == 'sauvola':
+        # 門檻圖是平滑的，於放大前的解析度計算
+        state['prescale'] = image
+    return _legacy_upscale(image, state)
+
+
+def _fast_contrast_sharpen_binarize(image, state):
+    """對比度、兩次銳化、二值化逐段融合：每段查表後以整數運算銳化，直接寫入最終的二值圖"""
+    options = state['options']
+    method = options['binarize']
+    width, height = image.size
+    prescale = state.pop('prescale', None)
+    times = {'contrast': 0.0, 'sharpen': 0.0, 'binarize': 0.0}
+
+    start = time.perf_counter()
+    histogram = image.histogram()
+    lut = contrast_lut(histogram).tolist()
+    mid = time.perf_counter()
+    times['contrast'] += mid - start
+
+    tmap_image = None
+    if method == 'sauvola':
+        tmap = sauvola_threshold_map(prescale.point(lut),
+                                     window=options['sauvola_window'], k=options['sauvola_k'])
+        tmap_image = Image.fromarray(tmap)
+        step_y = prescale.height / height
+        threshold = 'sauvola'
+    elif method == 'otsu':
+        # 對比度查表直接套到直方圖上，不必再掃一次整張圖
+        threshold = otsu_threshold(np.bincount(lut, weights=histogram[:256], minlength=256))
+    elif method == 'fixed':
+        threshold = int(options['threshold'])
+    else:
+        raise ValueError(f"未知的二值化方法: {method}")
+    times['binarize'] += time.perf_counter() - mid
+
+    # 輸出為 1-bit 影像（每列 packbits），比 8-bit 灰階小 8 倍
+    packed = np.empty((height, (width + 7) // 8), dtype=np.uint8)
+    strip_rows = min(height, max(16, STRIP_PIXELS // width))
+    for y0 in range(0, height, strip_rows):
+        y1 = min(height, y0 + strip_rows)
+        # 兩次 3x3 銳化需要上下各多 2 列
+        a0, a1 = max(0, y0 - 2), min(height, y1 + 2)
+
+        start = time.perf_counter()
+        block = np.asarray(image.crop((0, a0, width, a1)).point(lut)).astype(np.int16)
+        mid = time.perf_counter()
+        times['contrast'] += mid - start
+
+        block, top = sharpen_rows(block, a0, height)
+        block, top = sharpen_rows(block, top, height)
+        sharpened = block[y0 - top:y1 - top]
+        start = time.perf_counter()
+        times['sharpen'] += start - mid
+
+        if tmap_image is None:
+            mask = sharpened > threshold
+        else:
+            local = tmap_image.resize(
+                (width, y1 - y0), Image.Resampling.BILINEAR,
+                box=(0, y0 * step_y, tmap_image.width, y1 * step_y)
+            )
+            mask = sharpened > np.asarray(local)
+        packed[y0:y1] = np.packbits(mask, axis=1)
+        times['binarize'] += time.perf_counter() - start
+
+    state['threshold'] = threshold
+    state['substage_times'] = times
+    return Image.frombytes('1', (width, height), packed.tobytes())
+
+
+FAST_STAGES = [
+    ('grayscale', _legacy_grayscale),
+    ('deskew', _deskew),
+    ('autocontrast', _legacy_autocontrast),
+    ('upscale', _fast_upscale),
+    ('contrast_sharpen_binarize', _fast_contrast_sharpen_binarize),
+]
+
+PIPELINES = {
+    'fast': FAST_STAGES,
+    'legacy': LEGACY_STAGES,
+}
+
+
+def run_stages(stages, image, options, on_stage=None):
+    """依序執行各階段；on_stage(name, elapsed_s, output) 可用於量測"""
+    state = {'options': options}
+    data = image
+    for name, func in stages:
+        start = time.perf_counter()
+        data = func(data, state)
+        if on_stage is not None:
+            on_stage(name, time.perf_counter() - start, data)
+    return data, state
+
+
+def preprocess(image, options, on_stage=None):
+    """依 options['preprocess'] 選擇處理鏈，回傳 (處理後圖片, 狀態資訊)"""
+    pipeline = options.get('preprocess', 'fast')
+    if pipeline not in PIPELINES:
+        raise ValueError(f"未知的預處理方式: {pipeline}")
+    return run_stages(PIPELINES[pipeline], image, options, on_stage)
@@ -0,0 +1,92 @@
+"""
+CL_Scan 辨識設定檔
+依截圖內容一次決定預處理、頁面分割模式（PSM）、字元白名單/黑名單與辨識後的字元過濾：
+數字讀數、程式碼這類內容限制字元並改用合適的 PSM，辨識更快也更準
+"""
+import functools
+import string
+
+BASE_CONFIG = '--oem 3'
+LINE_BREAKS = '\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'  # str.splitlines 的分行字元
+DEFAULT_PROFILE = 'default'
+
+# psm: Tesseract 頁面分割模式 / whitelist、blacklist: 限制辨識的字元 / variables: 其他 Tesseract 參數
+# options: 覆寫預處理等 OCR 參數（呼叫端明確指定的參數優先）/ charset: 辨識後只保留的字元
+PROFILES = {
+    'default': {
+        'label': "一般",
+        'psm': 6,
+    },
+    'numeric': {
+        'label': "數字",
+        'psm': 7,  # 單行：數字讀數多半只有一行，省去版面分析
+        'whitelist': "0123456789.,:-+%/",
+        'options': {'lang': 'eng', 'binarize': 'otsu'},
+    },
+    'table': {
+        'label': "表格",
+        'psm': 6,
+        'variables': {'preserve_interword_spaces': '1'},  # 保留欄位之間的空白
+    },
+    'code': {
+        'label': "程式碼",
+        'psm': 6,
+        'blacklist': "‘’“”–—…",  # 排版用的引號與破折號，改辨識為 ASCII 字元
+        'variables': {'preserve_interword_spaces': '1'},
+        'options': {'lang': 'eng'},
+        'charset': string.printable,
+    },
+    'prose': {
+        'label': "段落",
+        'psm': 3,  # 自動分割版面：多欄、段落文字
+        'options': {'layout': 'auto'},
+    },
+}
+
+
+def profile_config(profile):
+    """設定檔 → Tesseract 參數字串"""
+    parts = [BASE_CONFIG, f"--psm {profile['psm']}"]
+    if profile.get('whitelist'):
+        parts.append(f"-c tessedit_char_whitelist={profile['whitelist']}")
+    if profile.get('blacklist'):
+        parts.append(f"-c tessedit_char_blacklist={profile['blacklist']}")
+    for key, value in profile.get('variables', {}).items():
+        parts.append(f"-c {key}={value}")
+    return ' '.join(parts)
+
+
+def profile_options(name):
+    """設定檔 → OCR 參數（config、charset 與預處理等覆寫項目）"""
+    profile = PROFILES.get(name)
+    if profile is None:
+        raise ValueError(f"未知的辨識設定檔: {name}（可用: {', '.join(PROFILES)}）")
+    options = dict(profile.get('options', {}))
+    options['config'] = profile_config(profile)
+    charset = profile.get('charset')
+    if charset is None and profile.get('whitelist'):
+        charset = profile['whitelist'] + ' '
+    options['charset'] = charset
+    return options
+
+
+# ================= 字元過濾 =================
+class CharFilter(dict):
+    """str.translate 用的對照表：字元第一次出現時判斷去留並記住，之後由 translate 的 C 迴圈直接查表"""
+
+    def __init__(self, allowed, keep_printable):
+        super().__init__()
+        self.allowed = frozenset(allowed) | frozenset(LINE_BREAKS)  # 保留分行字元，過濾後再分行
+        self.keep_printable = keep_printable
+
+    def __missing__(self, code):
+        char = chr(code)
+        value = code if char in self.allowed or (self.keep_printable and char.isprintable()) else None
+        self[code] = value
+        return value
+
+
+@functools.lru_cache(maxsize=32)
+def char_filter(charset=None, keep_printable=False):
+    """取得（共用的）字元過濾表；charset 為 None 時保留 ASCII 可列印字元"""
+    return CharFilter(string.printable if charset is None else charset, keep_printable)
@@ -0,0 +1,367 @@
+"""
+CL_Scan 捲動長截圖
+固定的螢幕區域在內容捲動時連續擷取，以每列像素的雜湊值對齊前後兩張畫面、算出捲動距離，
+只把新捲入的列接到待辨識緩衝區，在行距處切成文字帶送 OCR：
+每一列像素只辨識一次，耗時與新內容的量成正比，與已擷取的總長度無關，也不會產生重複的行
+"""
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+import ocr_capture
+import ocr_core
+import ocr_preprocess
+
+DEFAULT_INTERVAL = 0.1   # 秒；間隔太長時前後兩張畫面沒有重疊，無法對齊
+SCROLLBAR_MARGIN = 24    # 右側捲軸寬度（像素）：捲動時捲軸滑塊也會移動，比對與辨識都略過這一段
+MIN_VOTES = 3            # 至少要有幾列支持同一個位移才算對齊
+MIN_AGREEMENT = 0.3      # 支持最佳位移的列數佔所有可比對列的比例下限
+STILL_AGREEMENT = 0.5    # 判定沒有捲動時，參考畫面中可定位的列至少要有一半還在原位
+GAP_RATIO = 0.01         # 墨水像素不超過寬度 1% 的列視為行距（容許表格的直線）
+MIN_STRIP = 1 / 3        # 待辨識的列數達到畫面高度的 1/3 才切出文字帶（減少小段 OCR 的固定開銷）
+MAX_PENDING = 2.0        # 超過畫面高度 2 倍仍找不到行距時，在墨水最少的列強制切開
+
+# 列雜湊：每個像素乘上固定的 64 位元奇數權重後加總（溢位即取模），一次矩陣乘法算完整張畫面
+_WEIGHTS = np.random.default_rng(0x5C011).integers(1, 1 << 63, size=8192, dtype=np.uint64) | np.uint64(1)
+
+
+def content_columns(width):
+    """參與比對與辨識的欄範圍 (left, right)：太窄的區域不扣除捲軸"""
+    if width > SCROLLBAR_MARGIN * 4:
+        return 0, width - SCROLLBAR_MARGIN
+    return 0, width
+
+
+def row_hashes(gray):
+    """每列像素的 64 位元雜湊值"""
+    width = gray.shape[1]
+    weights = _WEIGHTS[:width] if width <= len(_WEIGHTS) else np.resize(_WEIGHTS, width)
+    with np.errstate(over='ignore'):
+        return gray.astype(np.uint64) @ weights
+
+
+def find_shift(reference, hashes):
+    """新畫面相對於參考畫面往上捲了幾列：>0 往下捲、0 沒有捲動、<0 往回捲，對不上時回傳 None
+
+    只用在參考畫面中只出現一次的列投票（空白列、重複的分隔線無法定位），
+    新畫面第 j 列若等於參考畫面第 i 列即投給位移 i - j；固定的標題列投給 0，票數少不影響結果
+    """
+    if np.array_equal(reference, hashes):
+        return 0
+    values, index, counts = np.unique(reference, return_index=True, return_counts=True)
+    unique, positions = values[counts == 1], index[counts == 1]
+    if not len(unique):
+        return None
+    found = np.minimum(np.searchsorted(unique, hashes), len(unique) - 1)
+    matched = unique[found] == hashes
+    shifts = positions[found[matched]] - np.flatnonzero(matched)
+    if len(shifts) < MIN_VOTES:
+        return None
+    offset = len(hashes)
+    votes = np.bincount(shifts + offset)
+    best = int(np.argmax(votes))
+    if votes[best] < max(MIN_VOTES, len(shifts) * MIN_AGREEMENT):
+        return None
+    if best == offset and votes[best] < len(unique) * STILL_AGREEMENT:
+        # 只有固定的標題列、狀態列還在原位：內容捲出了整個畫面
+        return None
+    return best - offset
+
+
+def fixed_footer(reference, hashes):
+    """畫面底部位置不變的列數（固定的狀態列、工具列），這些列不當作新內容"""
+    same = reference[::-1] == hashes[::-1]
+    return len(same) if same.all() else int(np.argmin(same))
+
+
+def find_cut(ink, min_rows):
+    """在待辨識緩衝區中找切點：最後一段行距的中間（以下是還沒捲完的行），找不到回傳 None"""
+    gaps = ink <= 0
+    edges = np.diff(np.concatenate(([0], gaps, [0])).astype(np.int8))
+    tops, bottoms = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    for top, bottom in zip(tops[::-1], bottoms[::-1]):
+        cut = int(top + bottom) // 2
+        if cut < min_rows:
+            return None
+        if top > 0:
+            return cut
+    return None
+
+
+class ScrollCapture:
+    """捲動長截圖：內容捲動時持續擷取同一區域，新捲入的內容切成文字帶逐段辨識
+
+    事件格式: {'ts', 'strip', 'rows'（文字帶在整段長圖中的列範圍）, 'text'}；
+    結束時再送出 {'ts', 'done': True, 'text'（完整文字）, 'stats'}
+    可用 poll() 在主執行緒取出（GUI），或傳入 on_update 直接處理（命令列）
+    """
+
+    def __init__(self, bbox, options=None, interval=DEFAULT_INTERVAL, grabber_name=None, cache=None,
+                 on_update=None):
+        self.bbox = tuple(bbox)
+        # 文字帶已經是單欄的窄條，不需分塊；畫面擷取的內容不會傾斜
+        self.options = ocr_core.resolve_options(dict(options or {}, layout='single', deskew='off'))
+        self.interval = interval
+        self.grabber_name = grabber_name
+        self.cache = cache
+        self.on_update = on_update
+        self.first_frame = None
+        self.texts = []          # 各文字帶的辨識結果（依序）
+        self._reference = None   # 最後一張接上新內容的畫面的列雜湊
+        self._tail = 0           # 參考畫面底部尚未接上的列數（固定的狀態列等）
+        self._footer = None      # 固定狀態列的列數（第一次捲動後才知道）
+        self._last = None        # 參考畫面的灰階像素
+        self._columns = None
+        self._threshold = None
+        self._dark_text = True
+        self._height = 0
+        self._pending = []       # 尚未辨識的灰階列（numpy 陣列片段）
+        self._pending_rows = 0
+        self._first_scroll = True
+        self._stitched_rows = 0  # 已切出送辨識的總列數
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr-scroll")
+        self._events = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+        self._finished = False
+        self.frames = 0
+        self.unchanged = 0
+        self.unaligned = 0
+        self.backward = 0
+        self.new_rows = 0
+        self.ocr_calls = 0
+        self.ocr_rows = 0
+        self.align_ms = 0.0
+        self.error = None
+
+    # ---------- 執行緒 ----------
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="ocr-scroll-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止擷取；剩下的內容辨識完後送出 done 事件"""
+        self._stop.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def stopping(self):
+        """已要求停止、正在辨識剩下的內容"""
+        return self._stop.is_set()
+
+    def poll(self):
+        """取出所有待處理事件，僅可在主執行緒呼叫"""
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _emit(self, event):
+        if self.on_update is not None:
+            self.on_update(event)
+        else:
+            self._events.put(event)
+
+    def _loop(self):
+        # 擷取後端不保證可跨執行緒使用，在擷取執行緒內建立
+        grabber = ocr_capture.create_grabber(self.grabber_name)
+        try:
+            while not self._stop.is_set():
+                started = time.perf_counter()
+                self.step(grabber.grab(self.bbox))
+                # 辨識在另一個執行緒進行，擷取間隔不受 OCR 耗時影響
+                self._stop.wait(max(0.0, self.interval - (time.perf_counter() - started)))
+            self.finish()
+        except Exception as e:
+            self.error = e
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._emit({'ts': time.strftime('%Y-%m-%dT%H:%M:%S'), 'error': str(e)})
+        finally:
+            grabber.close()
+
+    # ---------- 對齊與切帶 ----------
+    def step(self, frame):
+        """處理一張擷取畫面，回傳新接上的列數（沒有捲動或對不上時為 0）"""
+        self.frames += 1
+        gray = np.asarray(frame.convert('L'))
+        if self._reference is None:
+            self._start(frame, gray)
+            rows = gray
+        else:
+            if gray.shape[0] != self._height:
+                raise ValueError("擷取區域大小改變")
+            left, right = self._columns
+            start = time.perf_counter()
+            hashes = row_hashes(gray[:, left:right])
+            shift = find_shift(self._reference, hashes)
+            self.align_ms += (time.perf_counter() - start) * 1000
+            if shift is None:
+                # 捲動太快（前後兩張沒有重疊）或內容整個換掉：略過，等下一張能對上的畫面
+                self.unaligned += 1
+                return 0
+            if shift <= 0:
+                if shift < 0:
+                    self.backward += 1
+                else:
+                    self.unchanged += 1
+                return 0
+            # 底部位置不變的列：固定的狀態列，或剛好都是空白的列（取歷次最小值即為真正的狀態列）
+            tail = fixed_footer(self._reference, hashes)
+            self._footer = tail if self._footer is None else min(self._footer, tail)
+            if self._first_scroll:
+                # 第一次捲動才知道底部哪些列是固定的：第一張畫面的這些列還在緩衝區，先移除
+                self._first_scroll = False
+                self._trim_pending(tail)
+                self._tail = tail
+            # 參考畫面中已接上的最後一列，在新畫面中往上移了 shift 列
+            begin = max(0, self._height - self._tail - shift)
+            end = self._height - tail
+            self._reference = hashes
+            self._last = gray
+            if end <= begin:
+                self._tail = self._height - begin
+                return 0
+            self._tail = tail
+            rows = gray[begin:end]
+        self._append(rows)
+        return len(rows)
+
+    def _start(self, frame, gray):
+        self.first_frame = frame
+        self._height = gray.shape[0]
+        self._columns = content_columns(gray.shape[1])
+        left, right = self._columns
+        # 第一張決定整段使用的放大倍率與文字/背景的分界，各文字帶的處理方式一致
+        self.options['scale'] = ocr_preprocess.resolve_scale(frame, self.options)
+        content = gray[:, left:right]
+        self._threshold = ocr_preprocess.otsu_threshold(Image.fromarray(content).histogram())
+        self._dark_text = np.count_nonzero(content <= self._threshold) * 2 <= content.size
+        self._reference = row_hashes(content)
+        self._tail = 0
+
+    def _ink(self, rows):
+        """每列的墨水像素數，扣除行距容許量（<= 0 即為行距）"""
+        mask = rows <= self._threshold if self._dark_text else rows > self._threshold
+        return np.count_nonzero(mask, axis=1) - int(rows.shape[1] * GAP_RATIO)
+
+    def _append(self, rows):
+        left, right = self._columns
+        self._pending.append(rows[:, left:right])
+        self._pending_rows += len(rows)
+        self.new_rows += len(rows)
+        # 第一次捲動前不切帶：底部可能是固定的狀態列
+        if self._first_scroll or self._pending_rows < self._height * MIN_STRIP:
+            return
+        buffer = np.concatenate(self._pending) if len(self._pending) > 1 else self._pending[0]
+        ink = self._ink(buffer)
+        cut = find_cut(ink, int(self._height * MIN_STRIP))
+        if cut is None and len(buffer) >= self._height * MAX_PENDING:
+            # 整段都沒有行距（圖片、密集表格）：在後半段墨水最少的列切開
+            half = len(buffer) // 2
+            cut = half + int(np.argmin(ink[half:]))
+        if cut is None:
+            self._pending = [buffer]
+            return
+        self._submit(buffer[:cut], ink[:cut])
+        rest = buffer[cut:]
+        self._pending = [rest] if len(rest) else []
+        self._pending_rows = len(rest)
+
+    def _trim_pending(self, count):
+        if not count:
+            return
+        buffer = np.concatenate(self._pending)[:-count]
+        self._pending = [buffer] if len(buffer) else []
+        self._pending_rows = len(buffer)
+        self.new_rows -= count
+
+    def _submit(self, strip, ink):
+        top = self._stitched_rows
+        self._stitched_rows += len(strip)
+        if not (ink > 0).any():
+            return
+        index = len(self.texts)
+        self.texts.append('')
+        self.ocr_calls += 1
+        self.ocr_rows += len(strip)
+        self._executor.submit(self._recognize, index, strip.copy(), (top, self._stitched_rows))
+
+    def _recognize(self, index, strip, rows):
+        try:
+            text = ocr_core.ocr_image(Image.fromarray(strip), self.options, cache=self.cache).text.strip()
+        except Exception as e:
+            self.error = e
+            self._emit({'ts': time.strftime('%Y-%m-%dT%H:%M:%S'), 'error': str(e)})
+            return
+        self.texts[index] = text
+        self._emit({'ts': time.strftime('%Y-%m-%dT%H:%M:%S'), 'strip': index, 'rows': list(rows), 'text': text})
+
+    def finish(self):
+        """辨識剩下的內容並等待所有文字帶完成，回傳完整文字（可重複呼叫）"""
+        if not self._finished:
+            self._finished = True
+            if self._last is not None and self._tail > self._footer:
+                # 最後一張畫面底部被當成狀態列、其實是內容（空白列）的部分
+                self._append(self._last[self._height - self._tail:self._height - self._footer])
+            if self._pending:
+                buffer = np.concatenate(self._pending)
+                self._pending, self._pending_rows = [], 0
+                self._submit(buffer, self._ink(buffer))
+            self._executor.shutdown(wait=True)
+            self._emit({'ts': time.strftime('%Y-%m-%dT%H:%M:%S'), 'done': True, 'text': self.text,
+                        'stats': self.stats()})
+        return self.text
+
+    @property
+    def text(self):
+        return '\n'.join(text for text in self.texts if text)
+
+    def stats(self):
+        aligned = max(1, self.frames - 1 - self.unaligned)
+        return {'frames': self.frames, 'unchanged': self.unchanged, 'unaligned': self.unaligned,
+                'backward': self.backward, 'rows': self.new_rows, 'ocr_calls': self.ocr_calls,
+                'ocr_rows': self.ocr_rows, 'align_ms': round(self.align_ms / aligned, 2)}
+
+
+def run_scroll(bbox, out_path='-', options=None, interval=DEFAULT_INTERVAL, grabber_name=None):
+    """命令列長截圖：各文字帶以 JSON Lines 逐筆輸出，Ctrl+C 結束後輸出完整文字"""
+    if not ocr_core.init_tesseract(verbose=False):
+        print(ocr_core.tesseract_error_msg, file=sys.stderr)
+        return 1
+    out_file = sys.stdout if out_path in (None, '-') else open(out_path, 'a', encoding='utf-8')
+
+    def write(event):
+        out_file.write(json.dumps(event, ensure_ascii=False) + '\n')
+        out_file.flush()
+
+    capture = ScrollCapture(bbox, options, interval=interval, grabber_name=grabber_name, on_update=write)
+    print(f"長截圖區域 {bbox}：請開始捲動內容（Ctrl+C 結束）", file=sys.stderr)
+    capture.start()
+    try:
+        while capture.running:
+            capture._thread.join(0.5)
+    except KeyboardInterrupt:
+        capture.stop()
+        capture._thread.join()
+    finally:
+        if out_file is not sys.stdout:
+            out_file.close()
+    stats = capture.stats()
+    print(f"\n✓ 擷取 {stats['frames']} 次（對不上 {stats['unaligned']} 次），新內容 {stats['rows']} 列，"
+          f"OCR {stats['ocr_calls']} 段 / {stats['ocr_rows']} 列", file=sys.stderr)
+    if capture.error is not None:
+        print(f"✗ 長截圖中止: {capture.error}", file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,346 @@
+"""
+CL_Scan 本機 OCR 伺服器
+以 asyncio 提供 HTTP（localhost 與 / 或 Unix socket），讓其他程式共用同一組常駐引擎與快取：
+同時到達的請求在短時間窗內合併成一批，相同圖片與參數只辨識一次，再分派到固定大小的執行緒池；
+等待中的請求超過上限時直接回應 503，不讓佇列無限增長
+
+    POST /ocr?lang=auto&output=data   內容為圖片檔（PNG / JPEG…）的原始 bytes
+    GET  /health                      佇列與統計資訊
+"""
+import asyncio
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+from PIL import Image
+
+import ocr_cache
+import ocr_core
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MAX_QUEUE = 64             # 等待中的請求上限，超過回應 503
+DEFAULT_BATCH_WINDOW = 0.002       # 秒；第一個請求到達後再等多久收集同一批
+MAX_BODY_BYTES = 32 * 1024 * 1024
+MAX_HEADER_LINES = 100
+# 可由查詢字串覆寫的參數（tile_workers 由伺服器依執行緒池大小決定）
+REQUEST_OPTIONS = tuple(key for key in ocr_core.DEFAULT_OPTIONS if key != 'tile_workers')
+NUMERIC_OPTIONS = {'threshold': int, 'sauvola_window': int, 'sauvola_k': float, 'scale': float,
+                   'ensemble_target': float}
+BOOL_OPTIONS = {'1': True, 'true': True, 'yes': True, 'on': True, '0': False, 'false': False, 'no': False, 'off': False}
+
+STATUS_TEXT = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_options(query):
+    """查詢字串 → OCR 參數（未知參數或格式錯誤時丟出 HTTPError 400）"""
+    options = {}
+    for key, value in parse_qsl(query, keep_blank_values=True):
+        if key not in REQUEST_OPTIONS:
+            raise HTTPError(400, f"未知的參數: {key}")
+        if key in NUMERIC_OPTIONS:
+            try:
+                value = NUMERIC_OPTIONS[key](value)
+            except ValueError:
+                raise HTTPError(400, f"參數格式錯誤: {key}={value}")
+        elif isinstance(ocr_core.DEFAULT_OPTIONS[key], bool):
+            if value.lower() not in BOOL_OPTIONS:
+                raise HTTPError(400, f"參數格式錯誤: {key}={value}")
+            value = BOOL_OPTIONS[value.lower()]
+        options[key] = value
+    return options
+
+
+async def read_request(reader):
+    """讀取一個 HTTP/1.1 請求，連線結束時回傳 None"""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(400, "請求列格式錯誤")
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise HTTPError(400, "標頭過多")
+
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        raise HTTPError(411, "不支援 chunked 傳輸，請指定 Content-Length")
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(400, "Content-Length 格式錯誤")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, f"圖片超過 {MAX_BODY_BYTES // (1024 * 1024)} MB")
+    body = await reader.readexactly(length) if length else b''
+
+    keep_alive = version == 'HTTP/1.1'
+    connection = headers.get('connection', '').lower()
+    if connection == 'close':
+        keep_alive = False
+    elif connection == 'keep-alive':
+        keep_alive = True
+    return method.upper(), target, headers, body, keep_alive
+
+
+def write_response(writer, status, payload, keep_alive, extra_headers=None):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    lines = [
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    for name, value in (extra_headers or {}).items():
+        lines.append(f"{name}: {value}")
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+
+
+class _Request:
+    __slots__ = ('key', 'data', 'options', 'future', 'enqueued')
+
+    def __init__(self, key, data, options, future):
+        self.key = key
+        self.data = data
+        self.options = options
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+
+def _recognize(data, options, cache):
+    """在工作執行緒中解碼並辨識（解碼失敗丟出 ValueError，對應 HTTP 400）"""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.load()
+    except Exception as e:
+        raise ValueError(f"無法解碼圖片: {e}")
+    return ocr_core.ocr_image(image, options, cache=cache)
+
+
+class OCRServer:
+    """微批次 OCR 伺服器：一個分派協程 + 固定大小的執行緒池"""
+
+    def __init__(self, workers=None, max_queue=DEFAULT_MAX_QUEUE, batch_window=DEFAULT_BATCH_WINDOW,
+                 cache=None, runner=None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self.batch_window = batch_window
+        self.batch_max = self.workers * 2
+        self.cache = cache
+        self.runner = runner or _recognize
+        self.stats = {'requests': 0, 'rejected': 0, 'errors': 0, 'batches': 0, 'batched': 0, 'deduplicated': 0}
+        self._queue = None
+        self._slots = None
+        self._executor = None
+        self._dispatcher = None
+        self._servers = []
+
+    # ---------- 啟動 / 關閉 ----------
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        import ocr_engine
+        # 每個工作執行緒各需一個引擎
+        ocr_engine.get_engine_pool().grow(self.workers)
+        self._queue = asyncio.Queue(self.max_queue)
+        self._slots = asyncio.Semaphore(self.workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ocr-server')
+        self._dispatcher = asyncio.ensure_future(self._dispatch())
+        if port is not None:
+            self._servers.append(await asyncio.start_server(self._handle_connection, host, port))
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.remove(unix_path)  # 上次未正常關閉留下的 socket 檔
+            self._servers.append(await asyncio.start_unix_server(self._handle_connection, unix_path))
+        return [sock.getsockname() for server in self._servers for sock in server.sockets]
+
+    async def close(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    # ---------- 連線處理 ----------
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as e:
+                    write_response(writer, e.status, {'error': str(e)}, False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, headers, body, keep_alive = request
+                status, payload, extra = await self._route(method, target, body)
+                write_response(writer, status, payload, keep_alive, extra)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # 用戶端中途斷線
+        finally:
+            writer.close()
+
+    async def _route(self, method, target, body):
+        url = urlsplit(target)
+        if url.path == '/health':
+            return 200, self.health(), None
+        if url.path != '/ocr':
+            return 404, {'error': f"找不到路徑: {url.path}"}, None
+        if method != 'POST':
+            return 405, {'error': "請以 POST 傳送圖片"}, {'Allow': 'POST'}
+        if not body:
+            return 400, {'error': "沒有圖片內容"}, None
+        try:
+            options = parse_options(url.query)
+        except HTTPError as e:
+            return e.status, {'error': str(e)}, None
+        return await self.submit(body, options)
+
+    def health(self):
+        import ocr_engine
+        backend = ocr_engine.active_backend()[0]
+        return {
+            'status': 'ok',
+            'engine': dict(backend.capabilities(), name=backend.name),
+            'pool': ocr_engine.get_engine_pool().stats(),
+            'queued': self._queue.qsize(),
+            'max_queue': self.max_queue,
+            'workers': self.workers,
+            'stats': dict(self.stats),
+        }
+
+    # ---------- 排隊與批次 ----------
+    async def submit(self, data, options):
+        """排入佇列並等待結果，回傳 (HTTP 狀態, 內容, 額外標頭)"""
+        self.stats['requests'] += 1
+        key = (hashlib.blake2b(data, digest_size=16).digest(), json.dumps(options, sort_keys=True))
+        request = _Request(key, data, options, asyncio.get_running_loop().create_future())
+        try:
+            self._queue.put_nowait(request)
+        except asyncio.QueueFull:
+            # 過載：立即拒絕，讓呼叫端稍後重試，而不是讓延遲無限增加
+            self.stats['rejected'] += 1
+            return 503, {'error': "伺服器忙碌中，請稍後重試"}, {'Retry-After': '1'}
+
+        try:
+            result, started, batch_size = await request.future
+        except ValueError as e:
+            self.stats['errors'] += 1
+            return 400, {'error': str(e)}, None
+        except Exception as e:
+            self.stats['errors'] += 1
+            return 500, {'error': str(e)}, None
+        payload = result.to_dict(output=options.get('output'))
+        payload['queue_ms'] = round((started - request.enqueued) * 1000, 2)
+        payload['batch_size'] = batch_size
+        return 200, payload, None
+
+    async def _collect(self):
+        """取出一批：等到第一個請求後，在 batch_window 內盡量多收（最多 batch_max 個）"""
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.batch_max:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            self.stats['batches'] += 1
+            self.stats['batched'] += len(batch)
+            # 同一批中圖片與參數都相同的請求只辨識一次
+            groups = {}
+            for request in batch:
+                groups.setdefault(request.key, []).append(request)
+            self.stats['deduplicated'] += len(batch) - len(groups)
+            for requests in groups.values():
+                # 執行緒池滿載時在這裡等待，佇列隨之累積，超過上限的新請求即回應 503
+                await self._slots.acquire()
+                task = loop.run_in_executor(self._executor, self._run, requests[0])
+                task.add_done_callback(lambda task, requests=requests, size=len(batch): self._finish(task, requests, size))
+
+    def _run(self, request):
+        started = time.perf_counter()
+        return self.runner(request.data, request.options, self.cache), started
+
+    def _finish(self, task, requests, batch_size):
+        self._slots.release()
+        error = task.exception()
+        for request in requests:
+            if request.future.done():
+                continue  # 用戶端已斷線
+            if error is not None:
+                request.future.set_exception(error)
+            else:
+                request.future.set_result(task.result() + (batch_size,))
+
+
+def run_server(host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, workers=None,
+               max_queue=DEFAULT_MAX_QUEUE, cache_path=None, cache_perceptual=False):
+    """命令列伺服器：Ctrl+C 結束"""
+    if not ocr_core.init_tesseract(verbose=False):
+        print(ocr_core.tesseract_error_msg, file=sys.stderr)
+        return 1
+    cache = ocr_cache.OCRCache(cache_path, perceptual=cache_perceptual) if cache_path else None
+    server = OCRServer(workers=workers, max_queue=max_queue, cache=cache)
+
+    async def main():
+        addresses = await server.start(host, port, unix_path)
+        for address in addresses:
+            where = f"http://{address[0]}:{address[1]}" if isinstance(address, tuple) else f"unix:{address}"
+            print(f"✓ OCR 伺服器已啟動: {where}（{server.workers} 個工作執行緒，Ctrl+C 結束）", file=sys.stderr)
+        if ocr_core.has_tesseract and not ocr_engine.pool_warm() and ocr_engine.active_backend()[0].requires_tesseract:
+            print(f"⚠ {ocr_engine.COLD_POOL_NOTICE}", file=sys.stderr)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if unix_path and os.path.exists(unix_path):
+            os.remove(unix_path)
+    stats = server.stats
+    print(f"\n✓ 共 {stats['requests']} 個請求，拒絕 {stats['rejected']} 個，"
+          f"{stats['batches']} 批（合併重複 {stats['deduplicated']} 個）", file=sys.stderr)
+    return 0
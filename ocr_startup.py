@@ -0,0 +1,149 @@
+"""
+CL_Scan 啟動時間量測
+記錄啟動各階段的時間點，並以 python -X importtime 分析各套件的匯入耗時
+"""
+import ctypes
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+_START = time.perf_counter()
+_lock = threading.Lock()
+_marks = [('entry', _START)]
+
+# 不應出現在 OCR 核心匯入過程中的 GUI 模組
+GUI_MODULES = ('tkinter', '_tkinter', 'customtkinter', 'pyperclip', 'PIL.ImageTk')
+
+
+def mark(name):
+    """記錄一個啟動階段的完成時間（可從任何執行緒呼叫）"""
+    with _lock:
+        _marks.append((name, time.perf_counter()))
+
+
+def process_age():
+    """行程建立至今的秒數（含直譯器與打包程式解壓時間），無法取得時回傳 None"""
+    try:
+        if sys.platform == 'win32':
+            kernel32 = ctypes.windll.kernel32
+            creation, exited, kernel, user = (ctypes.c_ulonglong() for _ in range(4))
+            kernel32.GetProcessTimes(kernel32.GetCurrentProcess(), ctypes.byref(creation),
+                                     ctypes.byref(exited), ctypes.byref(kernel), ctypes.byref(user))
+            now = ctypes.c_ulonglong()
+            kernel32.GetSystemTimeAsFileTime(ctypes.byref(now))
+            return (now.value - creation.value) / 1e7  # FILETIME 單位為 100ns
+        with open('/proc/self/stat') as f:
+            # 行程名稱可能含空白，從最後一個 ')' 之後開始切欄位；starttime 為第 22 欄
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except Exception:
+        return None
+
+
+_PRE_ENTRY = process_age()
+
+
+def timeline():
+    """各階段距程式進入點的時間與上一階段到此的耗時（毫秒）"""
+    with _lock:
+        marks = sorted(_marks, key=lambda item: item[1])
+    rows = []
+    previous = _START
+    for name, at in marks:
+        rows.append({
+            'stage': name,
+            'at_ms': round((at - _START) * 1000, 1),
+            'step_ms': round((at - previous) * 1000, 1),
+        })
+        previous = at
+    return rows
+
+
+def import_breakdown(module, top=10):
+    """在全新的直譯器中匯入 module，依頂層套件彙總匯入耗時（打包後無法使用，回傳 None）"""
+    if getattr(sys, 'frozen', False):
+        return None
+    try:
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=60
+        )
+    except Exception:
+        return None
+
+    # 輸出為後序：子模組先列出且縮排較深，遇到頂層的 module 時，前面累積的就是它的匯入樹
+    subtree = []
+    entries = []
+    total_us = None
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        top_level = len(name) - len(name.lstrip()) <= 1
+        subtree.append((name.strip(), int(self_us)))
+        if top_level:
+            if name.strip() == module:
+                entries = subtree
+                total_us = int(cumulative_us)
+            subtree = []
+
+    packages = {}
+    loaded = set()
+    for name, self_us in entries:
+        loaded.add(name)
+        root = name.split('.')[0]
+        packages[root] = packages.get(root, 0) + self_us
+
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        'module': module,
+        'ok': proc.returncode == 0,
+        'total_ms': round(total_us / 1000, 1) if total_us is not None else None,
+        'packages': [{'package': name, 'self_ms': round(us / 1000, 1)} for name, us in ranked],
+        'gui_modules': sorted(m for m in GUI_MODULES if m in loaded),
+    }
+
+
+def collect(modules=('ocr_core', 'ocr_gui')):
+    """整理啟動報告：行程啟動前置時間、各階段時間軸、各模組匯入耗時"""
+    return {
+        'frozen': bool(getattr(sys, 'frozen', False)),
+        'pre_entry_ms': round(_PRE_ENTRY * 1000, 1) if _PRE_ENTRY is not None else None,
+        'timeline': timeline(),
+        'imports': [r for r in (import_breakdown(m) for m in modules) if r is not None],
+    }
+
+
+def format_report(report):
+    """將啟動報告轉成易讀的文字表格"""
+    lines = ["===== CL_Scan 啟動時間 ====="]
+    if report['pre_entry_ms'] is not None:
+        lines.append(f"行程建立 → 程式進入點: {report['pre_entry_ms']:.1f} ms（直譯器 / 解壓）")
+    lines.append(f"{'階段':<20}{'累計 ms':>10}{'本階段 ms':>12}")
+    for row in report['timeline']:
+        lines.append(f"{row['stage']:<20}{row['at_ms']:>10.1f}{row['step_ms']:>12.1f}")
+    for item in report['imports']:
+        status = f"{item['total_ms']} ms" if item['ok'] else "匯入失敗"
+        lines.append(f"\n匯入 {item['module']}: {status}")
+        for package in item['packages']:
+            lines.append(f"  {package['package']:<24}{package['self_ms']:>8.1f} ms")
+        if item['gui_modules']:
+            lines.append(f"  ⚠️ 載入了 GUI 模組: {', '.join(item['gui_modules'])}")
+    return '\n'.join(lines)
+
+
+def write_report(target='-', modules=('ocr_core', 'ocr_gui')):
+    """輸出啟動報告：'-' 印出文字表格，其他路徑寫入 JSON"""
+    report = collect(modules)
+    if target in (None, '-'):
+        print(format_report(report))
+    else:
+        with open(target, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
@@ -0,0 +1,190 @@
+"""
+CL_Scan 結構化辨識結果
+解析 Tesseract image_to_data 的 TSV 輸出：以欄位陣列保存每個字詞，
+行與區塊由字詞彙總而來，純文字、JSON、hOCR 都由同一次辨識產生
+"""
+import html
+
+import numpy as np
+
+OUTPUT_MODES = ('text', 'data', 'hocr')
+WORD_LEVEL = 5  # TSV level：1 頁 / 2 區塊 / 3 段落 / 4 行 / 5 字詞
+
+
+class OCRData:
+    """字詞層級的欄位陣列（struct of arrays）
+
+    block / par / line 為 Tesseract 的編號，boxes 為 (left, top, right, bottom)，
+    座標已換算回預處理前（未縮放）的截圖；conf 為 0~100，words 為字詞文字
+    """
+
+    def __init__(self, words, boxes, conf, block, par, line, size):
+        self.words = words
+        self.boxes = boxes
+        self.conf = conf
+        self.block = block
+        self.par = par
+        self.line = line
+        self.size = size
+        self._lines = None
+
+    def __len__(self):
+        return len(self.words)
+
+    # ---------- 建立 ----------
+    @classmethod
+    def from_tsv(cls, tsv, size, processed_size=None):
+        """解析 TSV；size 為原截圖尺寸，processed_size 為送進 Tesseract 的圖片尺寸"""
+        words = []
+        rows = []
+        for row in tsv.splitlines():
+            cols = row.split('\t')
+            # 表頭、非字詞列與空白字詞略過（tesserocr 的 GetTSVText 不含表頭）
+            if len(cols) < 12 or not cols[0].isdigit() or int(cols[0]) != WORD_LEVEL:
+                continue
+            text = '\t'.join(cols[11:]).strip()
+            if not text:
+                continue
+            words.append(text)
+            rows.append(cols[2:11])
+        data = np.array(rows, dtype=np.float64).reshape(-1, 9)
+
+        boxes = data[:, 4:8].copy()
+        boxes[:, 2:] += boxes[:, :2]  # (left, top, width, height) → (left, top, right, bottom)
+        if processed_size is not None and tuple(processed_size) != tuple(size):
+            boxes[:, 0::2] *= size[0] / processed_size[0]
+            boxes[:, 1::2] *= size[1] / processed_size[1]
+        boxes = np.rint(boxes)
+        np.clip(boxes[:, 0::2], 0, size[0], out=boxes[:, 0::2])
+        np.clip(boxes[:, 1::2], 0, size[1], out=boxes[:, 1::2])
+        return cls(words, boxes.astype(np.int32), data[:, 8].astype(np.float32),
+                   data[:, 0].astype(np.int32), data[:, 1].astype(np.int32),
+                   data[:, 2].astype(np.int32), tuple(size))
+
+    @classmethod
+    def from_dict(cls, data):
+        """由 to_dict() 的輸出還原（快取讀回時使用）"""
+        words = data['words']
+        count = len(words['text'])
+        return cls(list(words['text']),
+                   np.array(words['box'], dtype=np.int32).reshape(count, 4),
+                   np.array(words['conf'], dtype=np.float32),
+                   np.array(words['block'], dtype=np.int32),
+                   np.array(words['par'], dtype=np.int32),
+                   np.array(words['line'], dtype=np.int32),
+                   tuple(data['size']))
+
+    # ---------- 彙總 ----------
+    def _group_starts(self, keys):
+        """keys 相鄰不同處的起點索引（Tesseract 依閱讀順序輸出，同一組一定連續）"""
+        if not len(self.words):
+            return np.zeros(0, dtype=np.intp)
+        changed = np.any(np.diff(np.stack(keys, axis=1), axis=0) != 0, axis=1)
+        return np.concatenate(([0], np.flatnonzero(changed) + 1))
+
+    def _aggregate(self, starts):
+        """各組的外框與平均信心值"""
+        if not len(starts):
+            return np.zeros((0, 4), dtype=np.int32), np.zeros(0, dtype=np.float32)
+        boxes = np.empty((len(starts), 4), dtype=np.int32)
+        boxes[:, :2] = np.minimum.reduceat(self.boxes[:, :2], starts, axis=0)
+        boxes[:, 2:] = np.maximum.reduceat(self.boxes[:, 2:], starts, axis=0)
+        counts = np.diff(np.append(starts, len(self.words)))
+        conf = np.add.reduceat(self.conf, starts) / counts
+        return boxes, conf
+
+    def lines(self):
+        """文字行: [{'text', 'box', 'conf', 'block', 'par', 'words': (start, end)}, ...]"""
+        if self._lines is None:
+            starts = self._group_starts((self.block, self.par, self.line))
+            boxes, conf = self._aggregate(starts)
+            ends = np.append(starts[1:], len(self.words))
+            self._lines = [{
+                'text': ' '.join(self.words[start:end]),
+                'box': boxes[i].tolist(),
+                'conf': round(float(conf[i]), 2),
+                'block': int(self.block[start]),
+                'par': int(self.par[start]),
+                'words': (int(start), int(end)),
+            } for i, (start, end) in enumerate(zip(starts, ends))]
+        return self._lines
+
+    def blocks(self):
+        """文字區塊: [{'box', 'conf', 'lines': (start, end)}, ...]"""
+        starts = self._group_starts((self.block,))
+        boxes, conf = self._aggregate(starts)
+        lines = self.lines()
+        line_blocks = np.array([line['block'] for line in lines], dtype=np.int32)
+        result = []
+        for i, start in enumerate(starts):
+            block_lines = np.flatnonzero(line_blocks == self.block[start])
+            result.append({
+                'box': boxes[i].tolist(),
+                'conf': round(float(conf[i]), 2),
+                'lines': (int(block_lines[0]), int(block_lines[-1]) + 1),
+            })
+        return result
+
+    # ---------- 輸出 ----------
+    def text(self):
+        """純文字：同一行以空白連接，段落與區塊之間空一行（與 image_to_string 相同）"""
+        parts = []
+        previous = None
+        for line in self.lines():
+            if previous is not None and (line['block'], line['par']) != previous:
+                parts.append('')
+            parts.append(line['text'])
+            previous = (line['block'], line['par'])
+        return '\n'.join(parts)
+
+    def to_dict(self):
+        """可序列化為 JSON 的 dict；字詞以欄位陣列輸出，行與區塊以索引範圍對應字詞"""
+        return {
+            'size': list(self.size),
+            'words': {
+                'text': list(self.words),
+                'box': self.boxes.tolist(),
+                'conf': np.round(self.conf, 2).tolist(),
+                'block': self.block.tolist(),
+                'par': self.par.tolist(),
+                'line': self.line.tolist(),
+            },
+            'lines': [dict(line, words=list(line['words'])) for line in self.lines()],
+            'blocks': [dict(block, lines=list(block['lines'])) for block in self.blocks()],
+        }
+
+    def to_hocr(self, title='CL_Scan'):
+        """hOCR（ocr_page / ocr_carea / ocr_line / ocrx_word），座標為原截圖像素"""
+        def bbox(box):
+            return 'bbox {} {} {} {}'.format(*box)
+
+        out = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN"'
+            ' "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">',
+            '<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en" lang="en">',
+            ' <head>',
+            f'  <title>{html.escape(title)}</title>',
+            '  <meta http-equiv="Content-Type" content="text/html;charset=utf-8"/>',
+            '  <meta name="ocr-system" content="tesseract"/>',
+            '  <meta name="ocr-capabilities" content="ocr_page ocr_carea ocr_line ocrx_word"/>',
+            ' </head>',
+            ' <body>',
+            f'  <div class="ocr_page" id="page_1" title="{bbox((0, 0) + tuple(self.size))}">',
+        ]
+        lines = self.lines()
+        for b, block in enumerate(self.blocks(), 1):
+            out.append(f'   <div class="ocr_carea" id="block_{b}" title="{bbox(block["box"])}">')
+            for l in range(*block['lines']):
+                line = lines[l]
+                out.append(f'    <span class="ocr_line" id="line_{l + 1}" title="{bbox(line["box"])}">')
+                for w in range(*line['words']):
+                    out.append(
+                        f'     <span class="ocrx_word" id="word_{w + 1}" '
+                        f'title="{bbox(self.boxes[w])}; x_wconf {int(round(float(self.conf[w])))}">'
+                        f'{html.escape(self.words[w])}</span>'
+                    )
+                out.append('    </span>')
+            out.append('   </div>')
+        out += ['  </div>', ' </body>', '</html>', '']
+        return '\n'.join(out)
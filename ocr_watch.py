@@ -0,0 +1,261 @@
+"""
+CL_Scan 區域監看
+固定的螢幕區域定時擷取，縮小一半後逐格比對變動：沒有變動就不做 OCR，
+有變動時只重新辨識變動範圍內的文字行，並輸出帶時間戳記的變更串流
+"""
+import json
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+import ocr_capture
+import ocr_core
+import ocr_layout
+import ocr_preprocess
+
+DEFAULT_INTERVAL = 0.5   # 秒；畫面有變動時的擷取間隔
+MAX_INTERVAL = 2.0       # 秒；畫面靜止時逐步放慢到這個間隔
+BACKOFF = 1.5
+CELL = 8                 # 變動範圍以 8x8 像素為一格合併
+SAMPLE = 2               # 比對前以 2x2 平均縮小，每次比對的像素量減為 1/4
+DIFF_LEVEL = 40          # 像素亮度變化超過此值才算變動（過濾壓縮雜訊與抗鋸齒閃動）
+LINE_TOLERANCE = 2       # 文字行上下位置誤差在此範圍內視為同一行
+FULL_RATIO = 0.5         # 需重新辨識的行達到一半以上時，整個區域一次辨識（比逐行呼叫便宜）
+
+
+def grayscale(image):
+    """比對用的灰階像素（縮小 SAMPLE 倍）"""
+    return np.asarray(image.convert('L').reduce(SAMPLE), dtype=np.int16)
+
+
+def dirty_rects(reference, current, cell=CELL, level=DIFF_LEVEL, sample=SAMPLE):
+    """比對兩張 grayscale() 縮小後的灰階畫面，回傳原圖座標的變動範圍 [(left, top, right, bottom), ...]
+
+    每格取格內最大的像素差（不取平均：一般字級下只改一個數字，格子平均亮度的變化不到 10；
+    2x2 平均後筆畫的變化仍遠超過門檻），變動的格子依列合併成水平帶，每帶取變動格子的左右範圍
+    """
+    height, width = current.shape
+    if reference.shape != current.shape:
+        return [(0, 0, width * sample, height * sample)]
+    cell = max(1, cell // sample)
+    changed = np.abs(current - reference) > level
+    if not changed.any():
+        return []
+    padded = np.zeros((-(-height // cell) * cell, -(-width // cell) * cell), dtype=bool)
+    padded[:height, :width] = changed
+    cells = padded.reshape(padded.shape[0] // cell, cell, padded.shape[1] // cell, cell).any(axis=(1, 3))
+    rows = cells.any(axis=1)
+    rects = []
+    edges = np.diff(np.concatenate(([0], rows, [0])).astype(np.int8))
+    for top, bottom in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+        cols = np.flatnonzero(cells[top:bottom].any(axis=0))
+        rects.append((int(cols[0]) * cell * sample, int(top) * cell * sample,
+                      min(width, (int(cols[-1]) + 1) * cell) * sample, min(height, int(bottom) * cell) * sample))
+    return rects
+
+
+def _overlaps(line, rects):
+    top, bottom = line[0], line[1]
+    return any(top < rect[3] and rect[1] < bottom for rect in rects)
+
+
+class RegionWatcher:
+    """監看一個螢幕區域，文字變動時送出事件
+
+    事件格式: {'ts', 'text'（整個區域目前的文字）, 'changes': [{'line', 'box', 'text', 'previous'}]}
+    可用 poll() 在主執行緒取出（GUI），或傳入 on_change 直接處理（命令列）
+    """
+
+    def __init__(self, bbox, options=None, interval=DEFAULT_INTERVAL, max_interval=MAX_INTERVAL,
+                 grabber_name=None, cache=None, on_change=None):
+        self.bbox = tuple(bbox)
+        # 螢幕上的固定區域不會傾斜；語言在第一次整區辨識後固定下來，之後逐行辨識不再偵測
+        self.options = ocr_core.resolve_options(dict(options or {}, layout='single', deskew='off'))
+        self.interval = interval
+        self.max_interval = max(interval, max_interval)
+        self.grabber_name = grabber_name
+        self.cache = cache
+        self.on_change = on_change
+        self.lines = []          # [(top, bottom, left, right, text), ...]（區域內座標）
+        self._reference = None   # 上次辨識時的灰階畫面
+        self._events = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+        self.frames = 0
+        self.skipped = 0
+        self.ocr_calls = 0
+        self.error = None
+
+    # ---------- 執行緒 ----------
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="ocr-region-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def poll(self):
+        """取出所有待處理事件，僅可在主執行緒呼叫"""
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _loop(self):
+        # 擷取後端不保證可跨執行緒使用，在監看執行緒內建立
+        grabber = ocr_capture.create_grabber(self.grabber_name)
+        interval = self.interval
+        try:
+            while not self._stop.is_set():
+                changed = self.step(grabber.grab(self.bbox))
+                # 畫面靜止時逐步拉長間隔，閒置時幾乎不佔 CPU
+                interval = self.interval if changed else min(self.max_interval, interval * BACKOFF)
+                self._stop.wait(interval)
+        except Exception as e:
+            self.error = e
+            self._events.put({'ts': time.strftime('%Y-%m-%dT%H:%M:%S'), 'error': str(e)})
+        finally:
+            grabber.close()
+
+    # ---------- 比對與辨識 ----------
+    def step(self, frame):
+        """處理一張擷取畫面，有文字變更時回傳事件，否則回傳 None"""
+        self.frames += 1
+        gray = grayscale(frame)
+        first = self._reference is None
+        if first:
+            rects = [(0, 0, frame.width, frame.height)]
+            # 第一張決定整段監看使用的放大倍率，之後各行的辨識結果可互相比較
+            self.options['scale'] = ocr_preprocess.resolve_scale(frame, self.options)
+        else:
+            rects = dirty_rects(self._reference, gray)
+        if not rects:
+            self.skipped += 1
+            return None
+
+        current = ocr_layout.find_text_lines(ocr_preprocess.ink_mask(frame))
+        previous = self.lines
+        matches = [self._match(line, previous) for line in current]
+        stale = [index for index, (line, old) in enumerate(zip(current, matches))
+                 if old is None or _overlaps(line, rects)]
+        if stale and (first or (len(stale) > 1 and len(stale) >= len(current) * FULL_RATIO)):
+            texts = dict(zip(stale, self._recognize_all(frame, [current[i] for i in stale])))
+        else:
+            texts = {index: self._recognize(frame, current[index]) for index in stale}
+
+        updated = []
+        changes = []
+        for index, (line, old) in enumerate(zip(current, matches)):
+            text = texts[index] if index in texts else previous[old][4]
+            updated.append(line + (text,))
+            before = previous[old][4] if old is not None else None
+            if text != (before or ''):
+                changes.append({'line': index, 'box': self._screen_box(line), 'text': text, 'previous': before})
+        matched = set(old for old in matches if old is not None)
+        for index, line in enumerate(previous):
+            if index not in matched and line[4]:
+                changes.append({'line': None, 'box': self._screen_box(line), 'text': '', 'previous': line[4]})
+
+        self.lines = updated
+        if self._reference is None or self._reference.shape != gray.shape:
+            self._reference = gray
+        else:
+            # 只更新重新辨識過的範圍，緩慢的漸變仍會累積到超過門檻
+            for left, top, right, bottom in rects:
+                rows = slice(top // SAMPLE, -(-bottom // SAMPLE))
+                cols = slice(left // SAMPLE, -(-right // SAMPLE))
+                self._reference[rows, cols] = gray[rows, cols]
+        if not changes:
+            return None
+
+        event = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'text': '\n'.join(line[4] for line in updated if line[4]),
+            'changes': changes,
+        }
+        if self.on_change is not None:
+            self.on_change(event)
+        else:
+            self._events.put(event)
+        return event
+
+    def _match(self, line, previous):
+        """找出位置相同的舊文字行索引"""
+        for index, old in enumerate(previous):
+            if abs(old[0] - line[0]) <= LINE_TOLERANCE and abs(old[1] - line[1]) <= LINE_TOLERANCE:
+                return index
+        return None
+
+    def _recognize(self, frame, line):
+        top, bottom, left, right = line
+        pad = ocr_layout.TILE_PAD
+        crop = frame.crop((max(0, left - pad), max(0, top - pad),
+                           min(frame.width, right + pad), min(frame.height, bottom + pad)))
+        self.ocr_calls += 1
+        return ocr_core.ocr_image(crop, self.options, cache=self.cache).text.strip()
+
+    def _recognize_all(self, frame, lines):
+        """整個區域一次辨識（字詞座標），依字詞中心的高度分配到各文字行"""
+        self.ocr_calls += 1
+        result = ocr_core.ocr_image(frame, dict(self.options, output='data'), cache=self.cache)
+        lang = result.info.get('lang', self.options['lang'])
+        # 固定第一次偵測到的語言，之後逐行辨識不再各自偵測
+        self.options['lang'] = lang
+        data = result.data
+        words = [[] for _ in lines]
+        if data is not None and len(data):
+            tops = np.array([line[0] for line in lines])
+            centers = (data.boxes[:, 1] + data.boxes[:, 3]) / 2
+            for i in np.argsort(data.boxes[:, 0], kind='stable'):
+                index = max(0, int(np.searchsorted(tops, centers[i], side='right')) - 1)
+                if lines[index][0] - LINE_TOLERANCE <= centers[i] < lines[index][1] + LINE_TOLERANCE:
+                    words[index].append(data.words[i])
+        return [ocr_core.clean_text(' '.join(line_words), lang, self.options['charset']).strip()
+                for line_words in words]
+
+    def _screen_box(self, line):
+        top, bottom, left, right = line[:4]
+        return [self.bbox[0] + left, self.bbox[1] + top, self.bbox[0] + right, self.bbox[1] + bottom]
+
+    def stats(self):
+        return {'frames': self.frames, 'skipped': self.skipped, 'ocr_calls': self.ocr_calls}
+
+
+def run_watch(bbox, out_path='-', options=None, interval=DEFAULT_INTERVAL, grabber_name=None):
+    """命令列監看：變更以 JSON Lines 逐筆輸出，Ctrl+C 結束"""
+    if not ocr_core.init_tesseract(verbose=False):
+        print(ocr_core.tesseract_error_msg, file=sys.stderr)
+        return 1
+    out_file = sys.stdout if out_path in (None, '-') else open(out_path, 'a', encoding='utf-8')
+
+    def write(event):
+        out_file.write(json.dumps(event, ensure_ascii=False) + '\n')
+        out_file.flush()
+
+    watcher = RegionWatcher(bbox, options, interval=interval, grabber_name=grabber_name, on_change=write)
+    print(f"監看區域 {bbox}（Ctrl+C 結束）", file=sys.stderr)
+    watcher.start()
+    try:
+        while watcher.running:
+            watcher._thread.join(0.5)
+    except KeyboardInterrupt:
+        watcher.stop()
+    finally:
+        if out_file is not sys.stdout:
+            out_file.close()
+    stats = watcher.stats()
+    print(f"\n✓ 擷取 {stats['frames']} 次，略過 {stats['skipped']} 次，OCR {stats['ocr_calls']} 次", file=sys.stderr)
+    if watcher.error is not None:
+        print(f"✗ 監看中止: {watcher.error}", file=sys.stderr)
+        return 1
+    return 0